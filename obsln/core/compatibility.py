@@ -97,7 +97,34 @@ else:
             data = data.encode()
         except Exception:
             pass
-        return np.array(memoryview(data)).view(dtype).copy()  # NOQA
+        # frombuffer() only creates a view, so the data is copied once into
+        # a writeable array owning its memory.
+        return np.frombuffer(data, dtype=dtype).copy()
+
+
+def readinto(file, out):
+    """
+    Reads the bytes of the contiguous NumPy array out from a file straight
+    into its memory.
+
+    Falls back to ``file.read()`` for file like objects without a
+    ``readinto()`` method.
+
+    :returns: The number of bytes read which is only smaller than
+        ``out.nbytes`` at the end of the file.
+    """
+    buf = memoryview(out.reshape(-1).view(np.uint8))
+    if not hasattr(file, 'readinto'):
+        data = file.read(len(buf))
+        buf[:len(data)] = data
+        return len(data)
+    size = 0
+    while size < len(buf):
+        chunk = file.readinto(buf[size:])
+        if not chunk:
+            break
+        size += chunk
+    return size
  
  
 # if PY2:
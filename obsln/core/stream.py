@@ -53,7 +53,7 @@ _headonly_warning_msg = (
 @map_example_filename("pathname_or_url")
 def read(pathname_or_url=None, format=None, headonly=False, starttime=None,
          endtime=None, nearest_sample=True, dtype=None, apply_calib=False,
-         check_compression=True, **kwargs):
+         check_compression=True, workers=None, **kwargs):
     """
     Read waveform files into an ObsPy Stream object.
  
@@ -98,6 +98,13 @@ def read(pathname_or_url=None, format=None, headonly=False, starttime=None,
     :param check_compression: Check for compression on file and decompress
         if needed. This may be disabled for a moderate speed up.
     :type check_compression: bool, optional
+    :type workers: int, optional
+    :param workers: If a wildcard pattern matches more than one file, read
+        them with this many processes. The format is still detected for
+        every file and the traces are merged in the order of the sorted file
+        names just as without workers. For a single file it is passed on to
+        the underlying waveform reader, e.g. to decode a SEG Y file in
+        parallel.
     :param kwargs: Additional keyword arguments passed to the underlying
         waveform reader method.
     :return: An ObsPy :class:`~obspy.core.stream.Stream` object.
@@ -218,7 +225,8 @@ def read(pathname_or_url=None, format=None, headonly=False, starttime=None,
         # if no pathname or URL specified, return example stream        
         st = _create_example_stream(headonly=headonly)
     else:        
-        st = _generic_reader(pathname_or_url, _read, **kwargs)
+        st = _generic_reader(pathname_or_url, _read, workers=workers,
+                             **kwargs)
  
     if len(st) == 0:
         # try to give more specific information why the stream is empty
@@ -28,13 +28,17 @@ import glob
 # import importlib
 # import inspect
 import io
+import itertools
 import os
 import re
 import sys
 import tempfile
+import threading
 import unicodedata
 # import warnings
 from collections import OrderedDict
+from collections.abc import Mapping
+import functools
  
 # import numpy as np
 #import pkg_resources
@@ -42,25 +46,22 @@ from collections import OrderedDict
 # from future.utils import native_str
 #from pkg_resources import get_entry_info, iter_entry_points
 
-import importlib.metadata
+from obsln.core.util.misc import get_entry_point_groups
+
 
 def get_entry_info(group, name):
-    eps = importlib.metadata.entry_points()
-    if group in eps:
-        for ep in eps[group]:
-            if ep.name == name:
-                return ep
+    for ep in get_entry_point_groups().get(group, []):
+        if ep.name == name:
+            return ep
     return None
 
 def iter_entry_points(group,name=None):
-    eps = importlib.metadata.entry_points()    
     out =[]
-    for xx in eps:
-        if xx.group==group:
-            if name==None:
-                out.append(xx)
-            else:
-                if xx.name==name: out.append(xx)
+    for xx in get_entry_point_groups().get(group, []):
+        if name==None:
+            out.append(xx)
+        else:
+            if xx.name==name: out.append(xx)
 
     return out
 
@@ -101,6 +102,45 @@ WAVEFORM_ACCEPT_BYTEORDER = ['MSEED', 'Q', 'SAC', 'SEGY', 'SU']
 _sys_is_le = sys.byteorder == 'little'
 NATIVE_BYTEORDER = _sys_is_le and '<' or '>'
 
+# number of bytes at the start of a file read once during format auto
+# detection and handed to all isFormat functions accepting a FileHead
+FORMAT_DETECTION_HEAD_SIZE = 4096
+# maximum number of files whose auto detected format is remembered
+FORMAT_CACHE_SIZE = 1024
+_FORMAT_CACHE = OrderedDict()
+_FORMAT_CACHE_LOCK = threading.Lock()
+
+
+class FileHead(io.BytesIO):
+    """
+    In-memory copy of the first bytes of a file used for format detection.
+
+    :type data: bytes
+    :param data: The first bytes of the file.
+    :type name: str
+    :param name: Name of the file.
+    :type size: int
+    :param size: Size of the whole file in bytes which might be more than
+        ``len(data)``.
+    """
+    def __init__(self, data, name, size):
+        super(FileHead, self).__init__(data)
+        self.name = name
+        self.size = size
+
+
+def accepts_file_head(func):
+    """
+    Decorator marking an isFormat function that is able to check a
+    :class:`FileHead` instead of the file itself.
+
+    Such functions must not read more than
+    :const:`FORMAT_DETECTION_HEAD_SIZE` bytes and have to use
+    :attr:`FileHead.size` instead of the size of the buffer.
+    """
+    func.accepts_file_head = True
+    return func
+
 
 class NamedTemporaryFile(io.BufferedIOBase):
     """
@@ -309,7 +349,29 @@ def _get_ordered_entry_points(group, subgroup=None, order_list=[]):
     return entry_points
 
 
-ENTRY_POINTS = {
+class _LazyEntryPoints(Mapping):
+    """
+    Read only dictionary of the entry points of all plug-in types.
+
+    The entry points of a plug-in type are only looked up on first access.
+    """
+    def __init__(self, factories):
+        self._factories = factories
+        self._entry_points = {}
+
+    def __getitem__(self, key):
+        if key not in self._entry_points:
+            self._entry_points[key] = self._factories[key]()
+        return self._entry_points[key]
+
+    def __iter__(self):
+        return iter(self._factories)
+
+    def __len__(self):
+        return len(self._factories)
+
+
+ENTRY_POINTS = _LazyEntryPoints({
 #     'trigger': _get_entry_points('obspy.plugin.trigger'),
 #     'filter': _get_entry_points('obspy.plugin.filter'),
 #     'rotate': _get_entry_points('obspy.plugin.rotate'),
@@ -317,10 +379,12 @@ ENTRY_POINTS = {
 #     'interpolate': _get_entry_points('obspy.plugin.interpolate'),
 #     'integrate': _get_entry_points('obspy.plugin.integrate'),
 #     'differentiate': _get_entry_points('obspy.plugin.differentiate'),
-    'waveform': _get_ordered_entry_points(
-        'obsln.plugin.waveform', 'readFormat', WAVEFORM_PREFERRED_ORDER),
-    'waveform_write': _get_ordered_entry_points(
-        'obsln.plugin.waveform', 'writeFormat', WAVEFORM_PREFERRED_ORDER),
+    'waveform': functools.partial(
+        _get_ordered_entry_points, 'obsln.plugin.waveform', 'readFormat',
+        WAVEFORM_PREFERRED_ORDER),
+    'waveform_write': functools.partial(
+        _get_ordered_entry_points, 'obsln.plugin.waveform', 'writeFormat',
+        WAVEFORM_PREFERRED_ORDER),
 #     'event': _get_ordered_entry_points('obspy.plugin.event', 'readFormat',
 #                                        EVENT_PREFERRED_ORDER),
 #     'event_write': _get_entry_points('obspy.plugin.event', 'writeFormat'),
@@ -329,7 +393,7 @@ ENTRY_POINTS = {
 #         'obspy.plugin.inventory', 'readFormat', INVENTORY_PREFERRED_ORDER),
 #     'inventory_write': _get_entry_points(
 #         'obspy.plugin.inventory', 'writeFormat'),
-}
+})
 
 
 def _get_function_from_entry_point(group, type):
@@ -395,6 +459,8 @@ def get_dependency_version(package_name, raw_string=False):
         If the last number cannot be converted to an integer it will be set to
         0.
     """
+    # Import here as it is only needed for the version lookup.
+    import importlib.metadata
     try:
         #version_string = pkg_resources.get_distribution(package_name).version
         version_string = importlib.metadata.version(package_name)
@@ -448,7 +514,10 @@ def get_dependency_version(package_name, raw_string=False):
 #     return version_list
 
 
-NUMPY_VERSION = get_dependency_version('numpy')
+# Use the version of the imported NumPy module, looking it up in the
+# metadata of the installed distributions is a lot slower.
+NUMPY_VERSION = list(map(to_int_or_zero,
+                         np.__version__.split("rc")[0].strip("~").split(".")))
 # SCIPY_VERSION = get_dependency_version('scipy')
 # MATPLOTLIB_VERSION = get_dependency_version('matplotlib')
 # BASEMAP_VERSION = get_dependency_version('basemap')
@@ -478,30 +547,19 @@ def _read_from_plugin(plugin_type, filename, format=None, **kwargs):
     # get format entry point
     format_ep = None
     if not format:
-        # auto detect format - go through all known formats in given sort order
-        for format_ep in eps.values():
-            
-            # search isFormat for given entry point
-            is_format = buffered_load_entry_point(
-                #format_ep.dist.key,     # Got rid of dist argument...
-                #'obspy.plugin.%s.%s' % (plugin_type, format_ep.name),
-                'obsln.plugin.%s.%s' % (plugin_type, format_ep.name),
-                'isFormat')
-            # If it is a file-like object, store the position and restore it
-            # later to avoid that the isFormat() functions move the file
-            # pointer.
-            if hasattr(filename, "tell") and hasattr(filename, "seek"):
-                position = filename.tell()
-            else:
-                position = None
-            # check format
-            is_format = is_format(filename)
-            if position is not None:
-                filename.seek(position, 0)
-            if is_format:
-                break
+        # auto detect format - files are only checked again if they changed
+        cache_key = _get_format_cache_key(plugin_type, filename)
+        with _FORMAT_CACHE_LOCK:
+            cached_format = _FORMAT_CACHE.get(cache_key)
+        if cached_format in eps:
+            format_ep = eps[cached_format]
         else:
-            raise TypeError('Unknown format for file %s' % filename)
+            format_ep = _detect_format(plugin_type, filename, eps)
+            if cache_key is not None:
+                with _FORMAT_CACHE_LOCK:
+                    _FORMAT_CACHE[cache_key] = format_ep.name
+                    while len(_FORMAT_CACHE) > FORMAT_CACHE_SIZE:
+                        _FORMAT_CACHE.popitem(last=False)
     else:
         # format given via argument
         format = format.upper()
@@ -526,6 +584,65 @@ def _read_from_plugin(plugin_type, filename, format=None, **kwargs):
     return list_obj, format_ep.name
 
 
+def _get_format_cache_key(plugin_type, filename):
+    """
+    Returns the key identifying the current state of a file in the format
+    cache or ``None`` if it is not a file on disk.
+    """
+    if not isinstance(filename, (str, native_str)):
+        return None
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return (plugin_type, os.path.abspath(filename), stat.st_size,
+            stat.st_mtime_ns)
+
+
+def _detect_format(plugin_type, filename, eps):
+    """
+    Returns the entry point of the first format whose isFormat function
+    recognizes the given file.
+
+    The first :const:`FORMAT_DETECTION_HEAD_SIZE` bytes of a file on disk
+    are read once and handed as :class:`FileHead` to all isFormat functions
+    decorated with :func:`accepts_file_head`.
+    """
+    head = None
+    # go through all known formats in given sort order
+    for format_ep in eps.values():
+        # search isFormat for given entry point
+        is_format = buffered_load_entry_point(
+            #format_ep.dist.key,     # Got rid of dist argument...
+            #'obspy.plugin.%s.%s' % (plugin_type, format_ep.name),
+            'obsln.plugin.%s.%s' % (plugin_type, format_ep.name),
+            'isFormat')
+        if getattr(is_format, 'accepts_file_head', False) and \
+                isinstance(filename, (str, native_str)):
+            if head is None:
+                with open(filename, 'rb') as fh:
+                    head = FileHead(fh.read(FORMAT_DETECTION_HEAD_SIZE),
+                                    filename, os.fstat(fh.fileno()).st_size)
+            head.seek(0, 0)
+            if is_format(head):
+                return format_ep
+            continue
+        # If it is a file-like object, store the position and restore it
+        # later to avoid that the isFormat() functions move the file
+        # pointer.
+        if hasattr(filename, "tell") and hasattr(filename, "seek"):
+            position = filename.tell()
+        else:
+            position = None
+        # check format
+        is_format = is_format(filename)
+        if position is not None:
+            filename.seek(position, 0)
+        if is_format:
+            return format_ep
+    raise TypeError('Unknown format for file %s' % filename)
+
+
 # def get_script_dir_name():
 #     """
 #     Get the directory of the current script file. This is more robust than
@@ -719,9 +836,26 @@ def download_to_file(url, filename_or_buffer, chunk_size=1024):
 #                 fh.write(chunk)
 
 
-def _generic_reader(pathname_or_url=None, callback_func=None,
+def _generic_reader(pathname_or_url=None, callback_func=None, workers=None,
                     **kwargs):
-    
+    """
+    Reads a file like object, a URL, a file or all files matching a glob
+    pattern with callback_func.
+
+    If more than one file matches and workers is larger than one, the files
+    are read by a pool of that many processes, see
+    :func:`_parallel_generic_reader`. Otherwise workers is passed on to
+    callback_func if given and reading files on disk.
+    """
+    pathnames = []
+    if isinstance(pathname_or_url, (str, native_str)) and \
+            "://" not in pathname_or_url[:10]:
+        pathnames = sorted(glob.glob(pathname_or_url))
+    if workers is not None and workers > 1 and len(pathnames) > 1:
+        return _parallel_generic_reader(callback_func, pathnames, workers,
+                                        **kwargs)
+    if workers is not None and pathnames:
+        kwargs['workers'] = workers
 
     if not isinstance(pathname_or_url, (str, native_str)):
         # not a string - we assume a file-like object
@@ -754,8 +888,6 @@ def _generic_reader(pathname_or_url=None, callback_func=None,
         
         pathname = pathname_or_url
         # File name(s)
-        pathnames = sorted(glob.glob(pathname))
-                
         if not pathnames:
             # try to give more specific information why the stream is empty
             if glob.has_magic(pathname) and not glob.glob(pathname):
@@ -770,6 +902,46 @@ def _generic_reader(pathname_or_url=None, callback_func=None,
                 generic.extend(callback_func(filename, **kwargs))
         return generic
 
+
+def _parallel_generic_reader(callback_func, pathnames, workers, **kwargs):
+    """
+    Reads all files with callback_func in a pool of processes and merges the
+    results in the order of pathnames.
+
+    At most twice as many files as there are workers are read or waiting to
+    be merged at any time, so memory usage does not grow with the number of
+    files.
+
+    :type callback_func: callable
+    :param callback_func: Module level function reading a single file. It
+        has to be picklable and is called with the file name and kwargs.
+    :type pathnames: list of str
+    :param pathnames: The files in the order they are merged.
+    :type workers: int
+    :param workers: Number of processes.
+    """
+    # Import here as it is only needed for parallel reading.
+    from concurrent.futures import ProcessPoolExecutor
+
+    pathnames = iter(pathnames)
+    generic = None
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending = [executor.submit(callback_func, _i, **kwargs)
+                   for _i in itertools.islice(pathnames, 2 * workers)]
+        while pending:
+            result = pending.pop(0).result()
+            if generic is None:
+                generic = result
+            else:
+                generic.extend(result)
+            for filename in itertools.islice(pathnames, 1):
+                pending.append(executor.submit(callback_func, filename,
+                                               **kwargs))
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return generic
+
 # 
 # class CatchAndAssertWarnings(warnings.catch_warnings):
 #     def __init__(self, clear=None, expected=None, show_all=True, **kwargs):
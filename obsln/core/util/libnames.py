@@ -102,6 +102,36 @@ def _load_cdll(name):
 
     
 
+class _LazyCDLL(object):
+    """
+    Shared library that is only loaded with :func:`_load_cdll` when one of
+    its functions is used for the first time.
+
+    :type name: str
+    :param name: Name of the library, see :func:`_load_cdll`.
+    :type setup: callable, optional
+    :param setup: Called with the loaded library, e.g. to declare the
+        argument and return types of its functions.
+    """
+    def __init__(self, name, setup=None):
+        self._name = name
+        self._setup = setup
+        self._lib = None
+
+    def _load(self):
+        if self._lib is None:
+            lib = _load_cdll(self._name)
+            if self._setup is not None:
+                self._setup(lib)
+            self._lib = lib
+        return self._lib
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._load(), name)
+
+
 def _load_cdll4Real(name,useBuild=False):
     """
     Helper function to load a shared library built during ObsPy installation
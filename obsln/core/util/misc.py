@@ -21,6 +21,7 @@ Misc functinoality
 # import inspect
 # import io
 import itertools
+import math
 # import locale
 # import math
 # import os
@@ -29,26 +30,52 @@ import sys
 # import tempfile
 # import warnings
 # from subprocess import STDOUT, CalledProcessError, check_output
-import importlib.metadata
  
 import numpy as np
+
+from obsln.core import compatibility
 #from pkg_resources import load_entry_point
 
 def load_entry_point(
                     #dist_name,   # Got rid of dist argument....
                      group, name):
     # Get the entry points for the specified distribution, group, and name
-    eps = importlib.metadata.entry_points()
-    
-
-    for ep in eps.select(group=group):
+    for ep in get_entry_point_groups().get(group, []):
         # Got rid of dist argument....
         #if ep.name == name and ep.dist.name == dist_name:
         if ep.name == name: 
             return ep.load()
 
-    raise ValueError(f"Entry point {name} not found in group {group} for distribution {dist_name}")
+    raise ImportError("Entry point %s not found in group %s" % (name, group))
+
+
+def get_entry_point_groups():
+    """
+    Returns a dictionary mapping the names of all entry point groups of the
+    installed distributions to lists of their entry points.
 
+    The metadata of the installed distributions is only scanned on the first
+    call, all later calls return the same dictionary.
+    """
+    global _ENTRY_POINT_GROUPS
+    if _ENTRY_POINT_GROUPS is None:
+        # Import here as it is only needed for the plug-in lookup.
+        import importlib.metadata
+        groups = {}
+        # Like importlib.metadata.entry_points() only use the first of
+        # several distributions with the same name on the path. Going
+        # through the distributions directly works the same on all Python
+        # versions, older versions return a dictionary of groups there.
+        seen = set()
+        for dist in importlib.metadata.distributions():
+            name = dist.metadata['Name']
+            if name in seen:
+                continue
+            seen.add(name)
+            for ep in dist.entry_points:
+                groups.setdefault(ep.group, []).append(ep)
+        _ENTRY_POINT_GROUPS = groups
+    return _ENTRY_POINT_GROUPS
 
 
 WIN32 = sys.platform.startswith('win32')
@@ -78,6 +105,8 @@ BAND_CODE = {'F': 1000.0,
   
 # Dict that stores results from load entry points
 _ENTRY_POINT_CACHE = {}
+# Dict of all entry point groups, see get_entry_point_groups
+_ENTRY_POINT_GROUPS = None
  
 # The kwargs used by load_entry_point function
 _LOAD_ENTRY_POINT_KEYS = ('dist', 'group', 'name')
@@ -545,6 +574,73 @@ def get_window_times(starttime, endtime, window_length, step, offset,
  
     t = type(starttime)
     return [(t(_i[0]), t(_i[1])) for _i in windows]
+
+
+def get_sample_window(starttime, delta, npts, window_start=None,
+                      window_end=None, nearest_sample=True):
+    """
+    Calculates which samples of a regularly sampled trace remain after
+    trimming it to a time window.
+
+    Mirrors :meth:`~obspy.core.trace.Trace.trim` without padding so file
+    readers can skip the samples outside of the window before decoding them
+    and end up with exactly the same trace.
+
+    :param starttime: Start time of the first sample.
+    :type starttime: :class:`~obspy.core.utcdatetime.UTCDateTime`
+    :param delta: Sample interval in seconds.
+    :type delta: float
+    :param npts: Number of samples.
+    :type npts: int
+    :param window_start: Start of the window. ``None`` keeps the beginning.
+    :type window_start: :class:`~obspy.core.utcdatetime.UTCDateTime`
+    :param window_end: End of the window. ``None`` keeps the end.
+    :type window_end: :class:`~obspy.core.utcdatetime.UTCDateTime`
+    :param nearest_sample: Same as in
+        :meth:`~obspy.core.trace.Trace.trim`.
+    :type nearest_sample: bool
+    :returns: Index of the first and one past the last remaining sample and
+        the start time of the trimmed trace.
+
+    .. rubric:: Example
+
+    >>> from obsln import UTCDateTime
+    >>> t = UTCDateTime(2000, 1, 1)
+    >>> get_sample_window(t, 0.5, 100, t + 2.2, t + 4.0)
+    (4, 9, UTCDateTime(2000, 1, 1, 0, 0, 2))
+    """
+    # Same round trip as in Stats to get bit identical times.
+    sampling_rate = 1.0 / delta
+    delta = 1.0 / sampling_rate
+    first, stop = 0, npts
+    if window_start is not None:
+        if nearest_sample:
+            shift = int(compatibility.round_away(
+                (window_start - starttime) * sampling_rate))
+        else:
+            shift = int(math.floor(round((starttime - window_start) *
+                                         sampling_rate, 7))) * -1
+        if shift > 0:
+            starttime += shift * delta
+            first = min(shift, npts)
+    if window_end is not None:
+        remaining = stop - first
+        endtime = starttime + float(max(remaining - 1, 0)) * delta
+        if nearest_sample:
+            shift = int(compatibility.round_away(
+                (window_end - starttime) * sampling_rate)) - remaining + 1
+        else:
+            shift = int(math.floor(round((window_end - endtime) *
+                                         sampling_rate, 7)))
+        if shift < 0:
+            if window_end < starttime:
+                starttime = endtime + shift * delta
+                stop = first
+            elif window_end == starttime:
+                stop = first + min(remaining, 1)
+            else:
+                stop = first + max(remaining + shift, 0)
+    return first, stop, starttime
  
 # 
 # class MatplotlibBackend(object):
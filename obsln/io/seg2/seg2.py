@@ -24,7 +24,9 @@ import numpy as np
 
 from obsln import Stream, Trace, UTCDateTime
 from obsln.core import AttribDict
-from obsln.core.compatibility import from_buffer
+from obsln.core.compatibility import from_buffer, readinto
+from obsln.core.util.base import accepts_file_head
+from obsln.core.util.misc import get_sample_window
 from obsln.io.seg2.header import MONTHS
 
 
@@ -64,7 +66,8 @@ class SEG2(object):
     def __init__(self):
         pass
 
-    def read_file(self, file_object):
+    def read_file(self, file_object, starttime=None, endtime=None,
+                  nearest_sample=True, out=None):
         """
         Reads the following file and will return a Stream object. If
         file_object is a string it will be treated as a file name, otherwise it
@@ -73,6 +76,15 @@ class SEG2(object):
 
         If it is a file_like object, file.seek(0, 0) is expected to be the
         beginning of the SEG-2 file.
+
+        If starttime or endtime are given, only the samples of every trace
+        that :meth:`~obspy.core.trace.Trace.trim` would keep are read and
+        decoded.
+
+        If out is given, it has to be a two dimensional array with at least
+        one row per trace and the data of every trace is decoded straight
+        into its row. The dtype has to be the native one of the data format
+        code, int32 for the 20 bit floating points of data format code 3.
         """
         # Read the file if it is a file name.
         if not hasattr(file_object, 'write'):
@@ -87,10 +99,18 @@ class SEG2(object):
         # endianness.
         self.read_file_descriptor_block()
 
+        if out is not None and (out.ndim != 2 or
+                                len(out) < len(self.trace_pointers)):
+            msg = 'out needs to be two dimensional with at least %i rows.'
+            raise ValueError(msg % len(self.trace_pointers))
+
         # Loop over every trace, read it and append it to the Stream.
-        for tr_pointer in self.trace_pointers:
+        for _i, tr_pointer in enumerate(self.trace_pointers):
             self.file_pointer.seek(tr_pointer, 0)
-            self.stream.append(self.parse_next_trace())
+            self.stream.append(self.parse_next_trace(
+                starttime=starttime, endtime=endtime,
+                nearest_sample=nearest_sample,
+                out=None if out is None else out[_i]))
 
         if not hasattr(file_object, 'write'):
             self.file_pointer.close()
@@ -190,10 +210,14 @@ class SEG2(object):
         else:
             self.starttime = UTCDateTime(0)
 
-    def parse_next_trace(self):
+    def parse_next_trace(self, starttime=None, endtime=None,
+                         nearest_sample=True, out=None):
         """
         Parse the next trace in the trace pointer list and return a Trace
         object.
+
+        Only the samples within starttime and endtime are read and decoded
+        into the one dimensional array out if given, see :meth:`read_file`.
         """
         trace_descriptor_block = self.file_pointer.read(32)
         # Check if the trace descriptor block id is valid.
@@ -251,11 +275,43 @@ class SEG2(object):
         if "DESCALING_FACTOR" in header["seg2"]:
             header['calib'] = float(header['seg2']['DESCALING_FACTOR'])
 
+        # Samples outside of the time window are skipped in the file. Data
+        # format code 3 packs four samples together so whole groups are read.
+        first, stop = 0, number_of_samples_in_data_block
+        if starttime is not None or endtime is not None:
+            first, stop, header['starttime'] = get_sample_window(
+                header['starttime'], header['delta'],
+                number_of_samples_in_data_block, starttime, endtime,
+                nearest_sample=nearest_sample)
+        group = 4 if data_format_code == 3 else 1
+        read_first = first // group * group
+        read_stop = -(-stop // group) * group
+        self.file_pointer.seek(int(read_first * sample_size), 1)
+        if out is not None:
+            if len(out) < stop - first:
+                msg = 'out has room for %i samples but the trace has %i.'
+                raise ValueError(msg % (len(out), stop - first))
+            out = out[:stop - first]
+            native = np.int32 if data_format_code == 3 else \
+                np.dtype(dtype).newbyteorder('=')
+            if out.dtype != native or not out.flags.c_contiguous or \
+                    not out.flags.writeable:
+                msg = 'out has to be a writeable contiguous %s array.'
+                raise ValueError(msg % np.dtype(native).name)
+
         # Unpack the data.
-        data = from_buffer(
-            self.file_pointer.read(
-                int(number_of_samples_in_data_block * sample_size)),
-            dtype=dtype)
+        if out is not None and data_format_code != 3:
+            if readinto(self.file_pointer, out) != out.nbytes:
+                msg = 'Too little data left in the file.'
+                raise SEG2InvalidFileError(msg)
+            if not np.dtype(dtype).isnative:
+                out.byteswap(True)
+            data = out
+        else:
+            data = from_buffer(
+                self.file_pointer.read(
+                    int((read_stop - read_first) * sample_size)),
+                dtype=dtype)
         if data_format_code == 3:
             # Convert one's complement to two's complement by adding one to
             # negative numbers.
@@ -264,7 +320,12 @@ class SEG2(object):
             # a 4-bit exponent for each of the 4 remaining 2-byte (int16)
             # samples.
             exponents = data[0::5].view(self.endian + b'u2')
-            result = np.empty(number_of_samples_in_data_block, dtype=np.int32)
+            # Decode straight into out if the window is aligned to groups.
+            if out is not None and first == read_first and \
+                    stop == read_stop:
+                result = out
+            else:
+                result = np.empty(read_stop - read_first, dtype=np.int32)
             # Apply the negative correction, then multiply by correct exponent.
             result[0::4] = ((data[1::5] + one_to_two[1::5]) *
                             2**((exponents & 0x000f) >> 0))
@@ -275,6 +336,10 @@ class SEG2(object):
             result[3::4] = ((data[4::5] + one_to_two[4::5]) *
                             2**((exponents & 0xf000) >> 12))
             data = result
+        data = data[first - read_first:stop - read_first]
+        if out is not None and not np.may_share_memory(data, out):
+            out[...] = data
+            data = out
 
         # Integrate SEG2 file header into each trace header
         tmp = self.stream.stats.seg2.copy()
@@ -341,6 +406,7 @@ class SEG2(object):
             setattr(attrib_dict, key, value)
 
 
+@accepts_file_head
 def _is_seg2(filename):
     if not hasattr(filename, 'write'):
         file_pointer = open(filename, 'rb')
@@ -367,8 +433,13 @@ def _is_seg2(filename):
     return True
 
 
-def _read_seg2(filename, **kwargs):  # @UnusedVariable
+def _read_seg2(filename, starttime=None, endtime=None, nearest_sample=True,
+               headonly=False, out=None, **kwargs):  # @UnusedVariable
+    # Streams read with headonly are never trimmed.
+    if headonly:
+        starttime = endtime = None
     seg2 = SEG2()
-    st = seg2.read_file(filename)
+    st = seg2.read_file(filename, starttime=starttime, endtime=endtime,
+                        nearest_sample=nearest_sample, out=out)
     warnings.warn(WARNING_HEADER)
     return st
@@ -7,6 +7,7 @@ from __future__ import (absolute_import, division, print_function,
 from future.builtins import *  # NOQA
 
 import gzip
+import io
 import os
 import unittest
 import warnings
@@ -14,6 +15,7 @@ import warnings
 import numpy as np
 
 from obspy import read
+from obsln.io.seg2.seg2 import _read_seg2
 
 
 TRACE2_HEADER = {'ACQUISITION_DATE': '07/JAN/2013',
@@ -140,6 +142,58 @@ class SEG2TestCase(unittest.TestCase):
         # (trace headers include SEG2 file header)
         self.assertEqual(st[0].stats.seg2, TRACE3_HEADER)
 
+    def test_read_time_window(self):
+        """
+        Reading with starttime and endtime only returns the samples trimming
+        the traces afterwards would keep.
+        """
+        basename = os.path.join(self.path,
+                                '20130107_103041000.CET.3c.cont.0')
+        with gzip.open(basename + ".seg2.gz", 'rb') as f:
+            buf = io.BytesIO(f.read())
+        with warnings.catch_warnings(record=True):
+            warnings.simplefilter('always')
+            st = _read_seg2(buf)
+            t = st[0].stats.starttime
+            for starttime, endtime, nearest_sample in [
+                    (t + 0.2504, t + 1.5, True),
+                    (t + 0.2504, None, False),
+                    (None, t + 0.1, True)]:
+                st2 = _read_seg2(buf, starttime=starttime, endtime=endtime,
+                                 nearest_sample=nearest_sample)
+                self.assertEqual(len(st), len(st2))
+                for tr, tr2 in zip(st, st2):
+                    tr = tr.copy()
+                    if starttime is not None:
+                        tr._ltrim(starttime, nearest_sample=nearest_sample)
+                    if endtime is not None:
+                        tr._rtrim(endtime, nearest_sample=nearest_sample)
+                    self.assertLess(tr2.stats.npts, st[0].stats.npts)
+                    np.testing.assert_array_equal(tr.data, tr2.data)
+                    self.assertEqual(tr.stats.starttime, tr2.stats.starttime)
+
+    def test_read_into_preallocated_array(self):
+        """
+        The traces are decoded straight into the rows of the given array.
+        """
+        basename = os.path.join(self.path,
+                                '20130107_103041000.CET.3c.cont.0')
+        with gzip.open(basename + ".seg2.gz", 'rb') as f:
+            buf = io.BytesIO(f.read())
+        with warnings.catch_warnings(record=True):
+            warnings.simplefilter('always')
+            st = _read_seg2(buf)
+            npts = st[0].stats.npts
+            out = np.empty((3, npts), dtype=np.int32)
+            st2 = _read_seg2(buf, out=out)
+            for row, tr, tr2 in zip(out, st, st2):
+                np.testing.assert_array_equal(tr.data, tr2.data)
+                self.assertTrue(np.shares_memory(tr2.data, row))
+            with self.assertRaises(ValueError):
+                _read_seg2(buf, out=np.empty((3, npts), dtype=np.float64))
+            with self.assertRaises(ValueError):
+                _read_seg2(buf, out=out[:2])
+
 
 def suite():
     return unittest.makeSuite(SEG2TestCase, 'test')
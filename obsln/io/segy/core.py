@@ -30,12 +30,13 @@ import numpy as np
 
 from obsln import Stream, Trace, UTCDateTime
 from obsln.core import AttribDict
+from obsln.core.util.base import accepts_file_head
 from .header import (BINARY_FILE_HEADER_FORMAT, DATA_SAMPLE_FORMAT_CODE_DTYPE,
                      ENDIAN, TRACE_HEADER_FORMAT, TRACE_HEADER_KEYS)
 from .segy import _read_segy as _read_segyrev1
 from .segy import _read_su as _read_su_file
 from .segy import (SEGYBinaryFileHeader, SEGYError, SEGYFile, SEGYTrace,
-                   SEGYTraceHeader, SUFile,
+                   SEGYTraceHeader, SEGYWriter, SUFile,
                    autodetect_endian_and_sanity_check_su)
 from .util import unpack_header_value
 
@@ -65,12 +66,14 @@ class SEGYSampleIntervalError(SEGYError):
     pass
 
 
+@accepts_file_head
 def _is_segy(filename):
     """
     Checks whether or not the given file is a SEG Y file.
 
-    :type filename: str
-    :param filename: SEG Y file to be checked.
+    :type filename: str or file-like object
+    :param filename: SEG Y file to be checked. File-like objects are checked
+        from their current position on which is restored afterwards.
     :rtype: bool
     :return: ``True`` if a SEG Y file.
     """
@@ -80,21 +83,27 @@ def _is_segy(filename):
     # greater than 0 and that the number of samples per trace is greater than
     # 0.
     try:
-        with open(filename, 'rb') as fp:
-            fp.seek(3212)
-            _number_of_data_traces = fp.read(2)
-            _number_of_auxiliary_traces = fp.read(2)
-            _sample_interval = fp.read(2)
-            fp.seek(2, 1)
-            _samples_per_trace = fp.read(2)
-            fp.seek(2, 1)
-            data_format_code = fp.read(2)
-            fp.seek(3500, 0)
-            _format_number = fp.read(2)
-            _fixed_length = fp.read(2)
-            _extended_number = fp.read(2)
+        if hasattr(filename, 'read'):
+            pos = filename.tell()
+            try:
+                head = filename.read(3506)
+            finally:
+                filename.seek(pos, 0)
+        else:
+            with open(filename, 'rb') as fp:
+                head = fp.read(3506)
     except Exception:
         return False
+    if len(head) < 3506:
+        return False
+    _number_of_data_traces = head[3212:3214]
+    _number_of_auxiliary_traces = head[3214:3216]
+    _sample_interval = head[3216:3218]
+    _samples_per_trace = head[3220:3222]
+    data_format_code = head[3224:3226]
+    _format_number = head[3500:3502]
+    _fixed_length = head[3502:3504]
+    _extended_number = head[3504:3506]
     # Unpack using big endian first and check if it is valid.
     try:
         format = unpack(b'>h', data_format_code)[0]
@@ -141,8 +150,9 @@ def _is_segy(filename):
 
 def _read_segy(filename, headonly=False, byteorder=None,
                textual_header_encoding=None, unpack_trace_headers=False,
-               data_encoding=None,force_trace_length=None,
-               **kwargs):  # @UnusedVariable
+               data_encoding=None,force_trace_length=None, workers=None,
+               starttime=None, endtime=None, nearest_sample=True, out=None,
+               skip_corrupt_traces=False, **kwargs):  # @UnusedVariable
     """
     Reads a SEG Y file and returns an ObsPy Stream object.
 
@@ -154,7 +164,8 @@ def _read_segy(filename, headonly=False, byteorder=None,
     :param filename: SEG Y rev1 file to be read.
     :type headonly: bool, optional
     :param headonly: If set to True, read only the header and omit the waveform
-        data.
+        data. The data of files on disk can be read later on with
+        ``trace.stats.segy.unpack_data()``.
     :type byteorder: str or ``None``
     :param byteorder: Determines the endianness of the file. Either ``'>'`` for
         big endian or ``'<'`` for little endian. If it is ``None``, it will try
@@ -171,6 +182,31 @@ def _read_segy(filename, headonly=False, byteorder=None,
         header values can still be accessed and will be calculated on the fly
         but tab completion will no longer work. Look in the headers.py for a
         list of all possible trace header values. Defaults to ``False``.
+    :type workers: int, optional
+    :param workers: Number of processes decoding the traces in parallel.
+        Worth it for large files, especially IBM floating point encoded
+        ones. Defaults to ``None`` which decodes everything in the current
+        process.
+    :type starttime: :class:`~obspy.core.utcdatetime.UTCDateTime`, optional
+    :param starttime: Only read the samples of every trace after this time.
+        The samples before it are skipped in the file without being decoded.
+    :type endtime: :class:`~obspy.core.utcdatetime.UTCDateTime`, optional
+    :param endtime: Only read the samples of every trace before this time.
+    :type nearest_sample: bool, optional
+    :param nearest_sample: See :meth:`~obspy.core.trace.Trace.trim`.
+    :type out: :class:`numpy.ndarray`, optional
+    :param out: Two dimensional array with at least one row per trace. The
+        data of every trace is decoded straight into its row and the data of
+        the returned traces are views of them. The dtype has to be the
+        native one of the data encoding, e.g. float32 for IBM and IEEE
+        floating points.
+    :type skip_corrupt_traces: bool, optional
+    :param skip_corrupt_traces: If ``True``, all traces are expected to have
+        the number of samples of the binary file header. Traces with any
+        other number of samples in their header are skipped instead of
+        aborting the read and the skipped byte ranges are stored as list of
+        ``(start, end)`` tuples in ``stream.stats.bad_byte_ranges``.
+        Defaults to ``False``.
     :returns: A ObsPy :class:`~obspy.core.stream.Stream` object.
 
     .. rubric:: Example
@@ -184,7 +220,9 @@ def _read_segy(filename, headonly=False, byteorder=None,
     Seq. No. in line:    1 | 2009-06-22T14:47:37.000000Z - ... 2001 samples
     """
 
-    
+    # Streams read with headonly are never trimmed.
+    if headonly:
+        starttime = endtime = None
     # Read file to the internal segy representation.
     segy_object = _read_segyrev1(
         filename, endian=byteorder,
@@ -192,7 +230,9 @@ def _read_segy(filename, headonly=False, byteorder=None,
         
         data_encoding=data_encoding,force_trace_length=force_trace_length,
         
-        unpack_headers=unpack_trace_headers)
+        unpack_headers=unpack_trace_headers, headonly=headonly,
+        workers=workers, starttime=starttime, endtime=endtime, nearest_sample=nearest_sample,
+        out=out, skip_corrupt_traces=skip_corrupt_traces)
 
     # Create the stream object.
     stream = Stream()
@@ -218,6 +258,8 @@ def _read_segy(filename, headonly=False, byteorder=None,
     stream.stats.endian = endian
     stream.stats.textual_file_header_encoding = \
         textual_file_header_encoding
+    if skip_corrupt_traces:
+        stream.stats.bad_byte_ranges = segy_object.bad_byte_ranges
 
     # Convert traces to ObsPy Trace objects.
     for tr in segy_object.traces:
@@ -230,7 +272,7 @@ def _read_segy(filename, headonly=False, byteorder=None,
 
 def _write_segy(stream, filename, data_encoding=None, byteorder=None,
                 textual_header_encoding=None, ignoreLengthRestriction=False,
-                **kwargs):  # @UnusedVariable
+                append=False, **kwargs):  # @UnusedVariable
     """
     Writes a SEG Y file from given ObsPy Stream object.
 
@@ -280,6 +322,11 @@ def _write_segy(stream, filename, data_encoding=None, byteorder=None,
     :param ignoreLengthRestriction: disables a check on the written trace length 
         and replaces it with a warning. Note if you use this you have to set 
         the headers manually and write the trace length somewhere. 
+    :type append: bool
+    :param append: If True, the traces are appended to the end of the
+        existing SEG Y file filename, see :meth:`SEGYWriter.append`. The
+        data encoding and the byte order are taken from the file and have
+        to match if given. The file headers of the stream are ignored.
     
     This function will automatically set the data encoding field of the binary
     file header so the user does not need to worry about it.
@@ -312,6 +359,14 @@ def _write_segy(stream, filename, data_encoding=None, byteorder=None,
     if data_encoding is not None and data_encoding not in VALID_FORMATS:
         msg = "Invalid data encoding."
         raise SEGYCoreWritingError(msg)
+    if append:
+        if byteorder is not None:
+            byteorder = ENDIAN[byteorder]
+        with SEGYWriter.append(filename, data_encoding=data_encoding,
+                               endian=byteorder) as writer:
+            _check_traces_for_writing(stream, writer.data_encoding)
+            writer.write_traces(stream)
+        return
     # Figure out the data encoding if it is not set.
     if data_encoding is None:
         if hasattr(stream, 'stats') and hasattr(stream.stats, 'data_encoding'):
@@ -332,27 +387,7 @@ def _write_segy(stream, filename, data_encoding=None, byteorder=None,
     if not hasattr(stream.stats, 'binary_file_header'):
         stream.stats.binary_file_header = SEGYBinaryFileHeader()
 
-    # Valid dtype for the data encoding.
-    valid_dtype = DATA_SAMPLE_FORMAT_CODE_DTYPE[data_encoding]
-    # Makes sure that the dtype is for every Trace is correct.
-    for trace in stream:
-        # Check the dtype.
-        if trace.data.dtype != valid_dtype:
-            msg = """
-            The dtype of the data and the chosen data_encoding do not match.
-            You need to manually convert the dtype if you want to use that
-            data_encoding. Please refer to the obspy.io.segy manual for more
-            details.
-            """.strip()
-            raise SEGYCoreWritingError(msg)
-        # Check the sample interval.
-        if trace.stats.delta > MAX_INTERVAL_IN_SECONDS:
-            msg = """
-            SEG Y supports a maximum interval of %s seconds in between two
-            samples (trace.stats.delta value).
-            """.strip()
-            msg = msg % MAX_INTERVAL_IN_SECONDS
-            raise SEGYSampleIntervalError(msg)
+    _check_traces_for_writing(stream, data_encoding)
 
     # Figure out endianness and the encoding of the textual file header.
     if byteorder is None:
@@ -388,56 +423,96 @@ def _write_segy(stream, filename, data_encoding=None, byteorder=None,
     segy_file.binary_file_header = binary_header
     # Add all traces.
     for trace in stream:
-        new_trace = SEGYTrace()
-        new_trace.data = trace.data
-        # Create empty trace header if none is there.
-        if not hasattr(trace.stats, 'segy'):
-            warnings.warn("CREATING TRACE HEADER")
-            trace.stats.segy = {}
-            trace.stats.segy.trace_header = SEGYTraceHeader(endian=byteorder)
-        elif not hasattr(trace.stats.segy, 'trace_header'):
-            warnings.warn("CREATING TRACE HEADER")
-            trace.stats.segy.trace_header = SEGYTraceHeader()
-        this_trace_header = trace.stats.segy.trace_header
-        new_trace_header = new_trace.header
-        # Again loop over all field of the trace header and if they exists, set
-        # them. Ignore all additional attributes.
-        for _, item, _, _ in TRACE_HEADER_FORMAT:
-            if hasattr(this_trace_header, item):
-                setattr(new_trace_header, item,
-                        getattr(this_trace_header, item))
-        starttime = trace.stats.starttime
-        # Set the date of the Trace if it is not UTCDateTime(0).
-        if starttime == UTCDateTime(0):
-            new_trace.header.year_data_recorded = 0
-            new_trace.header.day_of_year = 0
-            new_trace.header.hour_of_day = 0
-            new_trace.header.minute_of_hour = 0
-            new_trace.header.second_of_minute = 0
-        else:
-            new_trace.header.year_data_recorded = starttime.year
-            new_trace.header.day_of_year = starttime.julday
-            new_trace.header.hour_of_day = starttime.hour
-            new_trace.header.minute_of_hour = starttime.minute
-            new_trace.header.second_of_minute = starttime.second
-        # Set the sampling rate.
-        new_trace.header.sample_interval_in_ms_for_this_trace = \
-            int(trace.stats.delta * 1E6)
-        # Set the data encoding and the endianness.
-        new_trace.data_encoding = data_encoding
-        new_trace.endian = byteorder
-        # Add the trace to the SEGYFile object.
-        segy_file.traces.append(new_trace)
+        segy_file.traces.append(
+            _segy_trace_from_obspy_trace(trace, data_encoding, byteorder))
     # Write the file
     segy_file.write(filename, data_encoding=data_encoding, endian=byteorder)
 
 
+def _check_traces_for_writing(stream, data_encoding):
+    """
+    Makes sure that the dtype and the sample interval of every Trace can be
+    written with the given data encoding.
+    """
+    # Valid dtype for the data encoding.
+    valid_dtype = DATA_SAMPLE_FORMAT_CODE_DTYPE[data_encoding]
+    # Makes sure that the dtype is for every Trace is correct.
+    for trace in stream:
+        # Check the dtype.
+        if trace.data.dtype != valid_dtype:
+            msg = """
+            The dtype of the data and the chosen data_encoding do not match.
+            You need to manually convert the dtype if you want to use that
+            data_encoding. Please refer to the obspy.io.segy manual for more
+            details.
+            """.strip()
+            raise SEGYCoreWritingError(msg)
+        # Check the sample interval.
+        if trace.stats.delta > MAX_INTERVAL_IN_SECONDS:
+            msg = """
+            SEG Y supports a maximum interval of %s seconds in between two
+            samples (trace.stats.delta value).
+            """.strip()
+            msg = msg % MAX_INTERVAL_IN_SECONDS
+            raise SEGYSampleIntervalError(msg)
+
+
+def _segy_trace_from_obspy_trace(trace, data_encoding, byteorder):
+    """
+    Converts an ObsPy Trace to a SEGYTrace ready to be written.
+
+    The values in trace.stats.segy.trace_header are taken over, the start
+    time and the sample interval are set from trace.stats.
+    """
+    new_trace = SEGYTrace()
+    new_trace.data = trace.data
+    # Create empty trace header if none is there.
+    if not hasattr(trace.stats, 'segy'):
+        warnings.warn("CREATING TRACE HEADER")
+        trace.stats.segy = {}
+        trace.stats.segy.trace_header = SEGYTraceHeader(endian=byteorder)
+    elif not hasattr(trace.stats.segy, 'trace_header'):
+        warnings.warn("CREATING TRACE HEADER")
+        trace.stats.segy.trace_header = SEGYTraceHeader()
+    this_trace_header = trace.stats.segy.trace_header
+    new_trace_header = new_trace.header
+    # Again loop over all field of the trace header and if they exists, set
+    # them. Ignore all additional attributes.
+    for _, item, _, _ in TRACE_HEADER_FORMAT:
+        if hasattr(this_trace_header, item):
+            setattr(new_trace_header, item,
+                    getattr(this_trace_header, item))
+    starttime = trace.stats.starttime
+    # Set the date of the Trace if it is not UTCDateTime(0).
+    if starttime == UTCDateTime(0):
+        new_trace.header.year_data_recorded = 0
+        new_trace.header.day_of_year = 0
+        new_trace.header.hour_of_day = 0
+        new_trace.header.minute_of_hour = 0
+        new_trace.header.second_of_minute = 0
+    else:
+        new_trace.header.year_data_recorded = starttime.year
+        new_trace.header.day_of_year = starttime.julday
+        new_trace.header.hour_of_day = starttime.hour
+        new_trace.header.minute_of_hour = starttime.minute
+        new_trace.header.second_of_minute = starttime.second
+    # Set the sampling rate.
+    new_trace.header.sample_interval_in_ms_for_this_trace = \
+        int(trace.stats.delta * 1E6)
+    # Set the data encoding and the endianness.
+    new_trace.data_encoding = data_encoding
+    new_trace.endian = byteorder
+    return new_trace
+
+
+@accepts_file_head
 def _is_su(filename):
     """
     Checks whether or not the given file is a Seismic Unix (SU) file.
 
-    :type filename: str
-    :param filename: Seismic Unix file to be checked.
+    :type filename: str or file-like object
+    :param filename: Seismic Unix file to be checked. File-like objects have
+        to start with the first trace header.
     :rtype: bool
     :return: ``True`` if a Seismic Unix file.
 
@@ -445,8 +520,11 @@ def _is_su(filename):
         This test is rather shaky because there is no reliable identifier in a
         Seismic Unix file.
     """
-    with open(filename, 'rb') as f:
-        stat = autodetect_endian_and_sanity_check_su(f)
+    if hasattr(filename, 'read'):
+        stat = autodetect_endian_and_sanity_check_su(filename)
+    else:
+        with open(filename, 'rb') as f:
+            stat = autodetect_endian_and_sanity_check_su(f)
     if stat is False:
         return False
     else:
@@ -454,7 +532,8 @@ def _is_su(filename):
 
 
 def _read_su(filename, headonly=False, byteorder=None,
-             unpack_trace_headers=False, **kwargs):  # @UnusedVariable
+             unpack_trace_headers=False, starttime=None, endtime=None,
+             nearest_sample=True, out=None, **kwargs):  # @UnusedVariable
     """
     Reads a Seismic Unix (SU) file and returns an ObsPy Stream object.
 
@@ -466,7 +545,8 @@ def _read_su(filename, headonly=False, byteorder=None,
     :param filename: SU file to be read.
     :type headonly: bool, optional
     :param headonly: If set to True, read only the header and omit the waveform
-        data.
+        data. The data of files on disk can be read later on with
+        ``trace.stats.su.unpack_data()``.
     :type byteorder: str or ``None``
     :param byteorder: Determines the endianness of the file. Either ``'>'`` for
         big endian or ``'<'`` for little endian. If it is ``None``, it will try
@@ -479,6 +559,17 @@ def _read_su(filename, headonly=False, byteorder=None,
         header values can still be accessed and will be calculated on the fly
         but tab completion will no longer work. Look in the headers.py for a
         list of all possible trace header values. Defaults to ``False``.
+    :type starttime: :class:`~obspy.core.utcdatetime.UTCDateTime`, optional
+    :param starttime: Only read the samples of every trace after this time.
+        The samples before it are skipped in the file without being decoded.
+    :type endtime: :class:`~obspy.core.utcdatetime.UTCDateTime`, optional
+    :param endtime: Only read the samples of every trace before this time.
+    :type nearest_sample: bool, optional
+    :param nearest_sample: See :meth:`~obspy.core.trace.Trace.trim`.
+    :type out: :class:`numpy.ndarray`, optional
+    :param out: Two dimensional float32 array with at least one row per
+        trace. The data of every trace is decoded straight into its row and
+        the data of the returned traces are views of them.
     :returns: A ObsPy :class:`~obspy.core.stream.Stream` object.
 
     .. rubric:: Example
@@ -491,9 +582,16 @@ def _read_su(filename, headonly=False, byteorder=None,
     1 Trace(s) in Stream:
     ... | 2005-12-19T15:07:54.000000Z - ... | 4000.0 Hz, 8000 samples
     """
+    # Streams read with headonly are never trimmed.
+    if headonly:
+        starttime = endtime = None
     # Read file to the internal segy representation.
     su_object = _read_su_file(filename, endian=byteorder,
-                              unpack_headers=unpack_trace_headers)
+                              unpack_headers=unpack_trace_headers,
+                              headonly=headonly,
+                              starttime=starttime,
+                              endtime=endtime, nearest_sample=nearest_sample,
+                              out=out)
 
     # Create the stream object.
     stream = Stream()
@@ -524,6 +622,9 @@ def _read_su(filename, headonly=False, byteorder=None,
             header = LazyTraceHeaderAttribDict(tr.header.unpacked_header,
                                                tr.header.endian)
         trace.stats.su.trace_header = header
+        # Keep the on-the-fly unpacker of header only traces.
+        if hasattr(tr, 'unpack_data'):
+            trace.stats.su.unpack_data = tr.unpack_data
         # Also set the endianness.
         trace.stats.su.endian = endian
         # The sampling rate should be set for every trace. It is a sample
@@ -557,6 +658,9 @@ def _read_su(filename, headonly=False, byteorder=None,
             trace.stats.starttime = UTCDateTime(
                 year=year, julday=julday, hour=hour, minute=minute,
                 second=second)
+        # The samples before the time window have not been read.
+        if tr.window_starttime is not None:
+            trace.stats.starttime = tr.window_starttime
     return stream
 
 
@@ -614,49 +718,57 @@ def _write_su(stream, filename, byteorder=None, **kwargs):  # @UnusedVariable
     su_file = SUFile()
     # Add all traces.
     for trace in stream:
-        new_trace = SEGYTrace()
-        new_trace.data = trace.data
-        # Use header saved in stats if one exists.
-        if hasattr(trace.stats, 'su') and \
-           hasattr(trace.stats.su, 'trace_header'):
-            this_trace_header = trace.stats.su.trace_header
-        else:
-            this_trace_header = AttribDict()
-        new_trace_header = new_trace.header
-        # Again loop over all field of the trace header and if they exists, set
-        # them. Ignore all additional attributes.
-        for _, item, _, _ in TRACE_HEADER_FORMAT:
-            if hasattr(this_trace_header, item):
-                setattr(new_trace_header, item,
-                        getattr(this_trace_header, item))
-        starttime = trace.stats.starttime
-        
-        
-        # Set some special attributes, e.g. the sample count and other stuff.
-        new_trace_header.number_of_samples_in_this_trace = trace.stats.npts
-        new_trace_header.sample_interval_in_ms_for_this_trace = \
-            int(round((trace.stats.delta * 1E6)))
-        # Set the date of the Trace if it is not UTCDateTime(0).
-        if starttime == UTCDateTime(0):
-            new_trace.header.year_data_recorded = 0
-            new_trace.header.day_of_year = 0
-            new_trace.header.hour_of_day = 0
-            new_trace.header.minute_of_hour = 0
-            new_trace.header.second_of_minute = 0
-        else:
-            new_trace.header.year_data_recorded = starttime.year
-            new_trace.header.day_of_year = starttime.julday
-            new_trace.header.hour_of_day = starttime.hour
-            new_trace.header.minute_of_hour = starttime.minute
-            new_trace.header.second_of_minute = starttime.second
-        # Set the data encoding and the endianness.
-        new_trace.endian = byteorder
-        # Add the trace to the SEGYFile object.
-        su_file.traces.append(new_trace)
+        su_file.traces.append(_su_trace_from_obspy_trace(trace, byteorder))
     # Write the file
     su_file.write(filename, endian=byteorder)
 
 
+def _su_trace_from_obspy_trace(trace, byteorder):
+    """
+    Converts an ObsPy Trace to a SEGYTrace ready to be written to a SU file.
+
+    The values in trace.stats.su.trace_header are taken over, the number of
+    samples, the start time and the sample interval are set from
+    trace.stats.
+    """
+    new_trace = SEGYTrace()
+    new_trace.data = trace.data
+    # Use header saved in stats if one exists.
+    if hasattr(trace.stats, 'su') and \
+       hasattr(trace.stats.su, 'trace_header'):
+        this_trace_header = trace.stats.su.trace_header
+    else:
+        this_trace_header = AttribDict()
+    new_trace_header = new_trace.header
+    # Again loop over all field of the trace header and if they exists, set
+    # them. Ignore all additional attributes.
+    for _, item, _, _ in TRACE_HEADER_FORMAT:
+        if hasattr(this_trace_header, item):
+            setattr(new_trace_header, item,
+                    getattr(this_trace_header, item))
+    starttime = trace.stats.starttime
+    # Set some special attributes, e.g. the sample count and other stuff.
+    new_trace_header.number_of_samples_in_this_trace = trace.stats.npts
+    new_trace_header.sample_interval_in_ms_for_this_trace = \
+        int(round((trace.stats.delta * 1E6)))
+    # Set the date of the Trace if it is not UTCDateTime(0).
+    if starttime == UTCDateTime(0):
+        new_trace.header.year_data_recorded = 0
+        new_trace.header.day_of_year = 0
+        new_trace.header.hour_of_day = 0
+        new_trace.header.minute_of_hour = 0
+        new_trace.header.second_of_minute = 0
+    else:
+        new_trace.header.year_data_recorded = starttime.year
+        new_trace.header.day_of_year = starttime.julday
+        new_trace.header.hour_of_day = starttime.hour
+        new_trace.header.minute_of_hour = starttime.minute
+        new_trace.header.second_of_minute = starttime.second
+    # Set the data encoding and the endianness.
+    new_trace.endian = byteorder
+    return new_trace
+
+
 def _segy_trace_str_(self, *args, **kwargs):
     """
     Monkey patch for the __str__ method of the Trace object. SEGY object do not
@@ -735,6 +847,12 @@ class LazyTraceHeaderAttribDict(AttribDict):
 
     __getattr__ = __getitem__
 
+    def __setstate__(self, adict):
+        # The packed header is read only and would be skipped by update().
+        self.__dict__['unpacked_header'] = adict['unpacked_header']
+        self.__dict__['endian'] = adict['endian']
+        super(LazyTraceHeaderAttribDict, self).__setstate__(adict)
+
     def __deepcopy__(self, *args, **kwargs):  # @UnusedVariable, see #689
         ad = self.__class__(
             unpacked_header=deepcopy(self.__dict__['unpacked_header']),
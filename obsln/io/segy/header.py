@@ -17,6 +17,8 @@ and write support.
 #                         unicode_literals)
 # from future.builtins import *  # NOQA
 
+from struct import Struct
+
 import numpy as np
 
 from . import pack, unpack
@@ -177,6 +179,90 @@ TRACE_HEADER_FORMAT = [
 TRACE_HEADER_KEYS = [_i[1] for _i in TRACE_HEADER_FORMAT]
 
 
+def trace_header_dtype(endian='>'):
+    """
+    Compiles TRACE_HEADER_FORMAT into a NumPy structured dtype describing one
+    240 byte trace header with the given endianness.
+
+    The dtype is built on every call so changes to TRACE_HEADER_FORMAT are
+    always honored.
+    """
+    names = []
+    formats = []
+    offsets = []
+    for length, name, special_format, start in TRACE_HEADER_FORMAT:
+        if special_format:
+            format = endian + special_format
+        elif length == 2:
+            format = endian + 'h'
+        elif length == 4:
+            format = endian + 'i'
+        # The unassigned field is just kept as raw bytes.
+        else:
+            format = 'V%i' % length
+        names.append(name)
+        formats.append(format)
+        offsets.append(start)
+    return np.dtype({'names': names, 'formats': formats, 'offsets': offsets,
+                     'itemsize': 240})
+
+
+# Compiled trace header structs per endianness together with the
+# TRACE_HEADER_FORMAT they have been compiled from.
+_TRACE_HEADER_STRUCTS = {}
+
+
+def trace_header_struct(endian='>'):
+    """
+    Compiles TRACE_HEADER_FORMAT into a :class:`struct.Struct` packing a
+    complete 240 byte trace header with the given endianness in one call.
+
+    The compiled struct is cached and recompiled once TRACE_HEADER_FORMAT
+    changes.
+
+    :returns: The struct, the header keys in the order of the struct fields
+        and the positions of the raw byte fields among them or None if
+        TRACE_HEADER_FORMAT has overlapping fields.
+    """
+    cached = _TRACE_HEADER_STRUCTS.get(endian)
+    if cached is not None and cached[0] == TRACE_HEADER_FORMAT:
+        return cached[1]
+    format = [endian]
+    names = []
+    raw_fields = []
+    pos = 0
+    for length, name, special_format, start in sorted(
+            TRACE_HEADER_FORMAT, key=lambda x: x[3]):
+        if start < pos:
+            compiled = None
+            break
+        # Skip gaps in the header.
+        if start > pos:
+            format.append('%ix' % (start - pos))
+        if special_format:
+            format.append(special_format)
+        elif length == 2:
+            format.append('h')
+        elif length == 4:
+            format.append('i')
+        # The unassigned field is just kept as raw bytes.
+        else:
+            format.append('%is' % length)
+            raw_fields.append(len(names))
+        names.append(name)
+        pos = start + length
+    else:
+        if pos < 240:
+            format.append('%ix' % (240 - pos))
+        compiled = Struct(''.join(format))
+        # Fields beyond the end of the header can not be packed either.
+        compiled = (compiled, names, raw_fields) \
+            if compiled.size == 240 else None
+    _TRACE_HEADER_STRUCTS[endian] = \
+        ([list(_i) for _i in TRACE_HEADER_FORMAT], compiled)
+    return compiled
+
+
 # Functions that unpack the chosen data format. The keys correspond to the
 # number given for each format by the SEG Y format reference.
 DATA_SAMPLE_FORMAT_UNPACK_FUNCTIONS = {
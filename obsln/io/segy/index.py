@@ -0,0 +1,507 @@
+# Copyright 2020 Bateared Collie
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3. Neither the name of the copyright holder nor the names of its contributors may be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Persistent trace index for SEG Y and SU files.
+
+The index is stored in a sidecar file next to the data file. It holds the
+byte offset and the number of samples of every trace as well as a set of
+trace header columns so reopening a large file does not require walking
+over all traces again.
+"""
+import os
+import zlib
+
+import numpy as np
+
+from .header import DATA_SAMPLE_FORMAT_SAMPLE_SIZE
+from .segy import (SEGYError, SEGYFile, SEGYTrace, SUFile, _scan_trace_table)
+from .unpack import SharedFileReader
+
+
+# Appended to the name of the data file to get the name of the index file.
+INDEX_SUFFIX = '.obslnidx'
+
+# Bump whenever the layout of the index file changes.
+INDEX_VERSION = 1
+
+# Upper limit of the number of bytes SEGYTraceReader reads at once. Longer
+# runs of consecutive traces are split into several reads.
+READ_BATCH_SIZE = 1024 ** 2
+
+# The trace header columns stored in an index by default.
+DEFAULT_INDEX_KEYS = [
+    'trace_sequence_number_within_line',
+    'original_field_record_number',
+    'trace_number_within_the_original_field_record',
+    'ensemble_number',
+    'trace_number_within_the_ensemble',
+    'for_3d_poststack_data_this_field_is_for_in_line_number',
+    'for_3d_poststack_data_this_field_is_for_cross_line_number']
+
+
+class SEGYTraceIndex(object):
+    """
+    Location of every trace in a SEG Y or SU file plus some trace header
+    columns.
+    """
+    def __init__(self, offsets, npts, columns=None, format='SEGY',
+                 endian='>', data_encoding=5, filesize=0, mtime=0,
+                 checksum=0):
+        """
+        :param offsets: Byte offset of the start of every trace header.
+        :param npts: Number of samples of every trace.
+        :type columns: dict
+        :param columns: Trace header columns, one array per header key.
+        :type format: str
+        :param format: Either 'SEGY' or 'SU'.
+        :param endian: The endianness of the file.
+        :param data_encoding: The data sample format code of the file.
+        :param filesize: Size of the file the index was built for.
+        :param mtime: Modification time in nanoseconds of the file the index
+            was built for.
+        :param checksum: CRC32 checksum of the file headers and the first
+            trace header of the file the index was built for.
+        """
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.npts = np.asarray(npts, dtype=np.int64)
+        self.columns = columns or {}
+        self.format = format
+        self.endian = endian
+        self.data_encoding = data_encoding
+        self.filesize = filesize
+        self.mtime = mtime
+        self.checksum = checksum
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __str__(self):
+        return 'Index of %i traces in a %s file.' % (len(self), self.format)
+
+    def _repr_pretty_(self, p, cycle):
+        p.text(str(self))
+
+    def is_valid_for(self, filename):
+        """
+        Checks whether the index still describes the given file.
+
+        Size and modification time are checked first as they are cheap, the
+        checksum of the file headers only after that.
+        """
+        stat = os.stat(filename)
+        if stat.st_size != self.filesize or stat.st_mtime_ns != self.mtime:
+            return False
+        return _header_checksum(filename, self._checksum_size()) == \
+            self.checksum
+
+    def _checksum_size(self):
+        """
+        The checksum covers everything up to the end of the first trace
+        header.
+        """
+        if not len(self):
+            return 0
+        return int(self.offsets[0]) + 240
+
+    def read_trace(self, file, index, unpack_headers=False, headonly=False,
+                   data_reader=None):
+        """
+        Reads a single trace without touching any other trace.
+
+        :param file: Open file like object of the indexed file.
+        :type index: int
+        :param index: Index of the trace in the file.
+        :param data_reader: Shared handle headonly traces read their data
+            through, see :class:`~obsln.io.segy.segy.SEGYTrace`.
+        :rtype: :class:`~obsln.io.segy.segy.SEGYTrace`
+        """
+        file.seek(int(self.offsets[index]), 0)
+        return SEGYTrace(file, self.data_encoding, self.endian,
+                         unpack_headers=unpack_headers,
+                         filesize=self.filesize, headonly=headonly,
+                         data_reader=data_reader)
+
+    def write(self, filename):
+        """
+        Writes the index to the given filename.
+        """
+        arrays = {'offsets': self.offsets, 'npts': self.npts}
+        for key, value in self.columns.items():
+            arrays['column_' + key] = value
+        meta = np.array([INDEX_VERSION, self.data_encoding, self.filesize,
+                         self.mtime, self.checksum], dtype=np.int64)
+        # Pass an open file so NumPy does not append its own suffix.
+        with open(filename, 'wb') as fh:
+            np.savez(fh, meta=meta, format=np.array(self.format),
+                     endian=np.array(self.endian), **arrays)
+
+
+class SEGYTraceReader(object):
+    """
+    Random access to the traces of a SEG Y or SU file.
+
+    Traces are located with a :class:`SEGYTraceIndex` so only the requested
+    traces are read. Runs of consecutive traces are read with as few read
+    calls as possible, each of at most READ_BATCH_SIZE bytes.
+
+    >>> from obsln.core.util import get_example_file
+    >>> filename = get_example_file("1.sgy_first_trace")
+    >>> with SEGYTraceReader(filename, write_index=False) as reader:
+    ...     print(len(reader))
+    ...     print(reader.get_traces([0])[0].npts)
+    1
+    8000
+    """
+    def __init__(self, filename, format='SEGY', endian=None, keys=None,
+                 write_index=True):
+        """
+        :type filename: str
+        :param filename: The SEG Y or SU file.
+        :type format: str
+        :param format: Either 'SEGY' or 'SU'.
+        :param endian: The endianness of the file. If None, autodetection will
+            be used.
+        :type keys: list of str
+        :param keys: The trace header keys available for :meth:`where`
+            without rescanning the file. Defaults to DEFAULT_INDEX_KEYS.
+        :type write_index: bool
+        :param write_index: Store the trace index next to the file so the
+            next reader can reuse it.
+        """
+        self.filename = filename
+        self.format = format.upper()
+        self.write_index = write_index
+        self.index = get_trace_index(filename, keys=keys, format=self.format,
+                                     endian=endian, write=write_index)
+        self.endian = self.index.endian
+        self.data_encoding = self.index.data_encoding
+        self.file = open(filename, 'rb')
+        self.data_reader = None
+        self.textual_file_header = None
+        self.binary_file_header = None
+        try:
+            self.data_reader = SharedFileReader(filename)
+            if self.format == 'SEGY':
+                segy_file = SEGYFile(self.file, endian=self.endian,
+                                     read_traces=False)
+                self.textual_file_header = segy_file.textual_file_header
+                self.textual_header_encoding = \
+                    segy_file.textual_header_encoding
+                self.binary_file_header = segy_file.binary_file_header
+        except Exception:
+            # Nobody would close the file otherwise.
+            self.close()
+            raise
+
+    def __len__(self):
+        return len(self.index)
+
+    def __str__(self):
+        return '%i traces in the %s file %s.' % (len(self), self.format,
+                                                 self.filename)
+
+    def _repr_pretty_(self, p, cycle):
+        p.text(str(self))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Closes the underlying file.
+        """
+        self.file.close()
+        if self.data_reader is not None:
+            self.data_reader.close()
+
+    def get_traces(self, indices, unpack_headers=False, headonly=False):
+        """
+        Reads the traces with the given indices.
+
+        :param indices: Trace indices, a slice or a boolean mask. Negative
+            indices count from the end of the file.
+        :type unpack_headers: bool
+        :param unpack_headers: Unpack all trace headers right away.
+        :type headonly: bool
+        :param headonly: Only read the trace headers, the data will be read on
+            the fly if accessed.
+        :rtype: list of :class:`~obsln.io.segy.segy.SEGYTrace`
+        :returns: The traces in the requested order.
+        """
+        indices = np.arange(len(self))[indices].reshape(-1)
+        if headonly:
+            return [self.index.read_trace(self.file, i,
+                                          unpack_headers=unpack_headers,
+                                          headonly=True,
+                                          data_reader=self.data_reader)
+                    for i in indices]
+        traces = []
+        for run in _consecutive_runs(indices):
+            traces.extend(self._read_run(run[0], len(run), unpack_headers))
+        return traces
+
+    def where(self, header_key, value, unpack_headers=False, headonly=False):
+        """
+        Reads all traces with matching trace header values.
+
+        :type header_key: str
+        :param header_key: The trace header key to select on.
+        :param value: Either a single value or a ``(min, max)`` tuple of an
+            inclusive range. ``None`` leaves a side of the range open.
+        :rtype: list of :class:`~obsln.io.segy.segy.SEGYTrace`
+        :returns: The matching traces in file order.
+        """
+        return self.get_traces(self.where_indices(header_key, value),
+                               unpack_headers=unpack_headers,
+                               headonly=headonly)
+
+    def where_indices(self, header_key, value):
+        """
+        Returns the indices of all traces with matching trace header values.
+
+        Same arguments as :meth:`where`, nothing but the index is read.
+        """
+        column = self.header_column(header_key)
+        if isinstance(value, tuple):
+            minimum, maximum = value
+            mask = np.ones(len(column), dtype=np.bool_)
+            if minimum is not None:
+                mask &= column >= minimum
+            if maximum is not None:
+                mask &= column <= maximum
+        else:
+            mask = column == value
+        return np.flatnonzero(mask)
+
+    def header_column(self, header_key):
+        """
+        Returns the values of one trace header key for all traces.
+
+        Keys that are not yet part of the index are added to it which
+        requires one more pass over the trace headers.
+        """
+        if header_key not in self.index.columns:
+            keys = list(self.index.columns) + [header_key]
+            self.index = get_trace_index(
+                self.filename, keys=keys, format=self.format,
+                endian=self.endian, rebuild=True, write=self.write_index)
+        return self.index.columns[header_key]
+
+    def _read_run(self, start, count, unpack_headers):
+        """
+        Reads count consecutive traces in batches of at most READ_BATCH_SIZE
+        bytes unless a single trace is larger.
+
+        Every batch is read straight into one reused buffer the traces are
+        then unpacked from.
+        """
+        offsets = self.index.offsets[start:start + count]
+        ends = offsets + 240 + self.index.npts[start:start + count] * \
+            DATA_SAMPLE_FORMAT_SAMPLE_SIZE[self.data_encoding]
+        buf = bytearray()
+        traces = []
+        first = 0
+        while first < count:
+            begin = int(offsets[first])
+            # At least one trace per batch.
+            last = max(first, int(np.searchsorted(
+                ends, begin + READ_BATCH_SIZE, side='right')) - 1)
+            size = int(ends[last]) - begin
+            if len(buf) < size:
+                buf = bytearray(size)
+            view = memoryview(buf)[:size]
+            self.file.seek(begin, 0)
+            size = 0
+            while size < len(view):
+                chunk = self.file.readinto(view[size:])
+                if not chunk:
+                    break
+                size += chunk
+            batch = _BufferFile(view[:size])
+            for i in range(first, last + 1):
+                batch.seek(int(offsets[i]) - begin, 0)
+                trace = SEGYTrace(batch, self.data_encoding, self.endian,
+                                  unpack_headers=unpack_headers,
+                                  filesize=size)
+                trace.file = self.file
+                traces.append(trace)
+            first = last + 1
+        return traces
+
+
+class _BufferFile(object):
+    """
+    Minimal read only file like object over a memoryview so traces can be
+    unpacked from a batch without copying it once more.
+    """
+    def __init__(self, view):
+        self.view = view
+        self.pos = 0
+
+    def read(self, size=-1):
+        end = len(self.view) if size < 0 else \
+            min(self.pos + size, len(self.view))
+        data = self.view[self.pos:end].tobytes()
+        self.pos = max(self.pos, end)
+        return data
+
+    def readinto(self, b):
+        b = memoryview(b).cast('B')
+        data = self.view[self.pos:self.pos + len(b)]
+        b[:len(data)] = data
+        self.pos += len(data)
+        return len(data)
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self.pos
+        elif whence == 2:
+            offset += len(self.view)
+        self.pos = offset
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+
+def _consecutive_runs(indices):
+    """
+    Splits a sequence of trace indices into runs of consecutive ones.
+    """
+    if not len(indices):
+        return []
+    breaks = np.flatnonzero(np.diff(indices) != 1) + 1
+    return np.split(indices, breaks)
+
+
+def build_trace_index(filename, keys=None, format='SEGY', endian=None):
+    """
+    Builds the index of a SEG Y or SU file by walking over all traces once.
+
+    :type filename: str
+    :param filename: The SEG Y or SU file.
+    :type keys: list of str
+    :param keys: The trace header keys to store in the index. Defaults to
+        DEFAULT_INDEX_KEYS.
+    :type format: str
+    :param format: Either 'SEGY' or 'SU'.
+    :param endian: The endianness of the file. If None, autodetection will
+        be used.
+    :rtype: :class:`SEGYTraceIndex`
+    """
+    if keys is None:
+        keys = DEFAULT_INDEX_KEYS
+    format = format.upper()
+    stat = os.stat(filename)
+    with open(filename, 'rb') as file:
+        if format == 'SEGY':
+            segy_file = SEGYFile(file, endian=endian, read_traces=False)
+            endian = segy_file.endian
+            data_encoding = segy_file.data_encoding
+        elif format == 'SU':
+            su_file = SUFile(file, endian=endian, read_traces=False)
+            endian = su_file.endian
+            data_encoding = 5
+        else:
+            msg = "Format has to be either 'SEGY' or 'SU'."
+            raise ValueError(msg)
+        columns, offsets, npts = _scan_trace_table(
+            file, DATA_SAMPLE_FORMAT_SAMPLE_SIZE[data_encoding], endian,
+            keys=keys)
+    index = SEGYTraceIndex(offsets, npts, columns=columns, format=format,
+                           endian=endian, data_encoding=data_encoding,
+                           filesize=stat.st_size, mtime=stat.st_mtime_ns)
+    index.checksum = _header_checksum(filename, index._checksum_size())
+    return index
+
+
+def read_trace_index(filename):
+    """
+    Reads an index written with :meth:`SEGYTraceIndex.write`.
+
+    :type filename: str
+    :param filename: Name of the index file.
+    :rtype: :class:`SEGYTraceIndex`
+    """
+    with np.load(filename, allow_pickle=False) as npz:
+        version, data_encoding, filesize, mtime, checksum = \
+            [int(_i) for _i in npz['meta']]
+        if version != INDEX_VERSION:
+            msg = 'Unsupported trace index version %i.' % version
+            raise SEGYError(msg)
+        columns = dict((_i[len('column_'):], npz[_i]) for _i in npz.files
+                       if _i.startswith('column_'))
+        return SEGYTraceIndex(
+            npz['offsets'], npz['npts'], columns=columns,
+            format=str(npz['format']), endian=str(npz['endian']),
+            data_encoding=data_encoding, filesize=filesize, mtime=mtime,
+            checksum=checksum)
+
+
+def get_trace_index(filename, keys=None, format='SEGY', endian=None,
+                    rebuild=False, write=True):
+    """
+    Returns the index of a SEG Y or SU file.
+
+    A valid index file next to the data file is reused, otherwise the index
+    is built and (if ``write`` is True) stored next to the data file for the
+    next time. An index file that is outdated, corrupt or does not contain
+    all requested header keys is replaced.
+
+    :type filename: str
+    :param filename: The SEG Y or SU file.
+    :type keys: list of str
+    :param keys: The trace header keys to store in the index. Defaults to
+        DEFAULT_INDEX_KEYS.
+    :type format: str
+    :param format: Either 'SEGY' or 'SU'.
+    :param endian: The endianness of the file. If None, autodetection will
+        be used.
+    :type rebuild: bool
+    :param rebuild: Always build a new index.
+    :type write: bool
+    :param write: Write newly built indices next to the data file.
+    :rtype: :class:`SEGYTraceIndex`
+    """
+    if keys is None:
+        keys = DEFAULT_INDEX_KEYS
+    index_filename = filename + INDEX_SUFFIX
+    if not rebuild and os.path.exists(index_filename):
+        try:
+            index = read_trace_index(index_filename)
+        except Exception:
+            index = None
+        if index is not None and index.format == format.upper() and \
+                (endian is None or index.endian == endian) and \
+                set(keys).issubset(index.columns) and \
+                index.is_valid_for(filename):
+            return index
+    index = build_trace_index(filename, keys=keys, format=format,
+                              endian=endian)
+    if write:
+        try:
+            index.write(index_filename)
+        except (IOError, OSError):
+            # Read only locations just do not get a persistent index.
+            pass
+    return index
+
+
+def _header_checksum(filename, size):
+    """
+    CRC32 checksum of the first size bytes of a file.
+    """
+    with open(filename, 'rb') as fh:
+        return zlib.crc32(fh.read(size))
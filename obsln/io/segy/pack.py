@@ -24,6 +24,8 @@ import sys
 
 import numpy as np
 
+from .util import clibsegy
+
 
 LOG2 = 0.3010299956639812
 # Get the system byte order.
@@ -34,27 +36,73 @@ else:
     BYTEORDER = '>'
 
 
+def _get_clibsegy_ieee2ibm():
+    """
+    Returns the IBM encoder of libsegy or None for older builds only coming
+    with the decoder.
+    """
+    return getattr(clibsegy, 'ieee2ibm', None)
+
+
 class WrongDtypeException(Exception):
     pass
 
 
 def pack_4byte_ibm(file, data, endian='>'):
     """
-    Packs 4 byte IBM floating points. This will only work if the host system
-    internally uses little endian byte orders.
+    Packs 4 byte IBM floating points.
     """
     # Check the dtype and raise exception otherwise!
     if data.dtype != np.float64 and data.dtype != np.float32:
         raise WrongDtypeException
+    words = ieee_to_ibm(data)
+    # Swap the byte order if necessary.
+    if BYTEORDER != endian:
+        words.byteswap(True)
+    # Write to file.
+    file.write(words.tobytes())
+
+
+def ieee_to_ibm(data, out=None):
+    """
+    Converts floating point numbers to 4 byte IBM floating points.
+
+    Uses the C code in libsegy if available and falls back to NumPy
+    otherwise.
+
+    :param data: The floating point numbers. Anything but contiguous native
+        float32 arrays will be converted first.
+    :param out: Optional contiguous native uint32 array with the same shape
+        as data the IBM floating points will be written to. Passing
+        ``data.view(np.uint32)`` converts in place.
+    :returns: The IBM floating points as native uint32 words.
+    """
+    data = np.require(data, dtype=np.float32, requirements='C')
+    if out is None:
+        out = np.empty(data.shape, dtype=np.uint32)
+    elif out.shape != data.shape or out.dtype != np.uint32 or \
+            not out.flags.c_contiguous or not out.dtype.isnative:
+        msg = 'out has to be a contiguous native uint32 array of shape %s.'
+        raise ValueError(msg % (data.shape,))
+    ieee2ibm = _get_clibsegy_ieee2ibm()
+    if ieee2ibm is not None:
+        ieee2ibm(data.reshape(-1), out.reshape(-1), data.size)
+    else:
+        out[...] = _ieee_to_ibm_numpy(data)
+    return out
+
+
+def _ieee_to_ibm_numpy(data):
+    """
+    Pure NumPy version of :func:`ieee_to_ibm` without the out parameter.
+    """
     # Calculate the values. The theory is explained in
     # https://www.codeproject.com/KB/applications/libnumber.aspx
 
     # Calculate the signs.
-    signs = np.empty(len(data), dtype=np.uint8)
-    temp_signs = np.sign(data)
+    signs = np.zeros(data.shape, dtype=np.uint32)
     # Negative numbers are encoded as sign bit 1, positive ones as bit 0.
-    signs[temp_signs == 1] = 0
-    signs[temp_signs == -1] = 128
+    signs[np.sign(data) == -1] = 128
 
     # Make absolute values.
     data = np.abs(data)
@@ -74,8 +122,8 @@ def pack_4byte_ibm(file, data, endian='>'):
     # Normalization.
     while True:
         # Find numbers smaller than 1/16 but not zero.
-        non_normalized = np.where(np.where(fraction, fraction, 1) < 0.0625)[0]
-        if len(non_normalized) == 0:
+        non_normalized = np.where(np.where(fraction, fraction, 1) < 0.0625)
+        if len(non_normalized[0]) == 0:
             break
         fraction[non_normalized] *= 16
         exponent[non_normalized] -= 1
@@ -89,42 +137,15 @@ def pack_4byte_ibm(file, data, endian='>'):
     # Times 2^24 to be able to get a long.
     fraction *= 16777216.0
     # Convert to unsigned long.
-    fraction = np.require(fraction, np.uint64)
-
-    # Use 8 bit integers to be able to store every byte separately.
-    new_data = np.zeros(4 * len(data), np.uint8)
-
-    # The first bit is the sign and the following 7 are the exponent.
-    byte_0 = np.require(signs + exponent, np.uint8)
-    # All following 24 bit are the fraction.
-    byte_1 = np.require(np.right_shift(np.bitwise_and(fraction, 0x00ff0000),
-                                       16), np.uint8)
-    byte_2 = np.require(np.right_shift(np.bitwise_and(fraction, 0x0000ff00),
-                                       8), np.uint8)
-    byte_3 = np.require(np.bitwise_and(fraction, 0x000000ff), np.uint8)
-
-    # Depending on the endianness store the data different.
-    # big endian.
-    if endian == '>':
-        new_data[0::4] = byte_0
-        new_data[1::4] = byte_1
-        new_data[2::4] = byte_2
-        new_data[3::4] = byte_3
-    # little endian>
-    elif endian == '<':
-        new_data[0::4] = byte_3
-        new_data[1::4] = byte_2
-        new_data[2::4] = byte_1
-        new_data[3::4] = byte_0
-    # Should not happen.
-    else:
-        raise Exception
+    fraction = np.require(fraction, np.uint32)
+
+    # The first bit is the sign and the following 7 are the exponent. All
+    # following 24 bit are the fraction.
+    words = np.left_shift(signs + exponent, 24)
+    words |= np.bitwise_and(fraction, 0x00ffffff)
     # Write the zeros again.
-    new_data.dtype = np.uint32
-    new_data[zeros] = 0
-    # Write to file.
-    #file.write(new_data.tostring())
-    file.write(new_data.tobytes())
+    words[zeros] = 0
+    return words
 
 
 def pack_4byte_integer(file, data, endian='>'):
@@ -138,7 +159,7 @@ def pack_4byte_integer(file, data, endian='>'):
     if BYTEORDER != endian:
         data = data.byteswap()
     # Write the file.
-    file.write(data.tostring())
+    file.write(data.tobytes())
 
 
 def pack_2byte_integer(file, data, endian='>'):
@@ -152,7 +173,7 @@ def pack_2byte_integer(file, data, endian='>'):
     if BYTEORDER != endian:
         data = data.byteswap()
     # Write the file.
-    file.write(data.tostring())
+    file.write(data.tobytes())
 
 
 def pack_4byte_fixed_point(file, data, endian='>'):
@@ -18,6 +18,9 @@ Routines to read and write SEG Y rev 1 encoded seismic data files.
 
 import io
 import os
+import threading
+import time
+from struct import error as struct_error
 from struct import pack, unpack
 import warnings
 
@@ -25,14 +28,23 @@ import numpy as np
 
 from obsln import Trace, UTCDateTime
 from obsln.core import AttribDict
+from obsln.core.compatibility import readinto
+from obsln.core.util.base import FileHead
+from obsln.core.util.misc import get_sample_window
 
 from .header import (BINARY_FILE_HEADER_FORMAT,
+                     DATA_SAMPLE_FORMAT_CODE_DTYPE,
                      DATA_SAMPLE_FORMAT_PACK_FUNCTIONS,
                      DATA_SAMPLE_FORMAT_SAMPLE_SIZE,
                      DATA_SAMPLE_FORMAT_UNPACK_FUNCTIONS, ENDIAN,
-                     TRACE_HEADER_FORMAT, TRACE_HEADER_KEYS)
-from .unpack import OnTheFlyDataUnpacker
-from .util import unpack_header_value, _pack_attribute_nicer_exception
+                     TRACE_HEADER_FORMAT, TRACE_HEADER_KEYS,
+                     trace_header_dtype, trace_header_struct)
+from .pack import WrongDtypeException, ieee_to_ibm
+from .unpack import (LazyIBMArray, OnTheFlyDataUnpacker,
+                     SharedFileReader, ibm_to_ieee)
+from .util import (pack_trace_header_table, unpack_header_value,
+                   unpack_trace_header_table,
+                   _pack_attribute_nicer_exception)
 
 
 class SEGYError(Exception):
@@ -93,7 +105,8 @@ class SEGYFile(object):
     def __init__(self, file=None, endian=None, textual_header_encoding=None,
                  data_encoding=None,force_trace_length=None,
                  unpack_headers=False, headonly=False, read_traces=True,
-                 ):
+                 starttime=None, endtime=None, nearest_sample=True,
+                 out=None, skip_corrupt_traces=False):
         """
         Class that internally handles SEG Y files.
 
@@ -119,6 +132,20 @@ class SEGYFile(object):
         :param read_traces: Data traces will only be read if this is set to
             ``True``. The data will be completely ignored if this is set to
             ``False``.
+        :type starttime: :class:`~obspy.core.utcdatetime.UTCDateTime`
+        :param starttime: Only decode the samples after this time. See
+            :class:`SEGYTrace`.
+        :type endtime: :class:`~obspy.core.utcdatetime.UTCDateTime`
+        :param endtime: Only decode the samples before this time. See
+            :class:`SEGYTrace`.
+        :type nearest_sample: bool
+        :param nearest_sample: See :meth:`~obspy.core.trace.Trace.trim`.
+        :type out: :class:`numpy.ndarray`
+        :param out: Two dimensional array with one row per trace the data is
+            decoded into. See :meth:`_read_traces`.
+        :type skip_corrupt_traces: bool
+        :param skip_corrupt_traces: Skip traces with a corrupt header instead
+            of aborting. See :meth:`_read_traces`.
         """
         
         if file is None:
@@ -152,7 +179,10 @@ class SEGYFile(object):
         if read_traces:
             [i for i in self._read_traces(
                 force_trace_length=force_trace_length,
-                unpack_headers=unpack_headers, headonly=headonly)]
+                unpack_headers=unpack_headers, headonly=headonly,
+                starttime=starttime, endtime=endtime,
+                nearest_sample=nearest_sample, out=out,
+                skip_corrupt_traces=skip_corrupt_traces)]
 
 
     def __str__(self):
@@ -195,6 +225,7 @@ class SEGYFile(object):
         self.textual_file_header = b''
         self.binary_file_header = None
         self.traces = []
+        self.bad_byte_ranges = []
 
     def _read_textual_header(self):
         """
@@ -291,31 +322,12 @@ class SEGYFile(object):
         # Write the textual header.
         self._write_textual_header(file)
 
-        # Write certain fields in the binary header if they are not set. Most
-        # fields will be written using the data from the first trace. It is
-        # usually better to set the header manually!
-        if self.binary_file_header.number_of_data_traces_per_ensemble <= 0:
-            self.binary_file_header.number_of_data_traces_per_ensemble = \
-                len(self.traces)
-        if self.binary_file_header.sample_interval_in_microseconds <= 0:
-            self.binary_file_header.sample_interval_in_microseconds = \
-                self.traces[0].header.sample_interval_in_ms_for_this_trace
-        if self.binary_file_header.number_of_samples_per_data_trace <= 0:
-            self.binary_file_header.number_of_samples_per_data_trace = \
-                len(self.traces[0].data)
-
-        # Always set the SEGY Revision number to 1.0 (hex-coded).
-        self.binary_file_header.seg_y_format_revision_number = 256
-        # Set the fixed length flag to zero if all traces have NOT the same
-        # length. Leave unchanged otherwise.
-        if len(set([len(tr.data) for tr in self.traces])) != 1:
-            self.binary_file_header.fixed_length_trace_flag = 0
-        # Extended textual headers are not supported by ObsPy so far.
-        self.binary_file_header.\
-            number_of_3200_byte_ext_file_header_records_following = 0
-        # Enforce the encoding
-        if data_encoding:
-            self.binary_file_header.data_sample_format_code = data_encoding
+        _complete_binary_file_header(
+            self.binary_file_header, len(self.traces),
+            self.traces[0].header.sample_interval_in_ms_for_this_trace,
+            len(self.traces[0].data),
+            len(set([len(tr.data) for tr in self.traces])) == 1,
+            data_encoding=data_encoding)
 
         # Write the binary header.
         self.binary_file_header.write(file, endian=endian)
@@ -407,7 +419,9 @@ class SEGYFile(object):
 
     def _read_traces(self, unpack_headers=False, headonly=False,
                      force_trace_length=None,
-                     yield_each_trace=False):
+                     yield_each_trace=False, starttime=None, endtime=None,
+                     nearest_sample=True, out=None,
+                     skip_corrupt_traces=False):
         """
         Reads the actual traces starting at the current file pointer position
         to the end of the file.
@@ -430,9 +444,27 @@ class SEGYFile(object):
             streaming interface to read SEG-Y files. Read traces will no
             longer be collected in ``self.traces`` list if this is set to
             ``True``.
+
+        :type out: :class:`numpy.ndarray`
+        :param out: Two dimensional array with at least one row per trace.
+            The data of every trace is decoded straight into the beginning
+            of its row and the trace data is a view of it, so reading a
+            whole gather needs no further allocations or copies. Ignored if
+            headonly is True.
+
+        :type skip_corrupt_traces: bool
+        :param skip_corrupt_traces: If True, all traces are expected to have
+            the number of samples given in the binary file header (or the
+            first trace header if it is not set). Traces whose header
+            disagrees are skipped and the reading resumes at the next
+            plausible trace header, see :func:`scan_segy`. The skipped byte
+            ranges are stored in ``self.bad_byte_ranges``.
+
+        See :class:`SEGYTrace` for the time window parameters.
         """
         
         self.traces = []
+        self.bad_byte_ranges = []
         # Determine the filesize once.
         if isinstance(self.file, io.BytesIO):
             pos = self.file.tell()
@@ -441,14 +473,42 @@ class SEGYFile(object):
             self.file.seek(pos, 0)
         else:
             filesize = os.fstat(self.file.fileno())[6]
+        # All traces read their data on the fly through the same handle.
+        self.data_reader = _shared_file_reader(self.file) if headonly \
+            else None
+        rows, empty_row = _out_rows(out)
+        offsets = None
+        if skip_corrupt_traces:
+            npts = force_trace_length or \
+                self.binary_file_header.number_of_samples_per_data_trace
+            offsets, self.bad_byte_ranges = _scan_fixed_length_traces(
+                self.file, DATA_SAMPLE_FORMAT_SAMPLE_SIZE[self.data_encoding],
+                self.endian, npts=npts)
+            offsets = iter(offsets.tolist())
+        elif force_trace_length is None:
+            # A valid trace index next to the file saves the header walk.
+            offsets = _indexed_trace_offsets(self.file, self.endian,
+                                             self.data_encoding)
+            if offsets is not None:
+                offsets = iter(offsets.tolist())
         # Big loop to read all data traces.
         while True:
+            # Only jump to the good or indexed traces if there are any.
+            if offsets is not None:
+                offset = next(offsets, None)
+                if offset is None:
+                    break
+                self.file.seek(offset, 0)
             # Read and as soon as the trace header is too small abort.
             try:
                 trace = SEGYTrace(self.file, self.data_encoding, self.endian,
                                   force_trace_length=force_trace_length,
                                   unpack_headers=unpack_headers,
-                                  filesize=filesize, headonly=headonly)
+                                  filesize=filesize, headonly=headonly,
+                                  data_reader=self.data_reader,
+                                  starttime=starttime, endtime=endtime,
+                                  nearest_sample=nearest_sample,
+                                  out=next(rows, empty_row))
                 if yield_each_trace:
                     yield trace
                 else:
@@ -457,6 +517,130 @@ class SEGYFile(object):
                 break
 
 
+def _out_rows(out):
+    """
+    Returns an iterator over the rows of out and the value to use once it is
+    exhausted. The latter is an empty row so a trace without a row of its
+    own fails to be read.
+    """
+    if out is None:
+        return iter(()), None
+    if out.ndim != 2:
+        msg = 'out has to be a two dimensional array.'
+        raise SEGYError(msg)
+    return iter(out), out[:0, :].reshape(-1)
+
+
+def _indexed_trace_offsets(file, endian, data_encoding):
+    """
+    Returns the trace offsets stored in the trace index next to an open SEG
+    Y file on disk, see :mod:`obsln.io.segy.index`.
+
+    None is returned if there is no index, it does not match the file or the
+    traces do not start at the current file pointer position.
+    """
+    index = _valid_trace_index(file, endian, data_encoding)
+    if index is None or (len(index) and index.offsets[0] != file.tell()):
+        return None
+    return index.offsets
+
+
+def _valid_trace_index(file, endian, data_encoding):
+    """
+    Returns the trace index next to an open SEG Y file on disk if it still
+    describes the file, otherwise None.
+    """
+    # Import here to avoid circular imports.
+    from .index import INDEX_SUFFIX, read_trace_index
+
+    filename = getattr(file, 'name', None)
+    if not isinstance(filename, str) or \
+            not os.path.isfile(filename + INDEX_SUFFIX):
+        return None
+    try:
+        index = read_trace_index(filename + INDEX_SUFFIX)
+    except Exception:
+        return None
+    if index.format != 'SEGY' or index.endian != endian or \
+            index.data_encoding != data_encoding or \
+            not index.is_valid_for(filename):
+        return None
+    return index
+
+
+def _extend_trace_index(filename, index, columns, offsets, npts):
+    """
+    Adds traces appended to a SEG Y file to its trace index and rewrites the
+    index so it stays valid for the grown file.
+    """
+    # Import here to avoid circular imports.
+    from .index import INDEX_SUFFIX, _header_checksum
+
+    index.offsets = np.concatenate([index.offsets, offsets])
+    index.npts = np.concatenate([index.npts, npts])
+    index.columns = dict(
+        (key, np.concatenate([value, columns[key]]))
+        for key, value in index.columns.items())
+    stat = os.stat(filename)
+    index.filesize = stat.st_size
+    index.mtime = stat.st_mtime_ns
+    index.checksum = _header_checksum(filename, index._checksum_size())
+    try:
+        index.write(filename + INDEX_SUFFIX)
+    except (IOError, OSError):
+        # Read only locations just keep the now outdated index.
+        pass
+
+
+def _shared_file_reader(file):
+    """
+    Returns a :class:`~obsln.io.segy.unpack.SharedFileReader` for an open
+    file on disk or None for any other file like object.
+    """
+    filename = getattr(file, 'name', None)
+    if not isinstance(filename, str) or not os.path.isfile(filename):
+        return None
+    return SharedFileReader(filename)
+
+
+def _complete_binary_file_header(header, trace_count, sample_interval, npts,
+                                 fixed_length, data_encoding=None):
+    """
+    Sets the fields of a binary file header which have to be in line with
+    the traces of the file.
+
+    Most fields are only set if they are not yet set and will be taken from
+    the first trace. It is usually better to set the header manually!
+
+    :param header: The :class:`SEGYBinaryFileHeader` to complete.
+    :param trace_count: Number of traces in the file.
+    :param sample_interval: Sample interval of the first trace in
+        microseconds.
+    :param npts: Number of samples of the first trace.
+    :type fixed_length: bool
+    :param fixed_length: Whether all traces have the same number of samples.
+    :param data_encoding: The data encoding to enforce, if any.
+    """
+    if header.number_of_data_traces_per_ensemble <= 0:
+        header.number_of_data_traces_per_ensemble = trace_count
+    if header.sample_interval_in_microseconds <= 0:
+        header.sample_interval_in_microseconds = sample_interval
+    if header.number_of_samples_per_data_trace <= 0:
+        header.number_of_samples_per_data_trace = npts
+
+    # Always set the SEGY Revision number to 1.0 (hex-coded).
+    header.seg_y_format_revision_number = 256
+    # Set the fixed length flag to zero if all traces have NOT the same
+    # length. Leave unchanged otherwise.
+    if not fixed_length:
+        header.fixed_length_trace_flag = 0
+    # Extended textual headers are not supported by ObsPy so far.
+    header.number_of_3200_byte_ext_file_header_records_following = 0
+    # Enforce the encoding
+    if data_encoding:
+        header.data_sample_format_code = data_encoding
+
+
 class SEGYBinaryFileHeader(object):
     """
     Parses the binary file header at the given starting position.
@@ -564,7 +748,9 @@ class SEGYTrace(object):
     """
     def __init__(self, file=None, data_encoding=4, endian='>',
                  force_trace_length=None,
-                 unpack_headers=False, filesize=None, headonly=False):
+                 unpack_headers=False, filesize=None, headonly=False,
+                 data_reader=None, starttime=None, endtime=None,
+                 nearest_sample=True, out=None):
         """
         Convenience class that internally handles a single SEG Y trace.
 
@@ -604,9 +790,30 @@ class SEGYTrace(object):
             will be read and unpacked. Has a huge impact on memory usage. Data
             will not be unpackable on-the-fly after reading the file.
             Defaults to False.
+        :type data_reader: :class:`~obsln.io.segy.unpack.SharedFileReader`
+        :param data_reader: Shared handle of the file the data of headonly
+            traces is read through. If not given, the file is opened again
+            whenever the data is accessed.
+        :type starttime: :class:`~obspy.core.utcdatetime.UTCDateTime`
+        :param starttime: Skip all samples before this time. The samples are
+            selected as :meth:`~obspy.core.trace.Trace.trim` would do it
+            but the skipped ones are never read or decoded. The start time of
+            the kept samples is stored in ``window_starttime``. Ignored if
+            headonly is True.
+        :type endtime: :class:`~obspy.core.utcdatetime.UTCDateTime`
+        :param endtime: Skip all samples after this time.
+        :type nearest_sample: bool
+        :param nearest_sample: See :meth:`~obspy.core.trace.Trace.trim`.
+        :type out: :class:`numpy.ndarray`
+        :param out: One dimensional array the data is decoded into without
+            any intermediate copies. The data will be a view of its first
+            samples. It has to be long enough, writeable, contiguous and of
+            the native dtype of the data encoding. Ignored if headonly is
+            True.
         """
         self.endian = endian
         self.data_encoding = data_encoding
+        self.window_starttime = None
         # If None just return empty structure.
         if file is None:
             self._create_empty_trace()
@@ -626,13 +833,16 @@ class SEGYTrace(object):
         # Otherwise read the file.
         self._read_trace(
                     force_trace_length=force_trace_length,
-                    unpack_headers=unpack_headers, headonly=headonly
+                    unpack_headers=unpack_headers, headonly=headonly,
+                    data_reader=data_reader, starttime=starttime,
+                    endtime=endtime, nearest_sample=nearest_sample, out=out
                     )
 
     def _read_trace(self, 
                     force_trace_length=None,
                     unpack_headers=False, 
-                    headonly=False):
+                    headonly=False, data_reader=None, starttime=None,
+                    endtime=None, nearest_sample=True, out=None):
         """
         Reads the complete next header starting at the file pointer at
         self.file.
@@ -690,14 +900,39 @@ class SEGYTrace(object):
         if headonly:
             # skip reading the data, but still advance the file
             self.file.seek(data_needed, 1)
-            # build a function for reading data from the disk on the fly
-            self.unpack_data = OnTheFlyDataUnpacker(
-                DATA_SAMPLE_FORMAT_UNPACK_FUNCTIONS[self.data_encoding],
-                self.file.name, self.file.mode, pos, npts, endian=self.endian)
+            # build a function for reading data from the disk on the fly,
+            # the data of file like objects in memory is simply skipped
+            if data_reader is not None or \
+                    isinstance(getattr(self.file, 'name', None), str):
+                self.unpack_data = OnTheFlyDataUnpacker(
+                    DATA_SAMPLE_FORMAT_UNPACK_FUNCTIONS[self.data_encoding],
+                    self.file.name, self.file.mode, pos, npts,
+                    endian=self.endian, reader=data_reader,
+                    sample_size=DATA_SAMPLE_FORMAT_SAMPLE_SIZE[
+                        self.data_encoding])
         else:
+            first = 0
+            if starttime is not None or endtime is not None:
+                # Only read and decode the samples within the time window.
+                first, stop, self.window_starttime = get_sample_window(
+                    _trace_header_starttime(self.header),
+                    _trace_header_delta(self.header), npts, starttime,
+                    endtime, nearest_sample=nearest_sample)
+                self.npts = stop - first
+                self.file.seek(first * DATA_SAMPLE_FORMAT_SAMPLE_SIZE[
+                    self.data_encoding], 1)
+            if out is not None:
+                if len(out) < self.npts:
+                    msg = 'out has room for %i samples but the trace ' + \
+                        'has %i.'
+                    raise SEGYError(msg % (len(out), self.npts))
+                out = out[:self.npts]
             # Unpack the data.
             self.data = DATA_SAMPLE_FORMAT_UNPACK_FUNCTIONS[
-                self.data_encoding](self.file, npts, endian=self.endian)
+                self.data_encoding](self.file, self.npts, endian=self.endian,
+                                    out=out)
+            if self.npts != npts:
+                self.file.seek(pos + data_needed, 0)
 
     def write(self, file, data_encoding=None, endian=None):
         """
@@ -799,6 +1034,9 @@ class SEGYTrace(object):
             header = LazyTraceHeaderAttribDict(self.header.unpacked_header,
                                                self.header.endian)
         trace.stats.segy.trace_header = header
+        # Keep the on-the-fly unpacker of header only traces.
+        if headonly and hasattr(self, 'unpack_data'):
+            trace.stats.segy.unpack_data = self.unpack_data
         # The sampling rate should be set for every trace. It is a sample
         # interval in microseconds. The only sanity check is that is should be
         # larger than 0.
@@ -836,9 +1074,337 @@ class SEGYTrace(object):
             trace.stats.starttime = UTCDateTime(
                 year=year, julday=julday, hour=hour, minute=minute,
                 second=second)
+        # The samples before the time window have not been read.
+        if self.window_starttime is not None:
+            trace.stats.starttime = self.window_starttime
         return trace
 
 
+class SEGYWriter(object):
+    """
+    Writes a SEG Y file one trace at a time.
+
+    The file headers are written right away and every trace is packed and
+    written as soon as it is passed to the writer so the memory usage does
+    not depend on the number of traces. The fields of the binary file header
+    depending on the traces are filled in on :meth:`close`.
+
+    >>> import numpy as np
+    >>> from obsln.core.util.base import NamedTemporaryFile
+    >>> traces = (np.ones(10, dtype=np.float32) * i for i in range(3))
+    >>> with NamedTemporaryFile() as tf:
+    ...     with SEGYWriter(tf.name, data_encoding=5) as writer:
+    ...         writer.write_traces(traces)
+    ...     print(len(_read_segy(tf.name).traces))
+    3
+    """
+    def __init__(self, file, binary_file_header=None, textual_file_header=b'',
+                 data_encoding=None, endian='>',
+                 textual_header_encoding='ASCII'):
+        """
+        :param file: Open file like object or a string which will be assumed
+            to be a filename. The binary file header can only be updated on
+            :meth:`close` if the file is seekable.
+        :type binary_file_header: :class:`SEGYBinaryFileHeader`
+        :param binary_file_header: The binary file header. An empty one will
+            be used if not given.
+        :param textual_file_header: The textual file header.
+        :param data_encoding: The data sample format code used for all traces.
+            If None, the code in the binary file header will be used and if
+            that is not set, 1 (IBM floating points).
+        :param endian: The endianness of the file.
+        :param textual_header_encoding: The encoding of the textual header.
+            Either 'EBCDIC' or 'ASCII'.
+        """
+        if binary_file_header is None:
+            binary_file_header = SEGYBinaryFileHeader(endian=endian)
+        if data_encoding is None:
+            data_encoding = binary_file_header.data_sample_format_code
+            if data_encoding not in DATA_SAMPLE_FORMAT_PACK_FUNCTIONS:
+                data_encoding = 1
+        elif data_encoding not in DATA_SAMPLE_FORMAT_PACK_FUNCTIONS:
+            msg = 'Data sample format code %s is not supported.' % \
+                data_encoding
+            raise SEGYWritingError(msg)
+        self.binary_file_header = binary_file_header
+        self.textual_file_header = textual_file_header
+        self.textual_header_encoding = textual_header_encoding
+        self.data_encoding = data_encoding
+        self.endian = ENDIAN[endian]
+        self.trace_count = 0
+        self._sample_interval = 0
+        self._npts = 0
+        self._fixed_length = True
+        # The number of traces already in the file if appending to it.
+        self._appended_to = None
+        # The trace index of the file to update if appending to it.
+        self._index = None
+        self._index_offset = None
+        self._own_file = not hasattr(file, 'write')
+        if self._own_file:
+            file = open(file, 'wb')
+        self.file = file
+        try:
+            self._start = file.tell()
+        except (AttributeError, IOError, OSError):
+            self._start = None
+        # Write the file headers. Everything depending on the traces will be
+        # updated once all traces are written.
+        try:
+            segy_file = SEGYFile(endian=self.endian)
+            segy_file.textual_file_header = textual_file_header
+            segy_file.textual_header_encoding = textual_header_encoding
+            segy_file._write_textual_header(file)
+            self._write_binary_file_header()
+        except Exception:
+            if self._own_file:
+                file.close()
+            raise
+
+    @classmethod
+    def append(cls, file, data_encoding=None, endian=None,
+               textual_header_encoding=None):
+        """
+        Opens an existing SEG Y file to write further traces to its end.
+
+        Only the new traces are written, the existing ones are neither read
+        nor rewritten. The number of traces in the binary file header is
+        updated on :meth:`close` if it held the number of traces of the
+        whole file, as it does for files written by ObsPy.
+
+        :param file: File like object opened for reading and writing, e.g.
+            with mode ``'r+b'``, or a string which will be assumed to be a
+            filename.
+        :param data_encoding: The data sample format code of the new traces.
+            Has to be the one of the file, if None it is taken from the file.
+        :param endian: The endianness of the new traces. Has to be the one
+            of the file, if None it is taken from the file.
+        :param textual_header_encoding: The encoding of the textual header.
+            Either 'EBCDIC', 'ASCII' or None. If it is None, autodetection
+            will be attempted.
+        """
+        own_file = not hasattr(file, 'write')
+        if own_file:
+            file = open(file, 'r+b')
+        try:
+            start = file.tell()
+            segy_file = SEGYFile(
+                file, textual_header_encoding=textual_header_encoding,
+                read_traces=False)
+            if endian is not None and ENDIAN[endian] != segy_file.endian:
+                msg = ("The byte order '%s' does not match the byte order "
+                       "'%s' of the file." % (endian, segy_file.endian))
+                raise SEGYWritingError(msg)
+            if data_encoding is not None and \
+                    data_encoding != segy_file.data_encoding:
+                msg = ("The data encoding %s does not match the data "
+                       "encoding %s of the file." % (
+                           data_encoding, segy_file.data_encoding))
+                raise SEGYWritingError(msg)
+            if segy_file.data_encoding not in \
+                    DATA_SAMPLE_FORMAT_PACK_FUNCTIONS:
+                msg = 'Data sample format code %s is not supported.' % \
+                    segy_file.data_encoding
+                raise SEGYWritingError(msg)
+            # The index has to be checked before the file is modified.
+            index = _valid_trace_index(file, segy_file.endian,
+                                       segy_file.data_encoding)
+            npts = _count_fixed_length_traces(
+                file, DATA_SAMPLE_FORMAT_SAMPLE_SIZE[segy_file.data_encoding],
+                segy_file.endian)
+            file.seek(0, 2)
+        except Exception:
+            if own_file:
+                file.close()
+            raise
+        writer = cls.__new__(cls)
+        writer.binary_file_header = segy_file.binary_file_header
+        writer.textual_file_header = segy_file.textual_file_header
+        writer.textual_header_encoding = segy_file.textual_header_encoding
+        writer.data_encoding = segy_file.data_encoding
+        writer.endian = segy_file.endian
+        writer.trace_count, writer._npts = npts
+        writer._sample_interval = \
+            writer.binary_file_header.sample_interval_in_microseconds
+        writer._fixed_length = writer._npts is not None
+        writer._own_file = own_file
+        writer.file = file
+        writer._start = start
+        writer._appended_to = writer.trace_count
+        writer._index = index
+        writer._index_offset = file.tell()
+        return writer
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __str__(self):
+        return '%i traces written to the SEG Y file.' % self.trace_count
+
+    def _repr_pretty_(self, p, cycle):
+        p.text(str(self))
+
+    def _write_binary_file_header(self):
+        if self._appended_to is not None:
+            self._update_appended_binary_file_header()
+            self.binary_file_header.write(self.file, endian=self.endian)
+            return
+        _complete_binary_file_header(
+            self.binary_file_header, self.trace_count, self._sample_interval,
+            self._npts, self._fixed_length, data_encoding=self.data_encoding)
+        self.binary_file_header.write(self.file, endian=self.endian)
+
+    def _update_appended_binary_file_header(self):
+        """
+        Updates the fields of the binary file header of a file opened with
+        :meth:`append` depending on the traces. All other fields, e.g. the
+        number of extended textual headers, stay as they are in the file.
+        """
+        header = self.binary_file_header
+        if header.number_of_data_traces_per_ensemble == self._appended_to:
+            header.number_of_data_traces_per_ensemble = \
+                self.trace_count if self.trace_count <= 32767 else 0
+        if not self._fixed_length:
+            header.fixed_length_trace_flag = 0
+
+    def write_trace(self, trace):
+        """
+        Packs a single trace and writes it to the end of the file.
+
+        :param trace: Either a :class:`SEGYTrace`, an ObsPy
+            :class:`~obspy.core.trace.Trace` or a NumPy array with the
+            samples of a trace without any header values.
+        """
+        if self.file is None:
+            msg = 'The SEG Y writer has already been closed.'
+            raise SEGYWritingError(msg)
+        if isinstance(trace, Trace):
+            # Import here to avoid circular imports.
+            from .core import _segy_trace_from_obspy_trace
+            trace = _segy_trace_from_obspy_trace(trace, self.data_encoding,
+                                                 self.endian)
+        elif not isinstance(trace, SEGYTrace):
+            data = trace
+            trace = SEGYTrace(data_encoding=self.data_encoding,
+                              endian=self.endian)
+            trace.data = data
+            trace.header.trace_sequence_number_within_line = \
+                self.trace_count + 1
+            trace.header.trace_sequence_number_within_segy_file = \
+                self.trace_count + 1
+            trace.header.sample_interval_in_ms_for_this_trace = \
+                self.binary_file_header.sample_interval_in_microseconds
+        npts = len(trace.data)
+        if not self.trace_count:
+            self._sample_interval = \
+                trace.header.sample_interval_in_ms_for_this_trace
+            self._npts = npts
+        elif npts != self._npts:
+            self._fixed_length = False
+        trace.write(self.file, data_encoding=self.data_encoding,
+                    endian=self.endian)
+        self.trace_count += 1
+
+    def write_traces(self, traces):
+        """
+        Writes all traces of an iterable, e.g. a generator or a Stream.
+        """
+        for trace in traces:
+            self.write_trace(trace)
+
+    def write_block(self, data, headers=None):
+        """
+        Packs a block of traces of the same length and writes them with a
+        single write call.
+
+        :type data: :class:`numpy.ndarray`
+        :param data: Two dimensional array with one trace per row. The dtype
+            has to fit the data encoding just like for single traces.
+        :type headers: dict
+        :param headers: Trace header values as one sequence with a value per
+            trace or a single value for all traces per header key, e.g. a
+            table returned by
+            :func:`~obsln.io.segy.segy.read_segy_header_table`. The trace
+            sequence numbers, the number of samples and the sample interval
+            are set if not given.
+        """
+        if self.file is None:
+            msg = 'The SEG Y writer has already been closed.'
+            raise SEGYWritingError(msg)
+        if data.ndim != 2:
+            msg = 'The block of traces has to be a two dimensional array.'
+            raise ValueError(msg)
+        count, npts = data.shape
+        if not count:
+            return
+        if self.data_encoding == 1:
+            if data.dtype != np.float64 and data.dtype != np.float32:
+                raise WrongDtypeException
+            data = ieee_to_ibm(data)
+        elif data.dtype != DATA_SAMPLE_FORMAT_CODE_DTYPE[self.data_encoding]:
+            raise WrongDtypeException
+        table = {
+            'trace_sequence_number_within_line':
+                np.arange(self.trace_count + 1, self.trace_count + count + 1),
+            'number_of_samples_in_this_trace': npts,
+            'sample_interval_in_ms_for_this_trace':
+                self.binary_file_header.sample_interval_in_microseconds}
+        table['trace_sequence_number_within_segy_file'] = \
+            table['trace_sequence_number_within_line']
+        table.update(headers or {})
+        records = np.empty(count, dtype=[
+            ('header', trace_header_dtype(self.endian)),
+            ('data', _sample_dtype(self.data_encoding, self.endian),
+             (npts,))])
+        records['header'] = pack_trace_header_table(table, self.endian,
+                                                    count=count)
+        records['data'] = data
+        if not self.trace_count:
+            self._sample_interval = \
+                records['header']['sample_interval_in_ms_for_this_trace'][0]
+            self._npts = npts
+        elif npts != self._npts:
+            self._fixed_length = False
+        self.file.write(records.view(np.uint8))
+        self.trace_count += count
+
+    def close(self):
+        """
+        Fills in the binary file header and closes the file if it has been
+        opened by the writer.
+
+        The trace index of a file that has been appended to is updated if
+        it was valid before appending, see :mod:`obsln.io.segy.index`.
+        """
+        if self.file is None:
+            return
+        if self._start is not None and \
+                self.trace_count != (self._appended_to or 0) and \
+                getattr(self.file, 'seekable', lambda: True)():
+            end = self.file.tell()
+            self.file.seek(self._start + 3200, 0)
+            self._write_binary_file_header()
+            self.file.seek(end, 0)
+        index, self._index = self._index, None
+        if index is not None:
+            filename = self.file.name
+            self.file.flush()
+            end = self.file.tell()
+            self.file.seek(self._index_offset, 0)
+            columns, offsets, npts = _scan_trace_table(
+                self.file, DATA_SAMPLE_FORMAT_SAMPLE_SIZE[self.data_encoding],
+                self.endian, keys=list(index.columns))
+            self.file.seek(end, 0)
+        if self._own_file:
+            self.file.close()
+        self.file = None
+        if index is not None:
+            _extend_trace_index(filename, index, columns, offsets, npts)
+
+
 class SEGYTraceHeader(object):
     """
     Convenience class that handles reading and writing of the trace headers.
@@ -902,6 +1468,51 @@ class SEGYTraceHeader(object):
         """
         if endian is None:
             endian = self.endian
+        compiled = trace_header_struct(endian)
+        if compiled is not None:
+            try:
+                file.write(compiled[0].pack(*self._packable_values(
+                    compiled)))
+                return
+            except struct_error:
+                # Go through the fields one by one to raise the error of the
+                # offending one.
+                pass
+        self._write_field_by_field(file, endian)
+
+    def pack_into(self, buffer, offset=0, endian=None):
+        """
+        Packs the complete header into a writable buffer at the given offset.
+
+        Meant to be used with a reusable buffer when writing lots of traces.
+        """
+        if endian is None:
+            endian = self.endian
+        compiled = trace_header_struct(endian)
+        if compiled is None:
+            buf = io.BytesIO()
+            self._write_field_by_field(buf, endian)
+            buffer[offset:offset + 240] = buf.getvalue()
+            return
+        compiled[0].pack_into(buffer, offset,
+                              *self._packable_values(compiled))
+
+    def _packable_values(self, compiled):
+        """
+        Returns the header values in the order of a compiled trace header
+        struct.
+        """
+        values = [getattr(self, name) for name in compiled[1]]
+        # An empty unassigned field will have a zero.
+        for index in compiled[2]:
+            if not isinstance(values[index], bytes) and values[index] == 0:
+                values[index] = b''
+        return values
+
+    def _write_field_by_field(self, file, endian):
+        """
+        Packs and writes every header value on its own.
+        """
         for item in TRACE_HEADER_FORMAT:
 
             length, name, special_format, _ = item
@@ -979,190 +1590,2042 @@ class SEGYTraceHeader(object):
             setattr(self, field[1], 0)
 
 
-def _read_segy(file, endian=None, 
-               textual_header_encoding=None,
-               data_encoding=None,force_trace_length=None,
-               unpack_headers=False, 
-               headonly=False):
+class SEGYMemmapFile(object):
     """
-    Reads a SEG Y file and returns a SEGYFile object.
+    Memory mapped view of a SEG Y file in which all traces have the same
+    length.
 
-    :param file: Open file like object or a string which will be assumed to be
-        a filename.
-    :type endian: str
-    :param endian: String that determines the endianness of the file. Either
-        '>' for big endian or '<' for little endian. If it is None,
-        obspy.io.segy will try to autodetect the endianness. The endianness
-        is always valid for the whole file.
-    :param textual_header_encoding: The encoding of the textual header.
-        Either 'EBCDIC', 'ASCII' or None. If it is None, autodetection will
-        be attempted.
-    :type unpack_headers: bool
-    :param unpack_headers: Determines whether or not all headers will be
-        unpacked during reading the file. Has a huge impact on the memory usage
-        and the performance. They can be unpacked on-the-fly after being read.
-        Defaults to False.
-    :type headonly: bool
-    :param headonly: Determines whether or not the actual data records will be
-        read and unpacked. Has a huge impact on memory usage. Data will not be
-        unpackable on-the-fly after reading the file. Defaults to False.
+    The file is mapped as an array of records, each one being the 240 byte
+    trace header followed by the samples of that trace. Nothing is read
+    before it is accessed so only the touched pages of the file will ever
+    end up in memory.
     """
-    
-    # Open the file if it is not a file like object.
-    if not hasattr(file, 'read') or not hasattr(file, 'tell') or not \
-            hasattr(file, 'seek'):
-        with open(file, 'rb') as open_file:
-            return _internal_read_segy(
-                open_file, endian=endian,
-                data_encoding=data_encoding,force_trace_length=force_trace_length,
+    def __init__(self, filename, endian=None, textual_header_encoding=None,
+                 data_encoding=None, force_trace_length=None, mode='r'):
+        """
+        :type filename: str
+        :param filename: Name of the SEG Y file.
+        :param endian: The endianness of the file. If None, autodetection will
+            be used.
+        :param textual_header_encoding: The encoding of the textual header.
+            Either 'EBCDIC', 'ASCII' or None. If it is None, autodetection will
+            be attempted.
+        :type data_encoding: int
+        :param data_encoding: Enforces the data sample format code instead of
+            the one given in the binary file header.
+        :type force_trace_length: int
+        :param force_trace_length: Enforces the number of samples per trace
+            instead of the one given in the header of the first trace.
+        :type mode: str
+        :param mode: The mode the file is mapped with, see
+            :class:`numpy.memmap`. Defaults to ``'r'`` (read only).
+        """
+        self.filename = filename
+        with open(filename, 'rb') as file:
+            segy_file = SEGYFile(
+                file, endian=endian,
                 textual_header_encoding=textual_header_encoding,
-                unpack_headers=unpack_headers, headonly=headonly)
-    # Otherwise just read it.
+                data_encoding=data_encoding,
+                force_trace_length=force_trace_length, read_traces=False)
+            offset = file.tell()
+            filesize = os.fstat(file.fileno())[6]
+            first_header = file.read(240)
+        self.endian = segy_file.endian
+        self.textual_file_header = segy_file.textual_file_header
+        self.textual_header_encoding = segy_file.textual_header_encoding
+        self.binary_file_header = segy_file.binary_file_header
+        self.data_encoding = segy_file.data_encoding
+
+        if len(first_header) != 240:
+            msg = 'The trace header needs to be 240 bytes long'
+            raise SEGYTraceHeaderTooSmallError(msg)
+        if force_trace_length is not None:
+            npts = force_trace_length
+        else:
+            npts = SEGYTraceHeader(
+                first_header, endian=self.endian).number_of_samples_in_this_trace
+        self.npts = npts
 
-    return _internal_read_segy(file, endian=endian,
-                               textual_header_encoding=textual_header_encoding,
-                               data_encoding=data_encoding,force_trace_length=force_trace_length,
-                               unpack_headers=unpack_headers,
-                               headonly=headonly)
+        self.record_dtype = np.dtype([
+            ('header', np.void, 240),
+            ('data', _sample_dtype(self.data_encoding, self.endian),
+             (npts,))])
+        ntraces, remainder = divmod(filesize - offset,
+                                    self.record_dtype.itemsize)
+        if npts < 1 or ntraces < 1 or remainder:
+            msg = ("The file does not consist of traces with a fixed length "
+                   "of %i samples and can not be memory mapped. Please read "
+                   "it with _read_segy() instead." % npts)
+            raise SEGYError(msg)
+        self.offset = offset
+        self.records = np.memmap(filename, dtype=self.record_dtype,
+                                 mode=mode, offset=offset, shape=(ntraces,))
+        # The sizes add up but the last trace is a cheap extra check that the
+        # trace length really is fixed.
+        if force_trace_length is None and \
+                self.trace_header(-1).number_of_samples_in_this_trace != npts:
+            msg = ("The number of samples of the last trace differs from the "
+                   "first one. Please read the file with _read_segy() "
+                   "instead.")
+            raise SEGYError(msg)
+
+    def __str__(self):
+        """
+        Prints some information about the SEG Y file.
+        """
+        return '%i traces with %i samples in the memory mapped SEG Y file.' \
+            % (len(self), self.npts)
 
+    def _repr_pretty_(self, p, cycle):
+        p.text(str(self))
 
-def _internal_read_segy(file, endian=None, textual_header_encoding=None,
-                        data_encoding=None,force_trace_length=None,
-                        unpack_headers=False, headonly=False):
-    """
-    Reads on open file object and returns a SEGYFile object.
+    def __len__(self):
+        return len(self.records)
 
-    :param file: Open file like object.
-    :type endian: str
-    :param endian: String that determines the endianness of the file. Either
-        '>' for big endian or '<' for little endian. If it is None,
-        obspy.io.segy will try to autodetect the endianness. The endianness
-        is always valid for the whole file.
-    :param textual_header_encoding: The encoding of the textual header.
-        Either 'EBCDIC', 'ASCII' or None. If it is None, autodetection will
-        be attempted.
-    :type unpack_headers: bool
-    :param unpack_headers: Determines whether or not all headers will be
-        unpacked during reading the file. Has a huge impact on the memory usage
-        and the performance. They can be unpacked on-the-fly after being read.
-        Defaults to False.
-    :type headonly: bool
-    :param headonly: Determines whether or not the actual data records will be
-        read and unpacked. Has a huge impact on memory usage. Data will not be
-        unpackable on-the-fly after reading the file. Defaults to False.
-    """
-    
-    return SEGYFile(file, endian=endian,
-                    textual_header_encoding=textual_header_encoding,
-                    data_encoding=data_encoding,force_trace_length=force_trace_length,
-                    unpack_headers=unpack_headers, headonly=headonly)
+    @property
+    def data(self):
+        """
+        The samples of all traces as a ``(ntraces, npts)`` array.
 
+        For integer and IEEE floating point encodings this is a view of the
+        mapped file without any copies (in the byte order of the file). IBM
+        floating points are only converted for the slices that are accessed.
+        """
+        if self.data_encoding == 1:
+            return LazyIBMArray(self.records['data'])
+        return self.records['data']
 
-def iread_segy(file, endian=None, textual_header_encoding=None,
-               unpack_headers=False, headonly=False):
-    """
-    Iteratively read a SEG-Y field and yield single ObsPy Traces.
+    def trace_header(self, index):
+        """
+        Returns the :class:`SEGYTraceHeader` of the trace at the given index.
+        """
+        return SEGYTraceHeader(self.records['header'][index].tobytes(),
+                               endian=self.endian)
 
-    The function iteratively loops over the whole file and yields single
-    ObsPy Traces. The next Trace will be read after the current loop has
-    finished - this function is thus suitable for reading arbitrarily large
-    SEG-Y files without running into memory problems.
+    def header_table(self, keys=None):
+        """
+        Unpacks the trace headers of all traces at once.
 
-    >>> from obspy.core.util import get_example_file
-    >>> filename = get_example_file("00001034.sgy_first_trace")
-    >>> from obspy.io.segy.segy import iread_segy
-    >>> for tr in iread_segy(filename):
-    ...     # Each Trace's stats attribute will have references to the file
-    ...     # headers and some more information.
-    ...     tf = tr.stats.segy.textual_file_header
-    ...     bf = tr.stats.segy.binary_file_header
-    ...     tfe = tr.stats.segy.textual_file_header_encoding
-    ...     de = tr.stats.segy.data_encoding
-    ...     e = tr.stats.segy.endian
-    ...     # Also do something meaningful with each Trace.
-    ...     print(int(tr.data.sum() * 1E9))
-    -5
+        :type keys: list of str
+        :param keys: The header keys to unpack. Defaults to all keys.
+        :rtype: dict
+        :returns: Dictionary with one array per header key.
+        """
+        return unpack_trace_header_table(self.records['header'], self.endian,
+                                         keys=keys)
 
-    :param file: Open file like object or a string which will be assumed to be
-        a filename.
-    :type endian: str
-    :param endian: String that determines the endianness of the file. Either
-        '>' for big endian or '<' for little endian. If it is None,
-        obspy.io.segy will try to autodetect the endianness. The endianness
-        is always valid for the whole file.
-    :param textual_header_encoding: The encoding of the textual header.
-        Either 'EBCDIC', 'ASCII' or None. If it is None, autodetection will
-        be attempted.
-    :type unpack_headers: bool
-    :param unpack_headers: Determines whether or not all headers will be
-        unpacked during reading the file. Has a huge impact on the memory usage
-        and the performance. They can be unpacked on-the-fly after being read.
-        Defaults to False.
-    :type headonly: bool
-    :param headonly: Determines whether or not the actual data records will be
-        read and unpacked. Has a huge impact on memory usage. Data will not be
-        unpackable on-the-fly after reading the file. Defaults to False.
-    """
-    # Open the file if it is not a file like object.
-    if not hasattr(file, 'read') or not hasattr(file, 'tell') or not \
-            hasattr(file, 'seek'):
-        with open(file, 'rb') as open_file:
-            for tr in _internal_iread_segy(
-                    open_file, endian=endian,
-                    textual_header_encoding=textual_header_encoding,
-                    unpack_headers=unpack_headers, headonly=headonly):
-                yield tr
-            return
-    # Otherwise just read it.
-    for tr in _internal_iread_segy(
-            file, endian=endian,
-            textual_header_encoding=textual_header_encoding,
-            unpack_headers=unpack_headers, headonly=headonly):
-        yield tr
+    def refresh(self):
+        """
+        Maps the file again if traces have been appended to it, e.g. with
+        :meth:`SEGYWriter.append`, and returns the number of new traces.
 
+        Changes to a copy-on-write mapping (mode ``'c'``) are lost.
+        """
+        filesize = os.path.getsize(self.filename)
+        ntraces, remainder = divmod(filesize - self.offset,
+                                    self.record_dtype.itemsize)
+        if remainder:
+            msg = ("The file does not consist of traces with a fixed length "
+                   "of %i samples anymore." % self.npts)
+            raise SEGYError(msg)
+        count = ntraces - len(self.records)
+        if count:
+            mode = self.records.mode
+            if mode != 'r':
+                self.records.flush()
+            # Never truncate the file again.
+            if mode == 'w+':
+                mode = 'r+'
+            self.records = np.memmap(self.filename, dtype=self.record_dtype,
+                                     mode=mode, offset=self.offset,
+                                     shape=(ntraces,))
+        return count
+
+    def close(self):
+        """
+        Flushes any changes and drops the reference to the mapped file.
+        """
+        if self.records is not None:
+            if self.records.mode != 'r':
+                self.records.flush()
+            self.records = None
 
-def _internal_iread_segy(file, endian=None, textual_header_encoding=None,
-                         unpack_headers=False, headonly=False):
-    """
-    Iteratively read a SEG-Y field and yield single ObsPy Traces.
-    """
-    segy_file = SEGYFile(
-        file, endian=endian, textual_header_encoding=textual_header_encoding,
-        unpack_headers=unpack_headers, headonly=headonly, read_traces=False)
-    for trace in segy_file._read_traces(unpack_headers=unpack_headers,
-                                        headonly=headonly,
-                                        yield_each_trace=True):
-        tr = trace.to_obspy_trace(unpack_trace_headers=unpack_headers,
-                                  headonly=headonly)
-        # Fill stats that are normally attached to the stream stats.
-        tr.stats.segy.textual_file_header = segy_file.textual_file_header
-        tr.stats.segy.binary_file_header = segy_file.binary_file_header
-        tr.stats.segy.textual_file_header_encoding = \
-            segy_file.textual_header_encoding.upper()
-        tr.stats.segy.data_encoding = trace.data_encoding
-        tr.stats.segy.endian = trace.endian
-        tr.stats._format = "SEGY"
-        yield tr
 
+# Pairs of trace header keys commonly holding the inline and crossline
+# numbers of post-stack volumes in the order they are tried in.
+CUBE_GEOMETRY_KEYS = [
+    ('for_3d_poststack_data_this_field_is_for_in_line_number',
+     'for_3d_poststack_data_this_field_is_for_cross_line_number'),
+    ('original_field_record_number', 'ensemble_number'),
+    ('energy_source_point_number', 'ensemble_number'),
+]
 
-def iread_su(file, endian=None, unpack_headers=False, headonly=False):
+
+class SEGYCube(object):
     """
-    Iteratively read a SU field and yield single ObsPy Traces.
+    Inline by crossline by sample view of a post-stack SEG Y volume.
 
-    The function iteratively loops over the whole file and yields single
-    ObsPy Traces. The next Trace will be read after the current loop has
-    finished - this function is thus suitable for reading arbitrarily large
-    SU files without running into memory problems.
+    The inline and crossline numbers of all traces are read from the trace
+    headers at once to build a lookup table from the position in the cube
+    to the trace in the file. The samples themselves are only read when the
+    cube is indexed and only the requested ones, e.g. a time slice reads a
+    single sample of every trace::
 
-    >>> from obspy.core.util import get_example_file
-    >>> filename = get_example_file("1.su_first_trace")
-    >>> from obspy.io.segy.segy import iread_su
-    >>> for tr in iread_su(filename):
-    ...     # Each Trace's stats attribute will have some file-wide
-    ...     # information.
-    ...     de = tr.stats.su.data_encoding
-    ...     e = tr.stats.su.endian
-    ...     # Also do something meaningful with each Trace.
+        >>> cube = SEGYCube('/path/to/volume.sgy')  # doctest: +SKIP
+        >>> cube.shape  # doctest: +SKIP
+        (n_inlines, n_crosslines, n_samples)
+        >>> time_slice = cube[:, :, 100]  # doctest: +SKIP
+        >>> inline = cube.inline(1234)  # doctest: +SKIP
+
+    Positions without a trace in the file are filled with zeros.
+    """
+    def __init__(self, filename, inline_key=None, crossline_key=None,
+                 endian=None, textual_header_encoding=None,
+                 data_encoding=None):
+        """
+        :type filename: str
+        :param filename: Name of the SEG Y file. All traces need to have the
+            same length, see :class:`SEGYMemmapFile`.
+        :type inline_key: str
+        :param inline_key: The trace header key of the inline numbers.
+        :type crossline_key: str
+        :param crossline_key: The trace header key of the crossline numbers.
+            If neither key is given, the first pair of
+            :const:`CUBE_GEOMETRY_KEYS` that identifies every trace is used.
+        :param endian: The endianness of the file. If None, autodetection will
+            be used.
+        :param textual_header_encoding: The encoding of the textual header.
+            Either 'EBCDIC', 'ASCII' or None. If it is None, autodetection will
+            be attempted.
+        :type data_encoding: int
+        :param data_encoding: Enforces the data sample format code instead of
+            the one given in the binary file header.
+        """
+        self.segy = SEGYMemmapFile(
+            filename, endian=endian,
+            textual_header_encoding=textual_header_encoding,
+            data_encoding=data_encoding)
+        if inline_key is None and crossline_key is None:
+            candidates = CUBE_GEOMETRY_KEYS
+        elif inline_key is None or crossline_key is None:
+            msg = 'Either both or none of the keys have to be given.'
+            raise SEGYError(msg)
+        else:
+            candidates = [(inline_key, crossline_key)]
+        table = self.segy.header_table(
+            keys=sorted({key for pair in candidates for key in pair}))
+        for inline_key, crossline_key in candidates:
+            geometry = _infer_cube_geometry(table[inline_key],
+                                            table[crossline_key])
+            if geometry is not None:
+                break
+        else:
+            msg = ('Unable to determine the inline and crossline numbers of '
+                   'the traces. Please specify the header keys.')
+            raise SEGYError(msg)
+        self.inline_key = inline_key
+        self.crossline_key = crossline_key
+        self.inlines, self.crosslines, self.trace_index, self.sorting = \
+            geometry
+
+    def __str__(self):
+        """
+        Prints some information about the cube.
+        """
+        return ('%i inlines x %i crosslines x %i samples cube of %i traces '
+                'sorted by %s.' % (self.shape + (len(self.segy),
+                                                 self.sorting)))
+
+    def _repr_pretty_(self, p, cycle):
+        p.text(str(self))
+
+    @property
+    def shape(self):
+        return (len(self.inlines), len(self.crosslines), self.segy.npts)
+
+    def __getitem__(self, index):
+        """
+        Reads the samples at the given indices of the cube.
+
+        Any index NumPy supports for the first two axes and integers or
+        slices for the sample axis are allowed.
+        """
+        if not isinstance(index, tuple):
+            index = (index,)
+        if len(index) > 3:
+            raise IndexError('The cube only has three dimensions.')
+        index = index + (slice(None),) * (3 - len(index))
+        traces = self.trace_index[index[0], index[1]]
+        missing = traces < 0
+        # Selecting the samples first keeps the memory map a strided view
+        # so only the requested samples of the requested traces are read.
+        data = self.segy.records['data'][:, index[2]]
+        data = data[np.where(missing, 0, traces)]
+        if self.segy.data_encoding == 1:
+            data = ibm_to_ieee(data)
+        else:
+            data = data.astype(data.dtype.newbyteorder('='))
+        if np.any(missing):
+            data[missing] = 0
+        return data
+
+    def inline(self, number):
+        """
+        Returns the ``(n_crosslines, n_samples)`` array of an inline number.
+        """
+        return self[self._position(self.inlines, number, 'Inline')]
+
+    def crossline(self, number):
+        """
+        Returns the ``(n_inlines, n_samples)`` array of a crossline number.
+        """
+        return self[:, self._position(self.crosslines, number, 'Crossline')]
+
+    def time_slice(self, index):
+        """
+        Returns the ``(n_inlines, n_crosslines)`` array of a sample index.
+        """
+        return self[:, :, index]
+
+    def _position(self, numbers, number, name):
+        position = np.searchsorted(numbers, number)
+        if position >= len(numbers) or numbers[position] != number:
+            raise KeyError('%s %s is not part of the cube.' % (name, number))
+        return int(position)
+
+    def close(self):
+        """
+        Drops the reference to the mapped file.
+        """
+        self.segy.close()
+
+
+def _infer_cube_geometry(inline_numbers, crossline_numbers):
+    """
+    Builds the lookup table of a cube from the inline and crossline numbers
+    of all traces.
+
+    :returns: The sorted unique inline and crossline numbers, an array of
+        shape ``(n_inlines, n_crosslines)`` with the index of the trace at
+        every position (-1 if there is none) and whether the traces are
+        sorted by ``'inline'`` (crosslines varying fastest) or by
+        ``'crossline'``. None if the numbers do not identify every trace.
+    """
+    inlines, inline_index = np.unique(inline_numbers, return_inverse=True)
+    crosslines, crossline_index = np.unique(crossline_numbers,
+                                            return_inverse=True)
+    if len(inline_numbers) > 1 and len(inlines) == 1 and \
+            len(crosslines) == 1:
+        return None
+    trace_index = np.full((len(inlines), len(crosslines)), -1,
+                          dtype=np.int64)
+    trace_index[inline_index, crossline_index] = \
+        np.arange(len(inline_numbers))
+    # Every trace needs a position of its own.
+    if np.count_nonzero(trace_index >= 0) != len(inline_numbers):
+        return None
+    if np.count_nonzero(np.diff(inline_numbers)) <= \
+            np.count_nonzero(np.diff(crossline_numbers)):
+        sorting = 'inline'
+    else:
+        sorting = 'crossline'
+    return inlines, crosslines, trace_index, sorting
+
+
+def _sample_dtype(data_encoding, endian):
+    """
+    Returns the dtype of a single sample as it is stored on disk.
+
+    IBM floating points are returned as 4 byte unsigned integers as NumPy has
+    no notion of them.
+    """
+    if data_encoding == 1:
+        return np.dtype(np.uint32).newbyteorder(endian)
+    try:
+        dtype = DATA_SAMPLE_FORMAT_CODE_DTYPE[data_encoding]
+    except KeyError:
+        msg = 'Data sample format code %s is not supported.' % data_encoding
+        raise NotImplementedError(msg)
+    return np.dtype(dtype).newbyteorder(endian)
+
+
+def _get_filesize(file):
+    """
+    Determines the size of an open file like object.
+    """
+    if isinstance(file, io.BytesIO):
+        pos = file.tell()
+        file.seek(0, 2)
+        filesize = file.tell()
+        file.seek(pos, 0)
+        return filesize
+    return os.fstat(file.fileno())[6]
+
+
+def _trace_header_starttime(header):
+    """
+    Returns the start time stored in a trace header.
+
+    Two digit years and a missing day of year are handled in the same way
+    as in :meth:`SEGYTrace.to_obspy_trace`. If no year is set,
+    ``UTCDateTime(0)`` is returned.
+    """
+    year = header.year_data_recorded
+    if year <= 0:
+        return UTCDateTime(0)
+    if year < 100:
+        if year < 30:
+            year += 2000
+        else:
+            year += 1900
+    julday = header.day_of_year
+    hour = header.hour_of_day
+    minute = header.minute_of_hour
+    second = header.second_of_minute
+    if julday == 0 and hour == 0 and minute == 0 and second == 0:
+        julday = 1
+    return UTCDateTime(year=year, julday=julday, hour=hour, minute=minute,
+                       second=second)
+
+
+def _trace_header_delta(header):
+    """
+    Returns the sample interval in seconds stored in a trace header or the
+    default sample interval of a Trace if it is not set.
+    """
+    if header.sample_interval_in_ms_for_this_trace > 0:
+        return float(header.sample_interval_in_ms_for_this_trace) / 1E6
+    return 1.0
+
+
+def _number_of_samples_key():
+    """
+    Returns the trace header key holding the number of samples.
+
+    Honors a 'number_of_samples_in_this_trace_override' key in the same way
+    :meth:`SEGYTrace._read_trace` does.
+    """
+    if 'number_of_samples_in_this_trace_override' in TRACE_HEADER_KEYS:
+        return 'number_of_samples_in_this_trace_override'
+    return 'number_of_samples_in_this_trace'
+
+
+def _unpack_number_of_samples(header, endian):
+    """
+    Unpacks the number of samples from a packed trace header.
+    """
+    length, _, special_format, start = \
+        TRACE_HEADER_FORMAT[TRACE_HEADER_KEYS.index(_number_of_samples_key())]
+    return unpack_header_value(endian, header[start:start + length], length,
+                               special_format)
+
+
+def _count_fixed_length_traces(file, sample_size, endian):
+    """
+    Counts the traces starting at the current file pointer position.
+
+    Only the first and the last trace header are read if the size of the
+    file is a multiple of the length of the first trace, all trace headers
+    otherwise.
+
+    :returns: The number of traces and their number of samples or None if
+        it is not the same for all of them.
+    """
+    pos = file.tell()
+    filesize = _get_filesize(file)
+    first_header = file.read(240)
+    file.seek(pos, 0)
+    if len(first_header) != 240:
+        return 0, None
+    npts = _unpack_number_of_samples(first_header, endian)
+    record_size = 240 + npts * sample_size
+    ntraces, remainder = divmod(filesize - pos, record_size)
+    if npts > 0 and not remainder:
+        file.seek(pos + (ntraces - 1) * record_size, 0)
+        last_header = file.read(240)
+        file.seek(pos, 0)
+        if _unpack_number_of_samples(last_header, endian) == npts:
+            return int(ntraces), int(npts)
+    _, _, npts = _scan_traces(file, sample_size, endian, filesize)
+    if len(set(npts)) == 1:
+        return len(npts), npts[0]
+    return len(npts), None
+
+
+def _scan_traces(file, sample_size, endian, filesize=None):
+    """
+    Walks over all traces starting at the current file pointer position and
+    collects the packed trace headers without reading any data.
+
+    :returns: The packed trace headers as one bytes object, the byte offset
+        of every trace and the number of samples of every trace.
+    """
+    if filesize is None:
+        filesize = _get_filesize(file)
+    headers = []
+    offsets = []
+    npts = []
+    pos = file.tell()
+    while True:
+        header = file.read(240)
+        if len(header) != 240:
+            break
+        count = _unpack_number_of_samples(header, endian)
+        end = pos + 240 + count * sample_size
+        if count < 1 or end > filesize:
+            msg = """
+                  Too little data left in the file to unpack it according to
+                  its trace header. This is most likely either due to a wrong
+                  byte order or a corrupt file.
+                  """.strip()
+            raise SEGYTraceReadingError(msg)
+        headers.append(header)
+        offsets.append(pos)
+        npts.append(count)
+        pos = end
+        file.seek(pos, 0)
+    return b''.join(headers), offsets, npts
+
+
+def _scan_trace_table(file, sample_size, endian, keys=None):
+    """
+    Unpacks the trace headers of all traces starting at the current file
+    pointer position and determines where every trace is located.
+
+    Files with a fixed trace length on disk are memory mapped so only the
+    header bytes are touched, all others are walked trace by trace. The
+    unpacking always happens in one go.
+
+    :returns: The header table, the byte offset of every trace and the
+        number of samples of every trace as NumPy arrays.
+    """
+    pos = file.tell()
+    filesize = _get_filesize(file)
+    first_header = file.read(240)
+    file.seek(pos, 0)
+    if len(first_header) != 240:
+        return (unpack_trace_header_table(b'', endian, keys=keys),
+                np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+    npts = _unpack_number_of_samples(first_header, endian)
+    record_size = 240 + npts * sample_size
+    ntraces, remainder = divmod(filesize - pos, record_size)
+    if npts > 0 and not remainder and not isinstance(file, io.BytesIO):
+        records = np.memmap(file, mode='r', offset=pos, shape=(ntraces,),
+                            dtype=[('header', np.void, 240),
+                                   ('data', np.void, npts * sample_size)])
+        table = unpack_trace_header_table(records['header'], endian,
+                                          keys=keys)
+        # Only trust the fixed length if every single header agrees.
+        key = _number_of_samples_key()
+        counts = table[key] if key in table else unpack_trace_header_table(
+            records['header'], endian, keys=[key])[key]
+        if np.all(counts == npts):
+            offsets = pos + record_size * np.arange(ntraces, dtype=np.int64)
+            return table, offsets, np.full(ntraces, npts, dtype=np.int64)
+        file.seek(pos, 0)
+    headers, offsets, npts = _scan_traces(file, sample_size, endian, filesize)
+    return (unpack_trace_header_table(headers, endian, keys=keys),
+            np.array(offsets, dtype=np.int64), np.array(npts, dtype=np.int64))
+
+
+def _scan_fixed_length_traces(file, sample_size, endian, npts=None,
+                              block_size=65536):
+    """
+    Finds all traces with npts samples starting at the current file pointer
+    position and skips everything else.
+
+    The number of samples in the trace headers is checked for blocks of
+    traces at once in a memory map of the file. At a trace header with a
+    wrong number of samples the file is searched for the next position at
+    which it and the header one trace length further on are correct, so the
+    whole file is only passed once.
+
+    :type npts: int
+    :param npts: The expected number of samples of every trace. Defaults to
+        the one of the first trace header.
+    :type block_size: int
+    :param block_size: The number of trace headers checked at once.
+    :returns: The byte offsets of all good traces as a NumPy array and a
+        list of ``(start, end)`` tuples of all skipped byte ranges.
+    """
+    # Import here as it is only needed for scanning.
+    import mmap
+
+    pos = file.tell()
+    filesize = _get_filesize(file)
+    if not npts:
+        first_header = file.read(240)
+        file.seek(pos, 0)
+        if len(first_header) != 240:
+            return np.zeros(0, dtype=np.int64), []
+        npts = _unpack_number_of_samples(first_header, endian)
+    length, _, special_format, start = \
+        TRACE_HEADER_FORMAT[TRACE_HEADER_KEYS.index(_number_of_samples_key())]
+    if not special_format:
+        special_format = {2: 'h', 4: 'i'}[length]
+    fmt = ('%s%s' % (endian, special_format)).encode('ascii', 'strict')
+    pattern = pack(fmt, npts)
+    record_size = 240 + npts * sample_size
+    if isinstance(file, io.BytesIO):
+        return _scan_fixed_length_buffer(
+            file.getvalue(), pos, filesize, record_size, start, pattern,
+            block_size)
+    data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return _scan_fixed_length_buffer(data, pos, filesize, record_size,
+                                         start, pattern, block_size)
+    finally:
+        data.close()
+
+
+def _scan_fixed_length_buffer(data, pos, size, record_size, field_start,
+                              pattern, block_size):
+    """
+    Does the work of :func:`_scan_fixed_length_traces` on a bytes object or
+    memory map.
+
+    :param field_start: Byte offset of the number of samples in a trace
+        header.
+    :param pattern: The packed number of samples every header has to have.
+    """
+    expected = np.frombuffer(pattern, dtype=np.uint8)
+    offsets = [np.zeros(0, dtype=np.int64)]
+    bad_byte_ranges = []
+    while pos < size:
+        count = min((size - pos) // record_size, block_size)
+        if count:
+            fields = np.ndarray((count, len(pattern)), dtype=np.uint8,
+                                buffer=data, offset=pos + field_start,
+                                strides=(record_size, 1))
+            good = (fields == expected).all(axis=1)
+            # The memory map can only be closed once no array uses it.
+            del fields
+            good_count = count if good.all() else int(np.argmin(good))
+            offsets.append(
+                pos + record_size * np.arange(good_count, dtype=np.int64))
+            pos += record_size * good_count
+            if good_count == count:
+                continue
+        end = _find_next_trace(data, pos + 1, size, record_size, field_start,
+                               pattern)
+        bad_byte_ranges.append((pos, end))
+        pos = end
+    return np.concatenate(offsets), bad_byte_ranges
+
+
+def _find_next_trace(data, pos, size, record_size, field_start, pattern):
+    """
+    Returns the first position at or after pos at which a trace header with
+    the expected number of samples is followed by another one or the end of
+    the file, or the size of the file if there is none.
+    """
+    search = pos + field_start
+    while True:
+        index = data.find(pattern, search)
+        if index < 0 or index - field_start + record_size > size:
+            return size
+        next_index = index + record_size
+        if next_index - field_start == size or \
+                data[next_index:next_index + len(pattern)] == pattern:
+            return index - field_start
+        search = index + 1
+
+
+def scan_segy(file, npts=None, endian=None, textual_header_encoding=None,
+              data_encoding=None):
+    """
+    Checks the trace headers of a SEG Y file with traces of a fixed length
+    and finds all corrupt parts of it in one sequential pass.
+
+    Every trace is expected to have the same number of samples. A trace
+    header with any other number of samples is considered corrupt and the
+    file is searched for the next position at which two consecutive trace
+    headers are plausible again. No data is read or decoded, so even very
+    large files are checked quickly.
+
+    :param file: Open file like object or a string which will be assumed to be
+        a filename.
+    :type npts: int
+    :param npts: The number of samples of every trace. Defaults to the one
+        in the binary file header or, if that is not set, to the one of the
+        first trace.
+    :type endian: str
+    :param endian: String that determines the endianness of the file. Either
+        '>' for big endian or '<' for little endian. If it is None, it will
+        be autodetected.
+    :param textual_header_encoding: The encoding of the textual header.
+        Either 'EBCDIC', 'ASCII' or None. If it is None, autodetection will
+        be attempted.
+    :type data_encoding: int
+    :param data_encoding: Enforces the data sample format code instead of the
+        one given in the binary file header.
+    :returns: The byte offsets of all good traces as a NumPy array and a
+        list of ``(start, end)`` tuples of the byte ranges that have been
+        skipped.
+    """
+    # Open the file if it is not a file like object.
+    if not hasattr(file, 'read') or not hasattr(file, 'tell') or not \
+            hasattr(file, 'seek'):
+        with open(file, 'rb') as open_file:
+            return scan_segy(open_file, npts=npts, endian=endian,
+                             textual_header_encoding=textual_header_encoding,
+                             data_encoding=data_encoding)
+    segy_file = SEGYFile(file, endian=endian,
+                         textual_header_encoding=textual_header_encoding,
+                         data_encoding=data_encoding, read_traces=False)
+    if npts is None:
+        npts = segy_file.binary_file_header.number_of_samples_per_data_trace
+    return _scan_fixed_length_traces(
+        file, DATA_SAMPLE_FORMAT_SAMPLE_SIZE[segy_file.data_encoding],
+        segy_file.endian, npts=npts)
+
+
+def read_segy_header_table(file, keys=None, endian=None,
+                           textual_header_encoding=None, data_encoding=None):
+    """
+    Unpacks the trace headers of all traces in a SEG Y file into one NumPy
+    array per header key.
+
+    This is a lot faster than unpacking the headers of every trace on its
+    own and is meant for sorting or checking the headers of large files.
+
+    :param file: Open file like object or a string which will be assumed to be
+        a filename.
+    :type keys: list of str
+    :param keys: The header keys to unpack. Defaults to all keys.
+    :type endian: str
+    :param endian: String that determines the endianness of the file. Either
+        '>' for big endian or '<' for little endian. If it is None, it will
+        be autodetected.
+    :param textual_header_encoding: The encoding of the textual header.
+        Either 'EBCDIC', 'ASCII' or None. If it is None, autodetection will
+        be attempted.
+    :type data_encoding: int
+    :param data_encoding: Enforces the data sample format code instead of the
+        one given in the binary file header.
+    :rtype: dict
+    :returns: Dictionary with one array per header key.
+    """
+    # Open the file if it is not a file like object.
+    if not hasattr(file, 'read') or not hasattr(file, 'tell') or not \
+            hasattr(file, 'seek'):
+        with open(file, 'rb') as open_file:
+            return read_segy_header_table(
+                open_file, keys=keys, endian=endian,
+                textual_header_encoding=textual_header_encoding,
+                data_encoding=data_encoding)
+    segy_file = SEGYFile(file, endian=endian,
+                         textual_header_encoding=textual_header_encoding,
+                         data_encoding=data_encoding, read_traces=False)
+    return _scan_trace_table(
+        file, DATA_SAMPLE_FORMAT_SAMPLE_SIZE[segy_file.data_encoding],
+        segy_file.endian, keys=keys)[0]
+
+
+def update_segy_headers(file, table, indices=None, endian=None,
+                        textual_header_encoding=None, data_encoding=None):
+    """
+    Overwrites trace header values of an existing SEG Y file in place.
+
+    Only the bytes of the given header fields of the given traces are
+    written, everything else including the data samples stays untouched.
+    The values are packed in one go and written through a memory map of
+    the file.
+
+    :param file: File like object opened for reading and writing, e.g. with
+        mode ``'r+b'``, or a string which will be assumed to be a filename.
+    :type table: dict
+    :param table: Dictionary mapping header keys to either a sequence with
+        one value per updated trace or a single value used for all of them,
+        e.g. ``{'source_coordinate_x': x,
+        'scalar_to_be_applied_to_all_coordinates': -100}``.
+    :param indices: The indices of the traces to update or a boolean mask
+        with one value per trace. Defaults to all traces.
+    :type endian: str
+    :param endian: String that determines the endianness of the file. Either
+        '>' for big endian or '<' for little endian. If it is None, it will
+        be autodetected.
+    :param textual_header_encoding: The encoding of the textual header.
+        Either 'EBCDIC', 'ASCII' or None. If it is None, autodetection will
+        be attempted.
+    :type data_encoding: int
+    :param data_encoding: Enforces the data sample format code instead of the
+        one given in the binary file header.
+    :rtype: :class:`numpy.ndarray`
+    :returns: The indices of the updated traces.
+    """
+    # Open the file if it is not a file like object.
+    if not hasattr(file, 'read') or not hasattr(file, 'tell') or not \
+            hasattr(file, 'seek'):
+        with open(file, 'r+b') as open_file:
+            return update_segy_headers(
+                open_file, table, indices=indices, endian=endian,
+                textual_header_encoding=textual_header_encoding,
+                data_encoding=data_encoding)
+    unknown = [_k for _k in table if _k not in TRACE_HEADER_KEYS]
+    if unknown:
+        msg = 'Unknown trace header keys: %s' % ', '.join(unknown)
+        raise SEGYError(msg)
+    segy_file = SEGYFile(file, endian=endian,
+                         textual_header_encoding=textual_header_encoding,
+                         data_encoding=data_encoding, read_traces=False)
+    sample_size = DATA_SAMPLE_FORMAT_SAMPLE_SIZE[segy_file.data_encoding]
+    _, offsets, _ = _scan_trace_table(file, sample_size, segy_file.endian,
+                                      keys=[])
+    if indices is None:
+        indices = np.arange(len(offsets))
+    indices = np.asarray(indices)
+    if indices.dtype == np.bool_:
+        if indices.shape != offsets.shape:
+            msg = 'The mask needs one value per trace.'
+            raise SEGYError(msg)
+        indices = np.flatnonzero(indices)
+    indices = np.arange(len(offsets))[indices.astype(np.int64)]
+    if not len(indices) or not table:
+        return indices
+    try:
+        headers = pack_trace_header_table(table, segy_file.endian,
+                                          count=len(indices))
+    except ValueError as e:
+        raise SEGYWritingError(str(e))
+    # The positions of the bytes of all updated fields within a header.
+    columns = np.concatenate([
+        np.arange(_f[3], _f[3] + _f[0]) for _f in TRACE_HEADER_FORMAT
+        if _f[1] in table])
+    values = headers.view(np.uint8).reshape(-1, 240)[:, columns]
+    positions = offsets[indices][:, None] + columns
+    if isinstance(file, io.BytesIO):
+        view = file.getbuffer()
+        try:
+            np.frombuffer(view, dtype=np.uint8)[positions] = values
+        finally:
+            view.release()
+        return indices
+    file.flush()
+    data = np.memmap(file, mode='r+', dtype=np.uint8)
+    data[positions] = values
+    data.flush()
+    del data
+    return indices
+
+
+def read_su_header_table(file, keys=None, endian=None):
+    """
+    Unpacks the trace headers of all traces in a Seismic Unix file into one
+    NumPy array per header key.
+
+    :param file: Open file like object or a string which will be assumed to be
+        a filename.
+    :type keys: list of str
+    :param keys: The header keys to unpack. Defaults to all keys.
+    :type endian: str
+    :param endian: String that determines the endianness of the file. Either
+        '>' for big endian or '<' for little endian. If it is None, it will
+        be autodetected.
+    :rtype: dict
+    :returns: Dictionary with one array per header key.
+    """
+    # Open the file if it is not a file like object.
+    if not hasattr(file, 'read') or not hasattr(file, 'tell') or not \
+            hasattr(file, 'seek'):
+        with open(file, 'rb') as open_file:
+            return read_su_header_table(open_file, keys=keys, endian=endian)
+    su_file = SUFile(file, endian=endian, read_traces=False)
+    return _scan_trace_table(file, 4, su_file.endian, keys=keys)[0]
+
+
+def read_segy_data(file, out=None, endian=None, textual_header_encoding=None,
+                   data_encoding=None):
+    """
+    Decodes the data of all traces in a SEG Y file into one two dimensional
+    array with one row per trace.
+
+    The samples are read straight into the rows of the array and byte
+    swapped and converted in place so the whole gather is read with a single
+    allocation and without any intermediate copies.
+
+    :param file: Open file like object or a string which will be assumed to be
+        a filename.
+    :type out: :class:`numpy.ndarray`
+    :param out: Writeable C contiguous two dimensional array to decode into.
+        It needs at least one row per trace and rows at least as long as the
+        longest trace, samples after the end of shorter traces are not
+        touched. Its dtype has to be the native one of the data encoding,
+        e.g. float32 for IBM and IEEE floating points. If not given, an
+        array of exactly that size is allocated.
+    :type endian: str
+    :param endian: String that determines the endianness of the file. Either
+        '>' for big endian or '<' for little endian. If it is None, it will
+        be autodetected.
+    :param textual_header_encoding: The encoding of the textual header.
+        Either 'EBCDIC', 'ASCII' or None. If it is None, autodetection will
+        be attempted.
+    :type data_encoding: int
+    :param data_encoding: Enforces the data sample format code instead of the
+        one given in the binary file header.
+    :rtype: :class:`numpy.ndarray`
+    :returns: out or the newly allocated array.
+    """
+    # Open the file if it is not a file like object.
+    if not hasattr(file, 'read') or not hasattr(file, 'tell') or not \
+            hasattr(file, 'seek'):
+        with open(file, 'rb') as open_file:
+            return read_segy_data(
+                open_file, out=out, endian=endian,
+                textual_header_encoding=textual_header_encoding,
+                data_encoding=data_encoding)
+    segy_file = SEGYFile(file, endian=endian,
+                         textual_header_encoding=textual_header_encoding,
+                         data_encoding=data_encoding, read_traces=False)
+    return _read_data_into(file, segy_file.data_encoding, segy_file.endian,
+                           out=out)
+
+
+def read_su_data(file, out=None, endian=None):
+    """
+    Decodes the data of all traces in a Seismic Unix file into one two
+    dimensional float32 array with one row per trace.
+
+    See :func:`read_segy_data` for details.
+
+    :param file: Open file like object or a string which will be assumed to be
+        a filename.
+    :type out: :class:`numpy.ndarray`
+    :param out: Writeable C contiguous two dimensional float32 array to
+        decode into. If not given, one is allocated.
+    :type endian: str
+    :param endian: String that determines the endianness of the file. Either
+        '>' for big endian or '<' for little endian. If it is None, it will
+        be autodetected.
+    :rtype: :class:`numpy.ndarray`
+    :returns: out or the newly allocated array.
+    """
+    # Open the file if it is not a file like object.
+    if not hasattr(file, 'read') or not hasattr(file, 'tell') or not \
+            hasattr(file, 'seek'):
+        with open(file, 'rb') as open_file:
+            return read_su_data(open_file, out=out, endian=endian)
+    su_file = SUFile(file, endian=endian, read_traces=False)
+    return _read_data_into(file, 5, su_file.endian, out=out)
+
+
+def _read_data_into(file, data_encoding, endian, out=None):
+    """
+    Decodes the data of all traces starting at the current file pointer
+    position into the rows of out, allocating it if necessary.
+    """
+    sample_size = DATA_SAMPLE_FORMAT_SAMPLE_SIZE[data_encoding]
+    _, offsets, npts = _scan_trace_table(file, sample_size, endian, keys=[])
+    length = int(npts.max()) if len(npts) else 0
+    if out is None:
+        dtype = _sample_dtype(data_encoding, '=')
+        if data_encoding == 1:
+            dtype = np.dtype(np.float32)
+        # Only rows of traces shorter than the others have to be padded.
+        if np.all(npts == length):
+            out = np.empty((len(npts), length), dtype=dtype)
+        else:
+            out = np.zeros((len(npts), length), dtype=dtype)
+    elif out.ndim != 2 or out.shape[0] < len(npts) or out.shape[1] < length:
+        msg = 'out needs a shape of at least (%i, %i).' % (len(npts), length)
+        raise SEGYError(msg)
+    unpack_function = DATA_SAMPLE_FORMAT_UNPACK_FUNCTIONS[data_encoding]
+    for row, offset, count in zip(out, offsets, npts):
+        file.seek(offset + 240, 0)
+        unpack_function(file, int(count), endian=endian, out=row[:count])
+    return out
+
+
+def sort_segy(file, outfile, keys, endian=None, textual_header_encoding=None,
+              data_encoding=None, buffer_size=64 * 1024 ** 2):
+    """
+    Writes the traces of a SEG Y file sorted by one or more trace header keys
+    to a new file without reading the whole file into memory.
+
+    The sort order is determined from the header table of all traces. The
+    trace records, trace header and data, are then copied unchanged, so
+    nothing is decoded or encoded. The records are collected in a buffer of
+    at most buffer_size bytes which is filled with reads in file order and
+    then written in one go.
+
+    :param file: Open file like object or a string which will be assumed to be
+        a filename.
+    :param outfile: Open file like object or a string which will be assumed
+        to be a filename to write the sorted file to.
+    :type keys: str or list of str
+    :param keys: The trace header keys to sort by, the first one being the
+        primary key, e.g. ``['ensemble_number',
+        'distance_from_center_of_the_source_point_to_the_center_of_the_receiver_group']``
+        for CDP and offset order. Traces with the same keys keep their
+        order.
+    :type endian: str
+    :param endian: String that determines the endianness of the file. Either
+        '>' for big endian or '<' for little endian. If it is None, it will
+        be autodetected.
+    :param textual_header_encoding: The encoding of the textual header.
+        Either 'EBCDIC', 'ASCII' or None. If it is None, autodetection will
+        be attempted.
+    :type data_encoding: int
+    :param data_encoding: Enforces the data sample format code instead of the
+        one given in the binary file header.
+    :type buffer_size: int
+    :param buffer_size: The maximum number of bytes held in memory at once
+        apart from the header table. At least one trace record is always
+        buffered.
+    :rtype: :class:`numpy.ndarray`
+    :returns: The index of every written trace in the original file.
+    """
+    # Open the files if they are not file like objects.
+    if not hasattr(file, 'read') or not hasattr(file, 'tell') or not \
+            hasattr(file, 'seek'):
+        with open(file, 'rb') as open_file:
+            return sort_segy(open_file, outfile, keys, endian=endian,
+                             textual_header_encoding=textual_header_encoding,
+                             data_encoding=data_encoding,
+                             buffer_size=buffer_size)
+    if not hasattr(outfile, 'write'):
+        with open(outfile, 'wb') as open_outfile:
+            return sort_segy(file, open_outfile, keys, endian=endian,
+                             textual_header_encoding=textual_header_encoding,
+                             data_encoding=data_encoding,
+                             buffer_size=buffer_size)
+    if isinstance(keys, str):
+        keys = [keys]
+    if not keys:
+        msg = 'At least one trace header key to sort by is needed.'
+        raise SEGYError(msg)
+    start = file.tell()
+    segy_file = SEGYFile(file, endian=endian,
+                         textual_header_encoding=textual_header_encoding,
+                         data_encoding=data_encoding, read_traces=False)
+    pos = file.tell()
+    sample_size = DATA_SAMPLE_FORMAT_SAMPLE_SIZE[segy_file.data_encoding]
+    table, offsets, npts = _scan_trace_table(file, sample_size,
+                                             segy_file.endian, keys=keys)
+    # np.lexsort sorts by its last key first, its sort is stable.
+    order = np.lexsort([table[key] for key in reversed(keys)])
+    # The file headers are copied as they are.
+    file.seek(start, 0)
+    outfile.write(file.read(pos - start))
+    _copy_trace_records(file, outfile, offsets[order],
+                        240 + npts[order] * sample_size, buffer_size)
+    return order
+
+
+def extract_segy(file, outfile, indices=None, predicate=None, keys=None,
+                 renumber=False, endian=None, textual_header_encoding=None,
+                 data_encoding=None, buffer_size=64 * 1024 ** 2):
+    """
+    Writes a subset of the traces of a SEG Y file to a new file without
+    decoding or encoding any data.
+
+    The trace records, trace header and data, are copied byte by byte so the
+    new file is bit-exact. The textual and binary file headers are copied as
+    well, only the number of traces is updated if the binary file header
+    holds the number of traces of the whole file in
+    ``number_of_data_traces_per_ensemble`` as files written by ObsPy do.
+
+    :param file: Open file like object or a string which will be assumed to be
+        a filename.
+    :param outfile: Open file like object or a string which will be assumed
+        to be a filename to write the subset to.
+    :param indices: The indices of the traces to extract in the order they
+        should be written or a boolean mask with one value per trace.
+    :type predicate: callable
+    :param predicate: Alternatively to indices a function that is given the
+        header table of all traces, see :func:`read_segy_header_table`, and
+        returns a boolean mask or the indices of the traces to extract, e.g.
+        ``lambda h: h['ensemble_number'] == 42``.
+    :type keys: list of str
+    :param keys: The header keys unpacked for the predicate. Defaults to all
+        keys.
+    :type renumber: bool
+    :param renumber: If True, ``trace_sequence_number_within_line`` and
+        ``trace_sequence_number_within_segy_file`` of the extracted traces
+        are set to 1, 2, 3, ... Otherwise the trace headers stay untouched.
+    :type endian: str
+    :param endian: String that determines the endianness of the file. Either
+        '>' for big endian or '<' for little endian. If it is None, it will
+        be autodetected.
+    :param textual_header_encoding: The encoding of the textual header.
+        Either 'EBCDIC', 'ASCII' or None. If it is None, autodetection will
+        be attempted.
+    :type data_encoding: int
+    :param data_encoding: Enforces the data sample format code instead of the
+        one given in the binary file header.
+    :type buffer_size: int
+    :param buffer_size: The maximum number of bytes of trace records held in
+        memory at once, see :func:`sort_segy`.
+    :rtype: :class:`numpy.ndarray`
+    :returns: The indices of the extracted traces in the original file.
+    """
+    # Open the files if they are not file like objects.
+    if not hasattr(file, 'read') or not hasattr(file, 'tell') or not \
+            hasattr(file, 'seek'):
+        with open(file, 'rb') as open_file:
+            return extract_segy(
+                open_file, outfile, indices=indices, predicate=predicate,
+                keys=keys, renumber=renumber, endian=endian,
+                textual_header_encoding=textual_header_encoding,
+                data_encoding=data_encoding, buffer_size=buffer_size)
+    if not hasattr(outfile, 'write'):
+        with open(outfile, 'wb') as open_outfile:
+            return extract_segy(
+                file, open_outfile, indices=indices, predicate=predicate,
+                keys=keys, renumber=renumber, endian=endian,
+                textual_header_encoding=textual_header_encoding,
+                data_encoding=data_encoding, buffer_size=buffer_size)
+    if (indices is None) == (predicate is None):
+        msg = 'Either indices or a predicate has to be given.'
+        raise SEGYError(msg)
+    start = file.tell()
+    segy_file = SEGYFile(file, endian=endian,
+                         textual_header_encoding=textual_header_encoding,
+                         data_encoding=data_encoding, read_traces=False)
+    pos = file.tell()
+    sample_size = DATA_SAMPLE_FORMAT_SAMPLE_SIZE[segy_file.data_encoding]
+    table, offsets, npts = _scan_trace_table(
+        file, sample_size, segy_file.endian,
+        keys=[] if predicate is None else keys)
+    if predicate is not None:
+        indices = predicate(table)
+    indices = np.asarray(indices)
+    if indices.dtype == np.bool_:
+        if indices.shape != offsets.shape:
+            msg = 'The mask needs one value per trace.'
+            raise SEGYError(msg)
+        indices = np.flatnonzero(indices)
+    indices = np.arange(len(offsets))[indices.astype(np.int64)]
+    # Copy the file headers and only update the number of traces.
+    file.seek(start, 0)
+    headers = bytearray(file.read(pos - start))
+    trace_count = segy_file.binary_file_header.\
+        number_of_data_traces_per_ensemble
+    if trace_count == len(offsets) and len(indices) != len(offsets):
+        fmt = ('%sh' % segy_file.endian).encode('ascii', 'strict')
+        count = len(indices) if len(indices) <= 32767 else 0
+        headers[3212:3214] = pack(fmt, count)
+    outfile.write(headers)
+    renumber_fields = []
+    if renumber:
+        renumber_fields = [
+            TRACE_HEADER_FORMAT[TRACE_HEADER_KEYS.index(_i)][3]
+            for _i in ('trace_sequence_number_within_line',
+                       'trace_sequence_number_within_segy_file')]
+    _copy_trace_records(file, outfile, offsets[indices],
+                        240 + npts[indices] * sample_size, buffer_size,
+                        renumber_fields=renumber_fields,
+                        endian=segy_file.endian)
+    return indices
+
+
+def _copy_trace_records(file, outfile, offsets, sizes, buffer_size,
+                        renumber_fields=(), endian='>'):
+    """
+    Copies the records of the given byte offsets and sizes from file to the
+    end of outfile in the given order.
+
+    :param buffer_size: The size of the buffer in bytes. Enlarged to the size
+        of the largest record if necessary.
+    :param renumber_fields: Byte offsets of 4 byte trace header fields to set
+        to the running number of the written trace starting at 1.
+    :param endian: The endianness of the renumbered header fields.
+    """
+    if not len(offsets):
+        return
+    ends = np.cumsum(sizes)
+    buf = np.empty(int(min(max(buffer_size, sizes.max()), ends[-1])),
+                   dtype=np.uint8)
+    first = 0
+    while first < len(offsets):
+        base = ends[first] - sizes[first]
+        # As many records as fit into the buffer, but at least one.
+        last = max(first + 1, int(np.searchsorted(ends, base + len(buf),
+                                                  side='right')))
+        positions = ends[first:last] - sizes[first:last] - base
+        # Read in the order of the file to keep the reads sequential.
+        for _i in np.argsort(offsets[first:last], kind='stable'):
+            offset = int(offsets[first + _i])
+            position = int(positions[_i])
+            size = int(sizes[first + _i])
+            file.seek(offset, 0)
+            if readinto(file, buf[position:position + size]) != size:
+                msg = 'The trace record at byte %i is truncated.' % offset
+                raise SEGYError(msg)
+        if len(renumber_fields):
+            numbers = np.arange(first + 1, last + 1,
+                                dtype=np.dtype(np.int32).newbyteorder(endian))
+            numbers = numbers.view(np.uint8).reshape(-1, 4)
+            for field in renumber_fields:
+                buf[(positions + field)[:, None] + np.arange(4)] = numbers
+        outfile.write(buf[:int(ends[last - 1] - base)])
+        first = last
+
+
+def transcode_segy(file, outfile, data_encoding=5, endian='>',
+                   input_endian=None, textual_header_encoding=None,
+                   input_data_encoding=None, workers=None, block_size=1024):
+    """
+    Converts the sample format and the byte order of a SEG Y file while
+    streaming it to a new file.
+
+    Blocks of trace records are read sequentially in a background thread,
+    converted, trace headers and data alike, by a pool of worker threads and
+    written to the new file in their original order. At most a few blocks
+    per worker are in flight at any time so the memory usage does not depend
+    on the size of the file.
+
+    The textual header is copied as it is, the binary file header is
+    rewritten with the new byte order and sample format code. Converting
+    between IBM and IEEE floating points follows :func:`ibm_to_ieee` and
+    :func:`ieee_to_ibm`, floating points written as integers are rounded
+    and clipped to the range of the integer type.
+
+    :param file: Open file like object or a string which will be assumed to be
+        a filename.
+    :param outfile: Open file like object or a string which will be assumed
+        to be a filename to write the converted file to.
+    :type data_encoding: int
+    :param data_encoding: The sample format code of the new file.
+    :type endian: str
+    :param endian: The endianness of the new file. Either '>' for big endian
+        or '<' for little endian.
+    :type input_endian: str
+    :param input_endian: The endianness of the input file. If it is None, it
+        will be autodetected.
+    :param textual_header_encoding: The encoding of the textual header.
+        Either 'EBCDIC', 'ASCII' or None. If it is None, autodetection will
+        be attempted.
+    :type input_data_encoding: int
+    :param input_data_encoding: Enforces the data sample format code of the
+        input file instead of the one given in its binary file header.
+    :type workers: int
+    :param workers: The number of worker threads. Defaults to the number of
+        CPUs.
+    :type block_size: int
+    :param block_size: The maximum number of traces converted in one go.
+    :rtype: int
+    :returns: The number of converted traces.
+    """
+    # Open the files if they are not file like objects.
+    if not hasattr(file, 'read') or not hasattr(file, 'tell') or not \
+            hasattr(file, 'seek'):
+        with open(file, 'rb') as open_file:
+            return transcode_segy(
+                open_file, outfile, data_encoding=data_encoding,
+                endian=endian, input_endian=input_endian,
+                textual_header_encoding=textual_header_encoding,
+                input_data_encoding=input_data_encoding, workers=workers,
+                block_size=block_size)
+    if not hasattr(outfile, 'write'):
+        with open(outfile, 'wb') as open_outfile:
+            return transcode_segy(
+                file, open_outfile, data_encoding=data_encoding,
+                endian=endian, input_endian=input_endian,
+                textual_header_encoding=textual_header_encoding,
+                input_data_encoding=input_data_encoding, workers=workers,
+                block_size=block_size)
+    # Import here as it is only needed for transcoding.
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+
+    if endian not in ('<', '>'):
+        msg = "endian has to be either '<' or '>'."
+        raise SEGYError(msg)
+    # Raises for unsupported sample formats before anything is written.
+    _sample_dtype(data_encoding, endian)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, int(workers))
+    start = file.tell()
+    segy_file = SEGYFile(file, endian=input_endian,
+                         textual_header_encoding=textual_header_encoding,
+                         data_encoding=input_data_encoding, read_traces=False)
+    pos = file.tell()
+    src_encoding = segy_file.data_encoding
+    src_endian = segy_file.endian
+    src_dtype = _sample_dtype(src_encoding, src_endian)
+    _, offsets, npts = _scan_trace_table(file, src_dtype.itemsize, src_endian,
+                                         keys=[])
+    # The textual header and any extended textual headers are copied as they
+    # are, only the binary file header changes.
+    file.seek(start, 0)
+    outfile.write(file.read(3200))
+    binary_file_header = segy_file.binary_file_header
+    binary_file_header.data_sample_format_code = data_encoding
+    binary_file_header.write(outfile, endian=endian)
+    file.seek(start + 3600, 0)
+    outfile.write(file.read(pos - start - 3600))
+
+    blocks = _prefetch(_iter_raw_trace_records(file, offsets, npts,
+                                               src_dtype.itemsize, block_size),
+                       workers)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for raw, count in blocks:
+                pending.append(executor.submit(
+                    _transcode_trace_records, raw, count, src_encoding,
+                    src_endian, data_encoding, endian))
+                # Write in order and keep the number of blocks in flight
+                # bounded.
+                while pending and (len(pending) >= 2 * workers or
+                                   pending[0].done()):
+                    outfile.write(pending.popleft().result())
+            while pending:
+                outfile.write(pending.popleft().result())
+        finally:
+            blocks.close()
+            for future in pending:
+                future.cancel()
+    return len(offsets)
+
+
+def _iter_raw_trace_records(file, offsets, npts, sample_size, block_size):
+    """
+    Reads the raw records of consecutive traces in blocks of at most
+    block_size traces that all have the same number of samples.
+
+    :returns: Generator yielding the raw bytes and the number of samples of
+        the traces of every block.
+    """
+    first = 0
+    while first < len(offsets):
+        count = npts[first]
+        last = min(first + block_size, len(offsets))
+        # Split the block where the number of samples changes.
+        changes = np.flatnonzero(npts[first:last] != count)
+        if len(changes):
+            last = first + int(changes[0])
+        size = int((last - first) * (240 + count * sample_size))
+        file.seek(int(offsets[first]), 0)
+        raw = file.read(size)
+        if len(raw) != size:
+            msg = 'The trace record at byte %i is truncated.' % \
+                offsets[first]
+            raise SEGYError(msg)
+        yield raw, int(count)
+        first = last
+
+
+def _transcode_trace_records(raw, npts, src_encoding, src_endian,
+                             dst_encoding, dst_endian):
+    """
+    Converts raw trace records with npts samples each from one sample format
+    and byte order to another.
+
+    Runs in the worker threads of :func:`transcode_segy`. The C code and
+    NumPy release the GIL for the bulk of the work.
+
+    :returns: The converted trace records as bytes.
+    """
+    src_dtype = _sample_dtype(src_encoding, src_endian)
+    dst_dtype = _sample_dtype(dst_encoding, dst_endian)
+    records = np.frombuffer(raw, dtype=[('header', np.void, 240),
+                                        ('data', src_dtype, (npts,))])
+    out = np.empty(len(records), dtype=[('header', np.void, 240),
+                                        ('data', dst_dtype, (npts,))])
+    if src_endian == dst_endian:
+        out['header'] = records['header']
+    else:
+        # Assigning the fields converts their byte order one by one.
+        out['header'].view(trace_header_dtype(dst_endian))[...] = \
+            records['header'].view(trace_header_dtype(src_endian))
+    out['data'] = _convert_samples(records['data'], src_encoding,
+                                   dst_encoding, dst_dtype)
+    return out.tobytes()
+
+
+def _convert_samples(data, src_encoding, dst_encoding, dst_dtype):
+    """
+    Converts samples as stored on disk, see :func:`_sample_dtype`, from one
+    sample format to another.
+    """
+    # Only the byte order changes which keeps every sample bit-exact.
+    if src_encoding == dst_encoding:
+        return data.astype(dst_dtype)
+    if src_encoding == 1:
+        data = ibm_to_ieee(data)
+    if dst_encoding == 1:
+        return ieee_to_ibm(data).astype(dst_dtype)
+    if dst_dtype.kind == 'i' and data.dtype.kind == 'f':
+        data = np.rint(data)
+    if dst_dtype.kind == 'i':
+        info = np.iinfo(dst_dtype)
+        data = np.clip(data, info.min, info.max)
+    return data.astype(dst_dtype)
+
+
+def _read_segy(file, endian=None,
+               textual_header_encoding=None,
+               data_encoding=None,force_trace_length=None,
+               unpack_headers=False, 
+               headonly=False, mmap=False, workers=None, starttime=None,
+               endtime=None, nearest_sample=True, out=None,
+               skip_corrupt_traces=False):
+    """
+    Reads a SEG Y file and returns a SEGYFile object.
+
+    :param file: Open file like object or a string which will be assumed to be
+        a filename.
+    :type endian: str
+    :param endian: String that determines the endianness of the file. Either
+        '>' for big endian or '<' for little endian. If it is None,
+        obspy.io.segy will try to autodetect the endianness. The endianness
+        is always valid for the whole file.
+    :param textual_header_encoding: The encoding of the textual header.
+        Either 'EBCDIC', 'ASCII' or None. If it is None, autodetection will
+        be attempted.
+    :type unpack_headers: bool
+    :param unpack_headers: Determines whether or not all headers will be
+        unpacked during reading the file. Has a huge impact on the memory usage
+        and the performance. They can be unpacked on-the-fly after being read.
+        Defaults to False.
+    :type headonly: bool
+    :param headonly: Determines whether or not the actual data records will be
+        read and unpacked. Has a huge impact on memory usage. Data will not be
+        unpackable on-the-fly after reading the file. Defaults to False.
+    :type mmap: bool
+    :param mmap: If True, the file is memory mapped and a
+        :class:`SEGYMemmapFile` is returned instead. Only works for files on
+        disk in which all traces have the same length. Defaults to False.
+    :type workers: int
+    :param workers: Number of processes decoding the traces in parallel.
+        Each process reads its own range of traces from the file. Only
+        works for files on disk and is ignored if headonly is True. Defaults
+        to None which decodes all traces in the current process.
+    :type starttime: :class:`~obspy.core.utcdatetime.UTCDateTime`
+    :param starttime: Only read and decode the samples of every trace after
+        this time. Defaults to None which reads the whole traces.
+    :type endtime: :class:`~obspy.core.utcdatetime.UTCDateTime`
+    :param endtime: Only read and decode the samples of every trace before
+        this time. Defaults to None which reads the whole traces.
+    :type nearest_sample: bool
+    :param nearest_sample: See :meth:`~obspy.core.trace.Trace.trim`.
+    :type out: :class:`numpy.ndarray`
+    :param out: Two dimensional array with at least one row per trace the
+        data is decoded into, see :meth:`SEGYFile._read_traces`. Can not be
+        combined with multiple workers.
+    :type skip_corrupt_traces: bool
+    :param skip_corrupt_traces: If True, traces with a corrupt header are
+        skipped instead of aborting the whole read and the skipped byte
+        ranges are stored in the ``bad_byte_ranges`` attribute of the
+        returned object, see :meth:`SEGYFile._read_traces`. Can neither be
+        combined with multiple workers nor with mmap.
+    """
+    if skip_corrupt_traces and (mmap or (workers is not None and workers > 1
+                                         and not headonly)):
+        msg = 'Skipping corrupt traces is not supported with mmap or ' + \
+            'multiple workers.'
+        raise SEGYError(msg)
+    if workers is not None and workers > 1 and not headonly:
+        filename = getattr(file, 'name', file)
+        if not isinstance(filename, str):
+            msg = 'Only files on disk can be read with multiple workers.'
+            raise SEGYError(msg)
+        if out is not None:
+            msg = 'Reading into out is not supported with multiple workers.'
+            raise SEGYError(msg)
+        return _internal_read_segy_parallel(
+            filename, workers, endian=endian,
+            textual_header_encoding=textual_header_encoding,
+            data_encoding=data_encoding,
+            force_trace_length=force_trace_length,
+            unpack_headers=unpack_headers, starttime=starttime,
+            endtime=endtime, nearest_sample=nearest_sample)
+    if mmap:
+        filename = getattr(file, 'name', file)
+        if not isinstance(filename, str):
+            msg = 'Only files on disk can be memory mapped.'
+            raise SEGYError(msg)
+        return SEGYMemmapFile(filename, endian=endian,
+                              textual_header_encoding=textual_header_encoding,
+                              data_encoding=data_encoding,
+                              force_trace_length=force_trace_length)
+    
+    # Open the file if it is not a file like object.
+    if not hasattr(file, 'read') or not hasattr(file, 'tell') or not \
+            hasattr(file, 'seek'):
+        with open(file, 'rb') as open_file:
+            return _internal_read_segy(
+                open_file, endian=endian,
+                data_encoding=data_encoding,force_trace_length=force_trace_length,
+                textual_header_encoding=textual_header_encoding,
+                unpack_headers=unpack_headers, headonly=headonly,
+                starttime=starttime, endtime=endtime,
+                nearest_sample=nearest_sample, out=out,
+                skip_corrupt_traces=skip_corrupt_traces)
+    # Otherwise just read it.
+
+    return _internal_read_segy(file, endian=endian,
+                               textual_header_encoding=textual_header_encoding,
+                               data_encoding=data_encoding,force_trace_length=force_trace_length,
+                               unpack_headers=unpack_headers,
+                               headonly=headonly, starttime=starttime,
+                               endtime=endtime, nearest_sample=nearest_sample,
+                               out=out,
+                               skip_corrupt_traces=skip_corrupt_traces)
+
+
+def _internal_read_segy(file, endian=None, textual_header_encoding=None,
+                        data_encoding=None,force_trace_length=None,
+                        unpack_headers=False, headonly=False, starttime=None,
+                        endtime=None, nearest_sample=True, out=None,
+                        skip_corrupt_traces=False):
+    """
+    Reads on open file object and returns a SEGYFile object.
+
+    :param file: Open file like object.
+    :type endian: str
+    :param endian: String that determines the endianness of the file. Either
+        '>' for big endian or '<' for little endian. If it is None,
+        obspy.io.segy will try to autodetect the endianness. The endianness
+        is always valid for the whole file.
+    :param textual_header_encoding: The encoding of the textual header.
+        Either 'EBCDIC', 'ASCII' or None. If it is None, autodetection will
+        be attempted.
+    :type unpack_headers: bool
+    :param unpack_headers: Determines whether or not all headers will be
+        unpacked during reading the file. Has a huge impact on the memory usage
+        and the performance. They can be unpacked on-the-fly after being read.
+        Defaults to False.
+    :type headonly: bool
+    :param headonly: Determines whether or not the actual data records will be
+        read and unpacked. Has a huge impact on memory usage. Data will not be
+        unpackable on-the-fly after reading the file. Defaults to False.
+
+    See :func:`_read_segy` for the time window, out and skip_corrupt_traces
+    parameters.
+    """
+    
+    return SEGYFile(file, endian=endian,
+                    textual_header_encoding=textual_header_encoding,
+                    data_encoding=data_encoding,force_trace_length=force_trace_length,
+                    unpack_headers=unpack_headers, headonly=headonly,
+                    starttime=starttime, endtime=endtime,
+                    nearest_sample=nearest_sample, out=out,
+                    skip_corrupt_traces=skip_corrupt_traces)
+
+
+def _internal_read_segy_parallel(filename, workers, endian=None,
+                                 textual_header_encoding=None,
+                                 data_encoding=None, force_trace_length=None,
+                                 unpack_headers=False, starttime=None,
+                                 endtime=None, nearest_sample=True):
+    """
+    Reads a SEG Y file with the traces being decoded by a pool of processes.
+
+    The file is split into ranges of consecutive traces. Every range is read
+    and decoded by one of the processes on its own and the results are put
+    back together in file order.
+
+    :type filename: str
+    :param filename: The SEG Y file.
+    :type workers: int
+    :param workers: The number of processes.
+
+    See :func:`_read_segy` for all other parameters.
+    """
+    # Import here as it is only needed for parallel reading.
+    from concurrent.futures import ProcessPoolExecutor
+
+    with open(filename, 'rb') as file:
+        segy_file = SEGYFile(file, endian=endian,
+                             textual_header_encoding=textual_header_encoding,
+                             data_encoding=data_encoding,
+                             force_trace_length=force_trace_length,
+                             read_traces=False)
+        sample_size = DATA_SAMPLE_FORMAT_SAMPLE_SIZE[segy_file.data_encoding]
+        if force_trace_length is not None:
+            pos = file.tell()
+            record_size = 240 + force_trace_length * sample_size
+            count = (_get_filesize(file) - pos) // record_size
+            offsets = pos + record_size * np.arange(count + 1)
+        else:
+            _, offsets, npts = _scan_trace_table(file, sample_size,
+                                                 segy_file.endian, keys=[])
+            if len(offsets):
+                end = offsets[-1] + 240 + npts[-1] * sample_size
+                offsets = np.append(offsets, end)
+    segy_file.file = None
+    segy_file.traces = []
+    if len(offsets) < 2:
+        return segy_file
+    # A few ranges per process keep all of them busy until the end.
+    chunks = np.array_split(np.arange(len(offsets) - 1),
+                            min(len(offsets) - 1, workers * 4))
+    args = [(filename, int(offsets[_i[0]]), int(offsets[_i[-1] + 1]),
+             len(_i), segy_file.data_encoding, segy_file.endian,
+             force_trace_length, unpack_headers, starttime, endtime,
+             nearest_sample) for _i in chunks]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for traces in executor.map(_read_trace_range, *zip(*args)):
+            segy_file.traces.extend(traces)
+    return segy_file
+
+
+def _read_trace_range(filename, begin, end, count, data_encoding, endian,
+                      force_trace_length=None, unpack_headers=False,
+                      starttime=None, endtime=None, nearest_sample=True):
+    """
+    Reads and decodes count consecutive traces located between the byte
+    offsets begin and end of a file.
+
+    Runs in the worker processes of :func:`_internal_read_segy_parallel`.
+    """
+    with open(filename, 'rb') as file:
+        file.seek(begin, 0)
+        buf = io.BytesIO(file.read(end - begin))
+    traces = []
+    for _ in range(count):
+        trace = SEGYTrace(buf, data_encoding, endian,
+                          force_trace_length=force_trace_length,
+                          unpack_headers=unpack_headers,
+                          filesize=end - begin, starttime=starttime,
+                          endtime=endtime, nearest_sample=nearest_sample)
+        # The in memory buffer is of no use once the trace is decoded.
+        trace.file = None
+        traces.append(trace)
+    return traces
+
+
+def iread_segy(file, endian=None, textual_header_encoding=None,
+               unpack_headers=False, headonly=False):
+    """
+    Iteratively read a SEG-Y field and yield single ObsPy Traces.
+
+    The function iteratively loops over the whole file and yields single
+    ObsPy Traces. The next Trace will be read after the current loop has
+    finished - this function is thus suitable for reading arbitrarily large
+    SEG-Y files without running into memory problems.
+
+    >>> from obspy.core.util import get_example_file
+    >>> filename = get_example_file("00001034.sgy_first_trace")
+    >>> from obspy.io.segy.segy import iread_segy
+    >>> for tr in iread_segy(filename):
+    ...     # Each Trace's stats attribute will have references to the file
+    ...     # headers and some more information.
+    ...     tf = tr.stats.segy.textual_file_header
+    ...     bf = tr.stats.segy.binary_file_header
+    ...     tfe = tr.stats.segy.textual_file_header_encoding
+    ...     de = tr.stats.segy.data_encoding
+    ...     e = tr.stats.segy.endian
+    ...     # Also do something meaningful with each Trace.
+    ...     print(int(tr.data.sum() * 1E9))
+    -5
+
+    :param file: Open file like object or a string which will be assumed to be
+        a filename.
+    :type endian: str
+    :param endian: String that determines the endianness of the file. Either
+        '>' for big endian or '<' for little endian. If it is None,
+        obspy.io.segy will try to autodetect the endianness. The endianness
+        is always valid for the whole file.
+    :param textual_header_encoding: The encoding of the textual header.
+        Either 'EBCDIC', 'ASCII' or None. If it is None, autodetection will
+        be attempted.
+    :type unpack_headers: bool
+    :param unpack_headers: Determines whether or not all headers will be
+        unpacked during reading the file. Has a huge impact on the memory usage
+        and the performance. They can be unpacked on-the-fly after being read.
+        Defaults to False.
+    :type headonly: bool
+    :param headonly: Determines whether or not the actual data records will be
+        read and unpacked. Has a huge impact on memory usage. Data will not be
+        unpackable on-the-fly after reading the file. Defaults to False.
+    """
+    # Open the file if it is not a file like object.
+    if not hasattr(file, 'read') or not hasattr(file, 'tell') or not \
+            hasattr(file, 'seek'):
+        with open(file, 'rb') as open_file:
+            for tr in _internal_iread_segy(
+                    open_file, endian=endian,
+                    textual_header_encoding=textual_header_encoding,
+                    unpack_headers=unpack_headers, headonly=headonly):
+                yield tr
+            return
+    # Otherwise just read it.
+    for tr in _internal_iread_segy(
+            file, endian=endian,
+            textual_header_encoding=textual_header_encoding,
+            unpack_headers=unpack_headers, headonly=headonly):
+        yield tr
+
+
+def _internal_iread_segy(file, endian=None, textual_header_encoding=None,
+                         unpack_headers=False, headonly=False):
+    """
+    Iteratively read a SEG-Y field and yield single ObsPy Traces.
+    """
+    segy_file = SEGYFile(
+        file, endian=endian, textual_header_encoding=textual_header_encoding,
+        unpack_headers=unpack_headers, headonly=headonly, read_traces=False)
+    for trace in segy_file._read_traces(unpack_headers=unpack_headers,
+                                        headonly=headonly,
+                                        yield_each_trace=True):
+        yield _segy_trace_to_obspy_trace(segy_file, trace,
+                                         unpack_headers=unpack_headers,
+                                         headonly=headonly)
+
+
+def _segy_trace_to_obspy_trace(segy_file, trace, unpack_headers=False,
+                               headonly=False):
+    """
+    Converts a SEGYTrace read on its own to an ObsPy Trace carrying the file
+    wide headers of segy_file in its stats.
+    """
+    tr = trace.to_obspy_trace(unpack_trace_headers=unpack_headers,
+                              headonly=headonly)
+    # Fill stats that are normally attached to the stream stats.
+    tr.stats.segy.textual_file_header = segy_file.textual_file_header
+    tr.stats.segy.binary_file_header = segy_file.binary_file_header
+    tr.stats.segy.textual_file_header_encoding = \
+        segy_file.textual_header_encoding.upper()
+    tr.stats.segy.data_encoding = trace.data_encoding
+    tr.stats.segy.endian = trace.endian
+    tr.stats._format = "SEGY"
+    return tr
+
+
+def follow_segy(file, interval=1.0, backoff=1.0, max_interval=None,
+                timeout=None, endian=None, textual_header_encoding=None,
+                unpack_headers=False):
+    """
+    Reads a SEG Y file that is still being written and yields single ObsPy
+    Traces as soon as they are complete.
+
+    The reader remembers the byte offset of the next trace and polls the
+    size of the file until the complete trace, header and data, has been
+    written. A partially written trace at the end of the file is therefore
+    never read and no byte is read twice once its trace has been yielded.
+
+    :param file: Open file like object or a string which will be assumed to be
+        a filename.
+    :type interval: float
+    :param interval: Seconds to wait before polling the size of the file
+        again.
+    :type backoff: float
+    :param backoff: Factor the waiting time is multiplied with after every
+        poll without a new trace. It is reset to interval once a trace is
+        complete. Defaults to 1, a fixed interval.
+    :type max_interval: float
+    :param max_interval: The upper limit of the waiting time when backing
+        off.
+    :type timeout: float
+    :param timeout: Stop once no new trace has been completed for this many
+        seconds. Defaults to None, follow the file forever.
+
+    See :func:`iread_segy` for all other parameters. The data is always
+    read, as reading it later on the fly would not work while the file
+    grows.
+    """
+    # Open the file if it is not a file like object.
+    if not hasattr(file, 'read') or not hasattr(file, 'tell') or not \
+            hasattr(file, 'seek'):
+        with open(file, 'rb') as open_file:
+            for tr in follow_segy(
+                    open_file, interval=interval, backoff=backoff,
+                    max_interval=max_interval, timeout=timeout,
+                    endian=endian,
+                    textual_header_encoding=textual_header_encoding,
+                    unpack_headers=unpack_headers):
+                yield tr
+            return
+    poll = (interval, backoff, max_interval, timeout)
+    if not _wait_for_file_size(file, file.tell() + 3600, interval, backoff,
+                               max_interval, _get_deadline(timeout)):
+        return
+    segy_file = SEGYFile(
+        file, endian=endian, textual_header_encoding=textual_header_encoding,
+        read_traces=False)
+    for trace in _follow_traces(file, segy_file.data_encoding,
+                                segy_file.endian, poll,
+                                unpack_headers=unpack_headers):
+        yield _segy_trace_to_obspy_trace(segy_file, trace,
+                                         unpack_headers=unpack_headers)
+
+
+def iread_segy_blocks(file, block_size=1024, group_by=None, keys=None,
+                      endian=None, textual_header_encoding=None,
+                      data_encoding=None, prefetch=2):
+    """
+    Iteratively read a SEG-Y file and yield blocks of traces as two
+    dimensional arrays.
+
+    Compared to :func:`iread_segy` there is no per trace overhead which
+    makes a huge difference for files with short traces. The next blocks are
+    read and decoded in a background thread while the current one is
+    processed.
+
+    >>> from obsln.core.util import get_example_file
+    >>> filename = get_example_file("00001034.sgy_first_trace")
+    >>> for data, headers in iread_segy_blocks(filename, block_size=100):
+    ...     print(data.shape, headers['trace_sequence_number_within_line'])
+    (1, 2001) [1]
+
+    :param file: Open file like object or a string which will be assumed to be
+        a filename.
+    :type block_size: int
+    :param block_size: Maximum number of traces per block. Blocks are shorter
+        at the end of the file and wherever the number of samples changes.
+    :type group_by: str
+    :param group_by: If given, every block contains a whole run of
+        consecutive traces with the same value of this trace header key,
+        e.g. ``'ensemble_number'``, regardless of block_size.
+    :type keys: list of str
+    :param keys: The trace header keys in the header tables. Defaults to all
+        keys.
+    :param endian: The endianness of the file. If None, autodetection will
+        be used.
+    :param textual_header_encoding: The encoding of the textual header.
+        Either 'EBCDIC', 'ASCII' or None. If it is None, autodetection will
+        be attempted.
+    :param data_encoding: The data sample format code, if it should not be
+        taken from the binary file header.
+    :type prefetch: int
+    :param prefetch: Number of blocks read ahead in a background thread. 0
+        reads every block only when it is requested.
+    :returns: Tuples of a native array of shape ``(traces, samples)`` and a
+        dictionary mapping every header key to an array with one value per
+        trace.
+    """
+    # Open the file if it is not a file like object.
+    if not hasattr(file, 'read') or not hasattr(file, 'tell') or not \
+            hasattr(file, 'seek'):
+        with open(file, 'rb') as open_file:
+            for block in _internal_iread_segy_blocks(
+                    open_file, block_size=block_size, group_by=group_by,
+                    keys=keys, endian=endian,
+                    textual_header_encoding=textual_header_encoding,
+                    data_encoding=data_encoding, prefetch=prefetch):
+                yield block
+            return
+    # Otherwise just read it.
+    for block in _internal_iread_segy_blocks(
+            file, block_size=block_size, group_by=group_by, keys=keys,
+            endian=endian, textual_header_encoding=textual_header_encoding,
+            data_encoding=data_encoding, prefetch=prefetch):
+        yield block
+
+
+def _internal_iread_segy_blocks(file, block_size=1024, group_by=None,
+                                keys=None, endian=None,
+                                textual_header_encoding=None,
+                                data_encoding=None, prefetch=2):
+    """
+    Iteratively read a SEG-Y file and yield blocks of traces.
+    """
+    segy_file = SEGYFile(
+        file, endian=endian, textual_header_encoding=textual_header_encoding,
+        data_encoding=data_encoding, read_traces=False)
+    blocks = _iter_trace_blocks(file, segy_file.data_encoding,
+                                segy_file.endian, block_size=block_size,
+                                group_by=group_by, keys=keys,
+                                prefetch=prefetch)
+    for block in blocks:
+        yield block
+
+
+def iread_su_blocks(file, block_size=1024, group_by=None, keys=None,
+                    endian=None, prefetch=2):
+    """
+    Iteratively read a SU file and yield blocks of traces as two dimensional
+    arrays.
+
+    See :func:`iread_segy_blocks` for all parameters.
+    """
+    # Open the file if it is not a file like object.
+    if not hasattr(file, 'read') or not hasattr(file, 'tell') or not \
+            hasattr(file, 'seek'):
+        with open(file, 'rb') as open_file:
+            for block in _internal_iread_su_blocks(
+                    open_file, block_size=block_size, group_by=group_by,
+                    keys=keys, endian=endian, prefetch=prefetch):
+                yield block
+            return
+    # Otherwise just read it.
+    for block in _internal_iread_su_blocks(
+            file, block_size=block_size, group_by=group_by, keys=keys,
+            endian=endian, prefetch=prefetch):
+        yield block
+
+
+def _internal_iread_su_blocks(file, block_size=1024, group_by=None,
+                              keys=None, endian=None, prefetch=2):
+    """
+    Iteratively read a SU file and yield blocks of traces.
+    """
+    su_file = SUFile(file, endian=endian, read_traces=False)
+    blocks = _iter_trace_blocks(file, 5, su_file.endian,
+                                block_size=block_size, group_by=group_by,
+                                keys=keys, prefetch=prefetch)
+    for block in blocks:
+        yield block
+
+
+def _iter_trace_blocks(file, data_encoding, endian, block_size=1024,
+                       group_by=None, keys=None, prefetch=2):
+    """
+    Yields blocks of traces starting at the current file pointer position,
+    grouped and prefetched as requested.
+    """
+    if keys is not None and group_by is not None and group_by not in keys:
+        keys = list(keys) + [group_by]
+    blocks = _read_trace_blocks(file, data_encoding, endian, block_size,
+                                keys=keys)
+    if group_by is not None:
+        blocks = _group_trace_blocks(blocks, group_by)
+    if prefetch:
+        blocks = _prefetch(blocks, prefetch)
+    try:
+        for block in blocks:
+            yield block
+    finally:
+        # Make sure a prefetching thread is done before the file is closed.
+        blocks.close()
+
+
+def _read_trace_blocks(file, data_encoding, endian, block_size, keys=None):
+    """
+    Reads blocks of up to block_size consecutive traces with the same number
+    of samples, each one with a single read call.
+    """
+    sample_size = DATA_SAMPLE_FORMAT_SAMPLE_SIZE[data_encoding]
+    sample_dtype = _sample_dtype(data_encoding, endian)
+    npts_key = _number_of_samples_key()
+    while True:
+        first_header = file.read(240)
+        if len(first_header) != 240:
+            return
+        npts = _unpack_number_of_samples(first_header, endian)
+        record_size = 240 + npts * sample_size
+        raw = first_header + file.read(block_size * record_size - 240)
+        count = len(raw) // record_size
+        if npts < 1 or not count:
+            msg = """
+                  Too little data left in the file to unpack it according to
+                  its trace header. This is most likely either due to a wrong
+                  byte order or a corrupt file.
+                  """.strip()
+            raise SEGYTraceReadingError(msg)
+        records = np.frombuffer(raw, count=count, dtype=[
+            ('header', np.void, 240), ('data', sample_dtype, (npts,))])
+        # Cut the block at the first trace with a different length.
+        lengths = unpack_trace_header_table(records['header'], endian,
+                                            keys=[npts_key])[npts_key]
+        count = np.argmin(lengths == npts) if np.any(lengths != npts) \
+            else count
+        records = records[:count]
+        file.seek(count * record_size - len(raw), 1)
+        headers = unpack_trace_header_table(records['header'], endian,
+                                            keys=keys)
+        if data_encoding == 1:
+            data = ibm_to_ieee(records['data'])
+        else:
+            data = np.array(records['data'],
+                            dtype=sample_dtype.newbyteorder('='))
+        yield data, headers
+
+
+def _group_trace_blocks(blocks, key):
+    """
+    Regroups blocks of traces so every block holds one run of consecutive
+    traces with the same value of a trace header key.
+
+    Runs with varying trace lengths are split wherever the length changes.
+    """
+    pending = []
+    for data, headers in blocks:
+        values = headers[key]
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(values)) + 1])
+        ends = np.concatenate([starts[1:], [len(values)]])
+        for start, end in zip(starts, ends):
+            if pending and (pending[-1][1][key][0] != values[start] or
+                            pending[-1][0].shape[1] != data.shape[1]):
+                yield _concatenate_trace_blocks(pending)
+                pending = []
+            pending.append((data[start:end], dict(
+                (_k, _v[start:end]) for _k, _v in headers.items())))
+    if pending:
+        yield _concatenate_trace_blocks(pending)
+
+
+def _concatenate_trace_blocks(blocks):
+    """
+    Concatenates blocks of traces with the same number of samples.
+    """
+    if len(blocks) == 1:
+        return blocks[0]
+    data = np.concatenate([_i[0] for _i in blocks])
+    headers = dict((_k, np.concatenate([_i[1][_k] for _i in blocks]))
+                   for _k in blocks[0][1])
+    return data, headers
+
+
+def _prefetch(iterator, size):
+    """
+    Runs an iterator in a background thread always keeping up to size items
+    ready. Exceptions are raised in the consuming thread.
+    """
+    # Import here as it is only needed for prefetching.
+    from queue import Full, Queue
+
+    queue = Queue(maxsize=size)
+    stop = threading.Event()
+
+    def _put(item):
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def _worker():
+        try:
+            for item in iterator:
+                if not _put((True, item)):
+                    return
+        except Exception as e:
+            _put((False, e))
+        else:
+            _put((False, None))
+
+    thread = threading.Thread(target=_worker)
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            ok, item = queue.get()
+            if not ok:
+                if item is not None:
+                    raise item
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def iread_su(file, endian=None, unpack_headers=False, headonly=False):
+    """
+    Iteratively read a SU field and yield single ObsPy Traces.
+
+    The function iteratively loops over the whole file and yields single
+    ObsPy Traces. The next Trace will be read after the current loop has
+    finished - this function is thus suitable for reading arbitrarily large
+    SU files without running into memory problems.
+
+    >>> from obspy.core.util import get_example_file
+    >>> filename = get_example_file("1.su_first_trace")
+    >>> from obspy.io.segy.segy import iread_su
+    >>> for tr in iread_su(filename):
+    ...     # Each Trace's stats attribute will have some file-wide
+    ...     # information.
+    ...     de = tr.stats.su.data_encoding
+    ...     e = tr.stats.su.endian
+    ...     # Also do something meaningful with each Trace.
     ...     print(int(tr.data.sum()))
     -26121
 
@@ -1210,15 +3673,338 @@ def _internal_iread_su(file, endian=None, unpack_headers=False,
     for trace in su_file._read_traces(unpack_headers=unpack_headers,
                                       headonly=headonly,
                                       yield_each_trace=True):
-        tr = trace.to_obspy_trace(unpack_trace_headers=unpack_headers,
-                                  headonly=headonly)
-        tr.stats.su = tr.stats.segy
-        del tr.stats.segy
-        # Fill stats that are normally attached to the stream stats.
-        tr.stats.su.data_encoding = trace.data_encoding
-        tr.stats.su.endian = trace.endian
-        tr.stats._format = "SU"
-        yield tr
+        yield _su_trace_to_obspy_trace(trace, unpack_headers=unpack_headers,
+                                       headonly=headonly)
+
+
+def _su_trace_to_obspy_trace(trace, unpack_headers=False, headonly=False):
+    """
+    Converts a SEGYTrace of a SU file read on its own to an ObsPy Trace.
+    """
+    tr = trace.to_obspy_trace(unpack_trace_headers=unpack_headers,
+                              headonly=headonly)
+    tr.stats.su = tr.stats.segy
+    del tr.stats.segy
+    # Fill stats that are normally attached to the stream stats.
+    tr.stats.su.data_encoding = trace.data_encoding
+    tr.stats.su.endian = trace.endian
+    tr.stats._format = "SU"
+    return tr
+
+
+def follow_su(file, interval=1.0, backoff=1.0, max_interval=None,
+              timeout=None, endian=None, unpack_headers=False):
+    """
+    Reads a SU file that is still being written and yields single ObsPy
+    Traces as soon as they are complete.
+
+    If the endianness is not given, it is determined from the first trace
+    once it is complete. See :func:`follow_segy` for the polling parameters
+    and :func:`iread_su` for all other parameters.
+    """
+    # Open the file if it is not a file like object.
+    if not hasattr(file, 'read') or not hasattr(file, 'tell') or not \
+            hasattr(file, 'seek'):
+        with open(file, 'rb') as open_file:
+            for tr in follow_su(
+                    open_file, interval=interval, backoff=backoff,
+                    max_interval=max_interval, timeout=timeout,
+                    endian=endian, unpack_headers=unpack_headers):
+                yield tr
+            return
+    poll = (interval, backoff, max_interval, timeout)
+    if endian:
+        endian = ENDIAN[endian]
+    else:
+        endian = _follow_su_endianness(file, poll)
+        if endian is None:
+            return
+    for trace in _follow_traces(file, 5, endian, poll,
+                                unpack_headers=unpack_headers):
+        yield _su_trace_to_obspy_trace(trace, unpack_headers=unpack_headers)
+
+
+def _follow_su_endianness(file, poll):
+    """
+    Waits for the first trace of a SU file to be complete and determines the
+    endianness from it, see :func:`autodetect_endian_and_sanity_check_su`.
+
+    :returns: The endianness or None if the file did not grow in time.
+    """
+    interval, backoff, max_interval, timeout = poll
+    deadline = _get_deadline(timeout)
+    pos = file.tell()
+    if not _wait_for_file_size(file, pos + 240, interval, backoff,
+                               max_interval, deadline):
+        return None
+    header = file.read(240)
+    file.seek(pos, 0)
+    # The length of the first trace in both byte orders, shorter first.
+    lengths = sorted(set(
+        240 + unpack(fmt, header[114:116])[0] * 4 for fmt in (b'<h', b'>h')
+        if unpack(fmt, header[114:116])[0] > 0))
+    for length in lengths:
+        if not _wait_for_file_size(file, pos + length, interval, backoff,
+                                   max_interval, deadline):
+            return None
+        head = FileHead(file.read(length), getattr(file, 'name', None),
+                        length)
+        file.seek(pos, 0)
+        endian = autodetect_endian_and_sanity_check_su(head)
+        if endian:
+            return endian
+    msg = 'Autodetection of Endianness failed. Please specify it ' + \
+          'by hand or contact the developers.'
+    raise Exception(msg)
+
+
+def _follow_traces(file, data_encoding, endian, poll, unpack_headers=False):
+    """
+    Yields every trace starting at the current file pointer position as soon
+    as it is completely written, see :func:`follow_segy`.
+
+    :param poll: The interval, backoff, max_interval and timeout arguments
+        of :func:`follow_segy`.
+    """
+    interval, backoff, max_interval, timeout = poll
+    sample_size = DATA_SAMPLE_FORMAT_SAMPLE_SIZE[data_encoding]
+    offset = file.tell()
+    while True:
+        deadline = _get_deadline(timeout)
+        if not _wait_for_file_size(file, offset + 240, interval, backoff,
+                                   max_interval, deadline):
+            return
+        file.seek(offset, 0)
+        npts = _unpack_number_of_samples(file.read(240), endian)
+        end = offset + 240 + max(npts, 0) * sample_size
+        if not _wait_for_file_size(file, end, interval, backoff,
+                                   max_interval, deadline):
+            return
+        file.seek(offset, 0)
+        # Never read beyond the trace even if more has been written since.
+        trace = SEGYTrace(file, data_encoding, endian,
+                          unpack_headers=unpack_headers, filesize=end)
+        offset = end
+        file.seek(offset, 0)
+        yield trace
+
+
+def _get_deadline(timeout):
+    """
+    Returns the point in time of :func:`time.monotonic` timeout seconds from
+    now or None if timeout is None.
+    """
+    if timeout is None:
+        return None
+    return time.monotonic() + timeout
+
+
+def _wait_for_file_size(file, size, interval=1.0, backoff=1.0,
+                        max_interval=None, deadline=None):
+    """
+    Polls the size of a growing file until it is at least size bytes.
+
+    The waiting time starts at interval and is multiplied by backoff after
+    every poll up to max_interval.
+
+    :param deadline: Give up at this point in time of
+        :func:`time.monotonic`. Defaults to None, wait forever.
+    :returns: True once the file is large enough or False if the deadline
+        passed before.
+    """
+    if _get_filesize(file) >= size:
+        return True
+    delay = interval
+    while True:
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(delay, remaining))
+        else:
+            time.sleep(delay)
+        if _get_filesize(file) >= size:
+            return True
+        delay *= backoff
+        if max_interval is not None:
+            delay = min(delay, max_interval)
+
+
+def iread_su_stream(stream, endian=None, unpack_headers=False):
+    """
+    Reads SU traces from a stream that can neither seek nor tell its size,
+    e.g. ``sys.stdin.buffer`` fed by a pipe, and yields single ObsPy Traces.
+
+    Only one trace is buffered at any time. If the endianness is not given,
+    it is determined from the first trace which is read ahead for that.
+
+    >>> import sys
+    >>> from obsln.io.segy.segy import iread_su_stream, SUStreamWriter
+    >>> def main():  # doctest: +SKIP
+    ...     # e.g. suplane | python scale.py | suximage
+    ...     with SUStreamWriter(sys.stdout.buffer) as writer:
+    ...         for tr in iread_su_stream(sys.stdin.buffer):
+    ...             tr.data *= 2
+    ...             writer.write_trace(tr)
+
+    :param stream: File like object with a read method. Short reads are
+        fine.
+    :type endian: str
+    :param endian: String that determines the endianness of the stream.
+        Either '>' for big endian or '<' for little endian. If it is None,
+        it will be autodetected.
+    :type unpack_headers: bool
+    :param unpack_headers: Determines whether or not all headers will be
+        unpacked right away. Defaults to False.
+    """
+    if endian:
+        endian = ENDIAN[endian]
+        record = None
+    else:
+        endian, record = _peek_su_endianness(stream)
+        if endian is None:
+            return
+    while True:
+        if record is None:
+            header = _read_exactly(stream, 240)
+            if not header:
+                return
+            if len(header) != 240:
+                msg = 'The trace header needs to be 240 bytes long'
+                raise SEGYTraceHeaderTooSmallError(msg)
+            npts = _unpack_number_of_samples(header, endian)
+            data = _read_exactly(stream, max(npts, 0) * 4)
+            record = header + data
+        trace = SEGYTrace(io.BytesIO(record), 5, endian,
+                          unpack_headers=unpack_headers,
+                          filesize=len(record))
+        record = None
+        yield _su_trace_to_obspy_trace(trace, unpack_headers=unpack_headers)
+
+
+def _peek_su_endianness(stream):
+    """
+    Determines the endianness of a SU stream from its first trace.
+
+    The first trace is read for it as the stream can not be rewound. Both
+    possible lengths of the trace are tried, the shorter one first, so never
+    more than the first trace is read.
+
+    :returns: The endianness and the raw first trace or None and empty bytes
+        for an empty stream.
+    """
+    record = _read_exactly(stream, 240)
+    if not record:
+        return None, b''
+    if len(record) == 240:
+        counts = [unpack(fmt, record[114:116])[0] for fmt in (b'<h', b'>h')]
+        for length in sorted(set(240 + _i * 4 for _i in counts if _i > 0)):
+            record += _read_exactly(stream, length - len(record))
+            if len(record) != length:
+                break
+            endian = autodetect_endian_and_sanity_check_su(
+                FileHead(record, getattr(stream, 'name', None), length))
+            if endian:
+                return endian, record
+    msg = 'Autodetection of Endianness failed. Please specify it ' + \
+          'by hand or contact the developers.'
+    raise Exception(msg)
+
+
+def _read_exactly(stream, size):
+    """
+    Reads size bytes from a stream that might return less per call, e.g. a
+    pipe. Returns fewer bytes only at the end of the stream.
+    """
+    data = stream.read(size)
+    if len(data) == size or not data:
+        return data
+    chunks = [data]
+    size -= len(data)
+    while size > 0:
+        data = stream.read(size)
+        if not data:
+            break
+        chunks.append(data)
+        size -= len(data)
+    return b''.join(chunks)
+
+
+class SUStreamWriter(object):
+    """
+    Writes SU traces one at a time to a stream that can not seek, e.g.
+    ``sys.stdout.buffer`` feeding a pipe.
+
+    Every trace is packed and written as soon as it is passed to the writer,
+    see :func:`iread_su_stream` for an example.
+    """
+    def __init__(self, file, endian='>', flush=False):
+        """
+        :param file: File like object with a write method or a string which
+            will be assumed to be a filename.
+        :param endian: The endianness of the traces.
+        :type flush: bool
+        :param flush: Flush the stream after every trace so the next stage
+            of a pipe gets it right away.
+        """
+        self.endian = ENDIAN[endian]
+        self._flush = flush
+        self.trace_count = 0
+        self._own_file = not hasattr(file, 'write')
+        if self._own_file:
+            file = open(file, 'wb')
+        self.file = file
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __str__(self):
+        return '%i traces written to the SU stream.' % self.trace_count
+
+    def _repr_pretty_(self, p, cycle):
+        p.text(str(self))
+
+    def write_trace(self, trace):
+        """
+        Packs a single trace and writes it to the stream.
+
+        :param trace: Either a :class:`SEGYTrace` or an ObsPy
+            :class:`~obspy.core.trace.Trace` with float32 data.
+        """
+        if self.file is None:
+            msg = 'The SU writer has already been closed.'
+            raise SEGYWritingError(msg)
+        if isinstance(trace, Trace):
+            # Import here to avoid circular imports.
+            from .core import _su_trace_from_obspy_trace
+            trace = _su_trace_from_obspy_trace(trace, self.endian)
+        trace.write(self.file, data_encoding=5, endian=self.endian)
+        self.trace_count += 1
+        if self._flush:
+            self.file.flush()
+
+    def write_traces(self, traces):
+        """
+        Writes all traces of an iterable, e.g. a generator or a Stream.
+        """
+        for trace in traces:
+            self.write_trace(trace)
+
+    def close(self):
+        """
+        Flushes the stream and closes it if it has been opened by the
+        writer.
+        """
+        if self.file is None:
+            return
+        if self._own_file:
+            self.file.close()
+        else:
+            self.file.flush()
+        self.file = None
 
 
 class SUFile(object):
@@ -1227,7 +4013,8 @@ class SUFile(object):
     currently can only read IEEE 4 byte float encoded SU data files.
     """
     def __init__(self, file=None, endian=None, unpack_headers=False,
-                 headonly=False, read_traces=True):
+                 headonly=False, read_traces=True, starttime=None,
+                 endtime=None, nearest_sample=True, out=None):
         """
         :param file: A file like object with the file pointer set at the
             beginning of the SEG Y file. If file is None, an empty SEGYFile
@@ -1249,6 +4036,12 @@ class SUFile(object):
         :param read_traces: Data traces will only be read if this is set to
             ``True``. The data will be completely ignored if this is set to
             ``False``.
+
+        :type out: :class:`numpy.ndarray`
+        :param out: Two dimensional float32 array with one row per trace the
+            data is decoded into. See :meth:`SEGYFile._read_traces`.
+
+        See :class:`SEGYTrace` for the time window parameters.
         """
         if file is None:
             self._create_empty_su_file_object()
@@ -1268,7 +4061,11 @@ class SUFile(object):
         if read_traces:
             # Read the actual traces.
             [i for i in self._read_traces(unpack_headers=unpack_headers,
-                                          headonly=headonly)]
+                                          headonly=headonly,
+                                          starttime=starttime,
+                                          endtime=endtime,
+                                          nearest_sample=nearest_sample,
+                                          out=out)]
 
     def _autodetect_endianness(self):
         """
@@ -1296,7 +4093,8 @@ class SUFile(object):
         p.text(str(self))
 
     def _read_traces(self, unpack_headers=False, headonly=False,
-                     yield_each_trace=False):
+                     yield_each_trace=False, starttime=None, endtime=None,
+                     nearest_sample=True, out=None):
         """
         Reads the actual traces starting at the current file pointer position
         to the end of the file.
@@ -1317,8 +4115,14 @@ class SUFile(object):
             streaming interface to read SEG-Y files. Read traces will no
             longer be collected in ``self.traces`` list if this is set to
             ``True``.
+        :type out: :class:`numpy.ndarray`
+        :param out: See :meth:`SEGYFile._read_traces`.
         """
         self.traces = []
+        # All traces read their data on the fly through the same handle.
+        self.data_reader = _shared_file_reader(self.file) if headonly \
+            else None
+        rows, empty_row = _out_rows(out)
         # Big loop to read all data traces.
         while True:
             # Read and as soon as the trace header is too small abort.
@@ -1326,7 +4130,11 @@ class SUFile(object):
                 # Always unpack with IEEE
                 trace = SEGYTrace(self.file, 5, self.endian,
                                   unpack_headers=unpack_headers,
-                                  headonly=headonly)
+                                  headonly=headonly,
+                                  data_reader=self.data_reader,
+                                  starttime=starttime, endtime=endtime,
+                                  nearest_sample=nearest_sample,
+                                  out=next(rows, empty_row))
                 if yield_each_trace:
                     yield trace
                 else:
@@ -1359,7 +4167,8 @@ class SUFile(object):
             trace.write(file, data_encoding=5, endian=endian)
 
 
-def _read_su(file, endian=None, unpack_headers=False, headonly=False):
+def _read_su(file, endian=None, unpack_headers=False, headonly=False,
+             starttime=None, endtime=None, nearest_sample=True, out=None):
     """
     Reads a Seismic Unix (SU) file and returns a SUFile object.
 
@@ -1379,6 +4188,17 @@ def _read_su(file, endian=None, unpack_headers=False, headonly=False):
     :param headonly: Determines whether or not the actual data records will be
         unpacked. Useful if one is just interested in the headers. Defaults to
         False.
+    :type starttime: :class:`~obspy.core.utcdatetime.UTCDateTime`
+    :param starttime: Only read and decode the samples of every trace after
+        this time. Defaults to None which reads the whole traces.
+    :type endtime: :class:`~obspy.core.utcdatetime.UTCDateTime`
+    :param endtime: Only read and decode the samples of every trace before
+        this time. Defaults to None which reads the whole traces.
+    :type nearest_sample: bool
+    :param nearest_sample: See :meth:`~obspy.core.trace.Trace.trim`.
+    :type out: :class:`numpy.ndarray`
+    :param out: Two dimensional float32 array with at least one row per
+        trace the data is decoded into, see :meth:`SEGYFile._read_traces`.
     """
     # Open the file if it is not a file like object.
     if not hasattr(file, 'read') or not hasattr(file, 'tell') or not \
@@ -1386,13 +4206,19 @@ def _read_su(file, endian=None, unpack_headers=False, headonly=False):
         with open(file, 'rb') as open_file:
             return _internal_read_su(open_file, endian=endian,
                                      unpack_headers=unpack_headers,
-                                     headonly=headonly)
+                                     headonly=headonly, starttime=starttime,
+                                     endtime=endtime,
+                                     nearest_sample=nearest_sample, out=out)
     # Otherwise just read it.
     return _internal_read_su(file, endian=endian,
-                             unpack_headers=unpack_headers, headonly=headonly)
+                             unpack_headers=unpack_headers, headonly=headonly,
+                             starttime=starttime, endtime=endtime,
+                             nearest_sample=nearest_sample, out=out)
 
 
-def _internal_read_su(file, endian=None, unpack_headers=False, headonly=False):
+def _internal_read_su(file, endian=None, unpack_headers=False, headonly=False,
+                      starttime=None, endtime=None, nearest_sample=True,
+                      out=None):
     """
     Reads on open file object and returns a SUFile object.
 
@@ -1411,9 +4237,12 @@ def _internal_read_su(file, endian=None, unpack_headers=False, headonly=False):
     :param headonly: Determines whether or not the actual data records will be
         unpacked. Useful if one is just interested in the headers. Defaults to
         False.
+
+    See :func:`_read_su` for the time window and out parameters.
     """
     return SUFile(file, endian=endian, unpack_headers=unpack_headers,
-                  headonly=headonly)
+                  headonly=headonly, starttime=starttime, endtime=endtime,
+                  nearest_sample=nearest_sample, out=out)
 
 
 def autodetect_endian_and_sanity_check_su(file):
@@ -1431,7 +4260,9 @@ def autodetect_endian_and_sanity_check_su(file):
     the Trace header.
     """
     pos = file.tell()
-    if isinstance(file, io.BytesIO):
+    if isinstance(file, FileHead):
+        size = file.size
+    elif isinstance(file, io.BytesIO):
         file.seek(0, 2)
         size = file.tell()
         file.seek(pos, 0)
@@ -0,0 +1,63 @@
+/*--------------------------------------------------------------------
+# Filename: ieee2ibm.c
+#  Purpose: Converts an array of IEEE floats to 32 bit IBM floats.
+#---------------------------------------------------------------------*/
+#include <stddef.h>
+#include <stdint.h>
+#include <string.h>
+
+
+/* Converts an array of 32 bit IEEE floating point numbers to IBM floating
+ * point numbers.
+ *
+ * Parameters:
+ *	ieee: Array of 32 bit IEEE floating point numbers.
+ *	ibm: Output array for the IBM floating point numbers as native 32 bit
+ *	     words. May be the same memory as ieee to convert in place.
+ *	len: Number of samples in the array.
+ *
+ * The mantissa is truncated just like the NumPy version does. Zeros and
+ * numbers too small for the IBM format become zero, infinities and NaNs
+ * become the largest IBM number with the same sign.
+ */
+
+void ieee2ibm(const float *ieee, uint32_t *ibm, size_t len) {
+    size_t i = 0;
+    uint32_t word, sign, fraction;
+    int exponent, shift;
+    for (i=0; i<len; i++) {
+	/* memcpy instead of a pointer cast to stay clear of aliasing
+	 * problems, the compiler turns it into a plain load. */
+	memcpy(&word, &ieee[i], 4);
+	sign = word & 0x80000000;
+	exponent = (word >> 23) & 0xff;
+	fraction = word & 0x007fffff;
+	if (exponent == 255) {
+	    ibm[i] = sign | 0x7fffffff;
+	    continue;
+	}
+	if (exponent == 0) {
+	    if (fraction == 0) {
+		ibm[i] = 0;
+		continue;
+	    }
+	    /* Normalize subnormal numbers. */
+	    exponent = 1;
+	    while (!(fraction & 0x00800000)) {
+		fraction <<= 1;
+		exponent--;
+	    }
+	}
+	else {
+	    fraction |= 0x00800000;
+	}
+	/* The value is fraction / 2^24 * 2^(exponent - 126). Turn the
+	 * power of two into a power of 16 by shifting the fraction right
+	 * by up to three bits. The offset keeps the division positive. */
+	exponent -= 126;
+	shift = (4 - ((exponent + 512) % 4)) % 4;
+	exponent = (exponent + shift) / 4 + 64;
+	ibm[i] = sign | ((uint32_t)exponent << 24) | (fraction >> shift);
+    }
+    return;
+}
@@ -7,6 +7,8 @@ import unittest
 
 from obspy.core.util import add_doctests, add_unittests
 
+from obsln.io.segy.segy import SEGYBinaryFileHeader, SEGYFile, SEGYTrace
+
 
 MODULE_NAME = "obspy.io.segy"
 
@@ -31,6 +33,30 @@ def _patch_header(header, ebcdic=False):
     return header
 
 
+def _create_segy_file(filename, data, data_encoding=5, endian='>',
+                      headers=None):
+    """
+    Helper function writing a SEG Y file with one trace per row of data.
+
+    Trace header values can be given as a dictionary mapping the header key
+    to a sequence with one value per trace.
+    """
+    segy = SEGYFile(endian=endian)
+    segy.binary_file_header = SEGYBinaryFileHeader(endian=endian)
+    segy.binary_file_header.sample_interval_in_microseconds = 1000
+    for i, samples in enumerate(data):
+        trace = SEGYTrace(data_encoding=data_encoding, endian=endian)
+        trace.data = samples
+        trace.header.trace_sequence_number_within_line = i + 1
+        trace.header.trace_sequence_number_within_segy_file = i + 1
+        trace.header.sample_interval_in_ms_for_this_trace = 1000
+        trace.header.number_of_samples_in_this_trace = len(samples)
+        for key, values in (headers or {}).items():
+            setattr(trace.header, key, values[i])
+        segy.traces.append(trace)
+    segy.write(filename, data_encoding=data_encoding, endian=endian)
+
+
 def suite():
     suite = unittest.TestSuite()
     add_doctests(suite, MODULE_NAME)
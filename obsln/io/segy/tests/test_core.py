@@ -8,7 +8,13 @@ from future.builtins import *  # NOQA
 
 import io
 import os
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
 import unittest
+from unittest import mock
 from struct import unpack
 import warnings
 
@@ -22,7 +28,10 @@ from obspy.io.segy.core import (SEGYCoreWritingError, SEGYSampleIntervalError,
 from obspy.io.segy.segy import _read_segy as _read_segy_internal
 from obspy.io.segy.segy import SEGYError, SEGYFile, SEGYTrace, \
     SEGYBinaryFileHeader
-from obspy.io.segy.tests import _patch_header
+from obspy.io.segy.tests import _create_segy_file, _patch_header
+from obsln.core.util import base
+from obsln.io.segy.header import DATA_SAMPLE_FORMAT_UNPACK_FUNCTIONS
+from obsln.io.segy.segy import SEGYWriter, _internal_read_segy_parallel
 from obspy.io.segy.tests.header import DTYPES, FILES
 
 
@@ -691,6 +700,292 @@ class SEGYCoreTestCase(unittest.TestCase):
             "index 0):\n... | 1970-01-01T00:00:00.000000Z - "
             "1970-01-01T00:05:27.670000Z | 100.0 Hz, 32768 samples")
 
+    def test_reading_with_multiple_workers(self):
+        """
+        Reading with several worker processes results in the same stream.
+        """
+        for file in self.files:
+            file = os.path.join(self.path, file)
+            st = _read_segy(file)
+            st2 = _read_segy(file, workers=2)
+            self.assertEqual(len(st), len(st2))
+            for tr, tr2 in zip(st, st2):
+                np.testing.assert_array_equal(tr.data, tr2.data)
+                self.assertEqual(tr.stats.starttime, tr2.stats.starttime)
+                self.assertEqual(tr.stats.delta, tr2.stats.delta)
+
+    def test_streaming_writer_with_obspy_traces(self):
+        """
+        The streaming writer accepts ObsPy Traces and writes them just like
+        _write_segy does.
+        """
+        file = os.path.join(self.path, '1.sgy_first_trace')
+        st = _read_segy(file)
+        with io.BytesIO() as buf:
+            _write_segy(st, buf)
+            expected = buf.getvalue()
+        segy = _read_segy_internal(file)
+        with io.BytesIO() as buf:
+            with SEGYWriter(buf, binary_file_header=segy.binary_file_header,
+                            textual_file_header=segy.textual_file_header,
+                            data_encoding=st.stats.data_encoding,
+                            endian=st.stats.endian) as writer:
+                writer.write_traces(st)
+            self.assertEqual(buf.getvalue(), expected)
+
+    def test_reading_time_window(self):
+        """
+        Reading with starttime and endtime results in the same traces as
+        trimming them afterwards but only decodes the samples in the window.
+        """
+        files = [(os.path.join(self.path, _i), _read_segy)
+                 for _i in self.files]
+        files += [(os.path.join(self.path, '1.su_first_trace'), _read_su),
+                  (os.path.join(self.path, 'one_trace_year_11.su'), _read_su)]
+        counts = []
+
+        def _recording(func):
+            def _unpack(file, count, endian='>', out=None):
+                counts.append(count)
+                return func(file, count, endian=endian, out=out)
+            return _unpack
+
+        unpack_functions = {
+            _k: _recording(_v)
+            for _k, _v in DATA_SAMPLE_FORMAT_UNPACK_FUNCTIONS.items()}
+        for file, read_func in files:
+            st = read_func(file)
+            tr = st[0]
+            duration = tr.stats.endtime - tr.stats.starttime
+            windows = [
+                (tr.stats.starttime + 0.25 * duration,
+                 tr.stats.endtime - 0.4 * duration, True),
+                (tr.stats.starttime + 0.1 * duration + 0.3 * tr.stats.delta,
+                 None, False),
+                (None, tr.stats.starttime + 0.5 * duration, True),
+                (tr.stats.endtime + 10 * tr.stats.delta, None, True)]
+            for starttime, endtime, nearest_sample in windows:
+                expected = [_i.copy() for _i in st]
+                for tr in expected:
+                    if starttime is not None:
+                        tr._ltrim(starttime, nearest_sample=nearest_sample)
+                    if endtime is not None:
+                        tr._rtrim(endtime, nearest_sample=nearest_sample)
+                del counts[:]
+                with mock.patch.dict(DATA_SAMPLE_FORMAT_UNPACK_FUNCTIONS,
+                                     unpack_functions):
+                    st2 = read_func(file, starttime=starttime,
+                                    endtime=endtime,
+                                    nearest_sample=nearest_sample)
+                self.assertEqual(counts, [len(_i) for _i in expected])
+                for tr, tr2 in zip(expected, st2):
+                    np.testing.assert_array_equal(tr.data, tr2.data)
+                    self.assertEqual(tr.stats.starttime,
+                                     tr2.stats.starttime)
+                    self.assertEqual(tr.stats.npts, tr2.stats.npts)
+
+    def test_reading_into_preallocated_array(self):
+        """
+        The data of all traces of the stream are views of the given array.
+        """
+        file = os.path.join(self.path, '1.sgy_first_trace')
+        st = _read_segy(file)
+        out = np.empty((1, st[0].stats.npts), dtype=st[0].data.dtype)
+        st2 = _read_segy(file, out=out)
+        np.testing.assert_array_equal(st[0].data, st2[0].data)
+        self.assertTrue(np.shares_memory(st2[0].data, out))
+        file = os.path.join(self.path, '1.su_first_trace')
+        out = np.empty((1, 8000), dtype=np.float32)
+        st = _read_su(file, out=out)
+        self.assertTrue(np.shares_memory(st[0].data, out))
+
+    def test_pickling_lazy_trace_headers(self):
+        """
+        The lazily unpacked trace headers survive pickling, e.g. when traces
+        are sent between processes.
+        """
+        file = os.path.join(self.path, '1.sgy_first_trace')
+        header = _read_segy(file)[0].stats.segy.trace_header
+        header2 = pickle.loads(pickle.dumps(header))
+        for key in ('trace_sequence_number_within_line',
+                    'number_of_samples_in_this_trace', 'year_data_recorded'):
+            self.assertEqual(getattr(header, key), getattr(header2, key))
+
+    def test_reading_multiple_files_with_workers(self):
+        """
+        Reading a file pattern with several worker processes results in the
+        same stream in the order of the sorted file names.
+        """
+        tempdir = tempfile.mkdtemp()
+        try:
+            for _i, file in enumerate(sorted(self.files, reverse=True)):
+                shutil.copy(os.path.join(self.path, file),
+                            os.path.join(tempdir, '%i.sgy' % _i))
+            pattern = os.path.join(tempdir, '*.sgy')
+            st = read(pattern, format='SEGY')
+            st2 = read(pattern, format='SEGY', workers=2)
+            self.assertEqual(len(st), len(self.files))
+            self.assertEqual(len(st), len(st2))
+            for tr, tr2 in zip(st, st2):
+                np.testing.assert_array_equal(tr.data, tr2.data)
+                self.assertEqual(tr.stats.starttime, tr2.stats.starttime)
+                self.assertEqual(
+                    tr.stats.segy.trace_header.trace_sequence_number_within_line,
+                    tr2.stats.segy.trace_header.trace_sequence_number_within_line)
+            # A single file passes the workers on to the SEG Y reader.
+            with mock.patch('obsln.io.segy.segy._internal_read_segy_parallel',
+                            wraps=_internal_read_segy_parallel) as m:
+                st3 = read(os.path.join(tempdir, '0.sgy'), format='SEGY',
+                           workers=2)
+            self.assertEqual(m.call_count, 1)
+            np.testing.assert_array_equal(st3[0].data, st[0].data)
+        finally:
+            shutil.rmtree(tempdir)
+
+    def test_reading_headonly_shares_data_reader(self):
+        """
+        Header only traces share one file handle and read their data only
+        when it is unpacked.
+        """
+        data = np.arange(60, dtype=np.float32).reshape(6, 10)
+        with NamedTemporaryFile() as tf, NamedTemporaryFile() as tf2:
+            _create_segy_file(tf.name, data)
+            read(tf.name, format='SEGY').write(tf2.name, format='SU')
+            for file, format in ((tf.name, 'SEGY'), (tf2.name, 'SU')):
+                key = format.lower()
+                with mock.patch('obsln.io.segy.unpack.os.pread',
+                                wraps=os.pread) as m:
+                    st = read(file, format=format, headonly=True)
+                    self.assertEqual(m.call_count, 0)
+                    self.assertEqual(len(st), 6)
+                    readers = set(id(tr.stats[key].unpack_data.reader)
+                                  for tr in st)
+                    self.assertEqual(len(readers), 1)
+                    for tr, expected in zip(st, data):
+                        self.assertEqual(len(tr.data), 0)
+                        self.assertEqual(tr.stats.npts, 10)
+                        np.testing.assert_array_equal(
+                            tr.stats[key].unpack_data(), expected)
+                    self.assertEqual(m.call_count, 6)
+                # Copies read the data through a handle of their own.
+                np.testing.assert_array_equal(
+                    st.copy()[0].stats[key].unpack_data(), data[0])
+                st[0].stats[key].unpack_data.reader.close()
+
+    def test_reading_file_like_objects_with_workers(self):
+        """
+        The number of workers is only passed on to the plugin for files on
+        disk, file like objects are read as usual.
+        """
+        file = os.path.join(self.path, sorted(self.files)[0])
+        with open(file, 'rb') as f:
+            data = f.read()
+        st = read(file, format='SEGY')
+        st2 = read(io.BytesIO(data), format='SEGY', workers=2)
+        self.assertEqual(len(st), len(st2))
+        for tr, tr2 in zip(st, st2):
+            np.testing.assert_array_equal(tr.data, tr2.data)
+
+    def test_writing_in_append_mode(self):
+        """
+        Traces written in append mode end up after the ones already in the
+        file, with the data encoding and byte order of the file.
+        """
+        st = Stream([Trace(data=np.arange(_i, _i + 10, dtype=np.int32))
+                     for _i in range(5)])
+        for tr in st:
+            tr.stats.delta = 0.004
+        with NamedTemporaryFile() as tf:
+            _write_segy(st[:3], tf.name, data_encoding=2, byteorder='<')
+            _write_segy(st[3:], tf.name, append=True)
+            st2 = read(tf.name, format='SEGY')
+            self.assertEqual(len(st2), 5)
+            self.assertEqual(st2.stats.endian, '<')
+            self.assertEqual(
+                st2.stats.binary_file_header.data_sample_format_code, 2)
+            self.assertEqual(st2.stats.binary_file_header.
+                             number_of_data_traces_per_ensemble, 5)
+            for tr, tr2 in zip(st, st2):
+                np.testing.assert_array_equal(tr.data, tr2.data)
+                self.assertEqual(tr2.stats.delta, 0.004)
+            # Mismatching encodings or dtypes are refused.
+            self.assertRaises(SEGYError, _write_segy, st, tf.name,
+                              data_encoding=5, append=True)
+            st[0].data = st[0].data.astype(np.float32)
+            self.assertRaises(SEGYCoreWritingError, _write_segy, st,
+                              tf.name, append=True)
+            self.assertEqual(len(read(tf.name, format='SEGY')), 5)
+
+    def test_format_detection_on_file_head(self):
+        """
+        The SEG Y and SU checks only need the first bytes of a file and its
+        size.
+        """
+        for filename, segy, su in (('1.sgy_first_trace', True, False),
+                                   ('1.su_first_trace', False, True)):
+            filename = os.path.join(self.path, filename)
+            with open(filename, 'rb') as fh:
+                data = fh.read()
+            head = base.FileHead(data[:base.FORMAT_DETECTION_HEAD_SIZE],
+                                 filename, len(data))
+            self.assertEqual(_is_segy(head), segy)
+            # The file position is left alone.
+            self.assertEqual(head.tell(), 0)
+            self.assertEqual(_is_su(head), su)
+        # A too short head is no SEG Y file.
+        buf = io.BytesIO(data[:3500])
+        self.assertFalse(_is_segy(buf))
+        self.assertEqual(buf.tell(), 0)
+
+    def test_format_detection_is_cached(self):
+        """
+        Tests that the format of an unchanged file is only detected once.
+        """
+        tempdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tempdir, 'file.sgy')
+            shutil.copy(os.path.join(self.path, '1.sgy_first_trace'),
+                        filename)
+            with mock.patch.object(base, '_detect_format',
+                                   wraps=base._detect_format) as m:
+                for _i in range(3):
+                    st = read(filename)
+                    self.assertEqual(st[0].stats._format, 'SEGY')
+                self.assertEqual(m.call_count, 1)
+                # Changing the file invalidates the cached format.
+                shutil.copy(os.path.join(self.path, '1.su_first_trace'),
+                            filename)
+                st = read(filename)
+                self.assertEqual(st[0].stats._format, 'SU')
+                self.assertEqual(m.call_count, 2)
+        finally:
+            shutil.rmtree(tempdir)
+
+    def test_import_is_lazy(self):
+        """
+        Importing obsln and the SEG Y plug-in neither scans the entry points
+        of all installed distributions nor loads libsegy. Also serves as a
+        benchmark of the import time.
+        """
+        code = "\n".join([
+            "import obsln",
+            "import obsln.io.segy.core",
+            "from obsln.core.util import misc",
+            "from obsln.io.segy.util import clibsegy",
+            "print(misc._ENTRY_POINT_GROUPS is None, clibsegy._lib is None)"])
+        output = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        self.assertEqual(output.stdout.split(), [b"True", b"True"])
+        # Cumulative import time of obsln in microseconds. The limit is very
+        # generous, scanning all distributions used to take several hundred
+        # milliseconds on its own.
+        import_time = [int(line.split(b"|")[1]) for line in
+                       output.stderr.splitlines()
+                       if line.split(b"|")[-1].strip() == b"obsln"][0]
+        self.assertLess(import_time, 5e6,
+                        "Importing obsln took %.3f s" % (import_time / 1e6))
+
 
 def suite():
     return unittest.makeSuite(SEGYCoreTestCase, 'test')
@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the persistent SEG Y and SU trace index.
+"""
+import os
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from obsln.core.util.base import NamedTemporaryFile
+from obsln.io.segy.index import (INDEX_SUFFIX, SEGYTraceIndex,
+                                 SEGYTraceReader, build_trace_index,
+                                 get_trace_index, read_trace_index)
+from obsln.io.segy.segy import (SEGYTrace, SEGYWriter, _read_segy,
+                                _read_su)
+
+from . import _create_segy_file
+
+
+class SEGYTraceIndexTestCase(unittest.TestCase):
+    """
+    Test cases for the trace index.
+    """
+    def setUp(self):
+        # directory where the test files are located
+        self.dir = os.path.dirname(__file__)
+        self.path = os.path.join(self.dir, 'data')
+
+    def test_build_index(self):
+        """
+        The index has to describe every trace of the file.
+        """
+        data = np.arange(60, dtype=np.float32).reshape(6, 10)
+        with NamedTemporaryFile() as tf:
+            _create_segy_file(tf.name, data, data_encoding=1,
+                              headers={'ensemble_number': [1, 1, 2, 2, 3, 3]})
+            index = build_trace_index(tf.name)
+            self.assertTrue(isinstance(index, SEGYTraceIndex))
+            self.assertEqual(len(index), 6)
+            self.assertEqual(index.data_encoding, 1)
+            self.assertEqual(index.endian, '>')
+            np.testing.assert_array_equal(
+                index.offsets, 3600 + 280 * np.arange(6))
+            np.testing.assert_array_equal(index.npts, [10] * 6)
+            np.testing.assert_array_equal(index.columns['ensemble_number'],
+                                          [1, 1, 2, 2, 3, 3])
+
+    def test_variable_length_traces(self):
+        """
+        Offsets have to be correct for traces of varying length.
+        """
+        data = [np.ones(npts, dtype=np.float32) for npts in (10, 20, 5)]
+        with NamedTemporaryFile() as tf:
+            _create_segy_file(tf.name, data)
+            index = build_trace_index(tf.name)
+            np.testing.assert_array_equal(index.npts, [10, 20, 5])
+            np.testing.assert_array_equal(
+                index.offsets, [3600, 3600 + 280, 3600 + 280 + 320])
+
+    def test_random_access(self):
+        """
+        Traces read through the index have to equal the ones of a full read.
+        """
+        data = np.random.RandomState(815).rand(8, 25).astype(np.float32)
+        with NamedTemporaryFile() as tf:
+            _create_segy_file(tf.name, data, data_encoding=1, endian='<')
+            segy = _read_segy(tf.name, unpack_headers=True)
+            index = build_trace_index(tf.name)
+            with open(tf.name, 'rb') as fh:
+                for i in (7, 0, 3):
+                    trace = index.read_trace(fh, i, unpack_headers=True)
+                    np.testing.assert_array_equal(trace.data,
+                                                  segy.traces[i].data)
+                    self.assertEqual(trace.header.unpacked_header,
+                                     segy.traces[i].header.unpacked_header)
+
+    def test_su_index(self):
+        """
+        SU files are indexed from the very first byte.
+        """
+        file = os.path.join(self.path, '1.su_first_trace')
+        index = build_trace_index(file, format='SU')
+        su = _read_su(file)
+        self.assertEqual(len(index), 1)
+        self.assertEqual(index.offsets[0], 0)
+        self.assertEqual(index.endian, su.endian)
+        with open(file, 'rb') as fh:
+            np.testing.assert_array_equal(index.read_trace(fh, 0).data,
+                                          su.traces[0].data)
+
+    def test_write_and_read_index(self):
+        """
+        Writing and reading an index must not change it.
+        """
+        data = np.ones((3, 10), dtype=np.float32)
+        with NamedTemporaryFile() as tf, NamedTemporaryFile() as tf2:
+            _create_segy_file(tf.name, data)
+            index = build_trace_index(tf.name)
+            index.write(tf2.name)
+            new_index = read_trace_index(tf2.name)
+            for attrib in ('format', 'endian', 'data_encoding', 'filesize',
+                           'mtime', 'checksum'):
+                self.assertEqual(getattr(index, attrib),
+                                 getattr(new_index, attrib))
+            np.testing.assert_array_equal(index.offsets, new_index.offsets)
+            np.testing.assert_array_equal(index.npts, new_index.npts)
+            self.assertEqual(sorted(index.columns), sorted(new_index.columns))
+            for key, value in index.columns.items():
+                np.testing.assert_array_equal(value, new_index.columns[key])
+            self.assertTrue(new_index.is_valid_for(tf.name))
+
+    def test_get_trace_index_reuses_and_invalidates(self):
+        """
+        The index file is reused until the data file changes.
+        """
+        data = np.ones((3, 10), dtype=np.float32)
+        with NamedTemporaryFile() as tf:
+            index_file = tf.name + INDEX_SUFFIX
+            try:
+                _create_segy_file(tf.name, data)
+                index = get_trace_index(tf.name)
+                self.assertTrue(os.path.exists(index_file))
+                mtime = os.path.getmtime(index_file)
+                self.assertEqual(len(get_trace_index(tf.name)), 3)
+                self.assertEqual(os.path.getmtime(index_file), mtime)
+                # Requesting additional keys extends the index.
+                index = get_trace_index(tf.name, keys=['lag_time_A'])
+                self.assertIn('lag_time_A', index.columns)
+                # Changing the data file invalidates the index.
+                time.sleep(0.01)
+                _create_segy_file(tf.name, np.ones((5, 10), np.float32))
+                self.assertFalse(index.is_valid_for(tf.name))
+                self.assertEqual(len(get_trace_index(tf.name)), 5)
+            finally:
+                if os.path.exists(index_file):
+                    os.remove(index_file)
+
+    def test_reading_uses_valid_index(self):
+        """
+        Reading a file with a valid index next to it jumps to the indexed
+        traces instead of walking over all trace headers.
+        """
+        data = np.arange(50, dtype=np.float32).reshape(5, 10)
+        with NamedTemporaryFile() as tf:
+            index_file = tf.name + INDEX_SUFFIX
+            try:
+                _create_segy_file(tf.name, data)
+                index = build_trace_index(tf.name)
+                # An index only knowing some of the traces proves that the
+                # traces are located with it.
+                SEGYTraceIndex(
+                    index.offsets[[0, 3]], index.npts[[0, 3]],
+                    endian=index.endian, data_encoding=index.data_encoding,
+                    filesize=index.filesize, mtime=index.mtime,
+                    checksum=index.checksum).write(index_file)
+                with mock.patch('obsln.io.segy.segy.SEGYTrace',
+                                wraps=SEGYTrace) as m:
+                    segy = _read_segy(tf.name)
+                self.assertEqual(m.call_count, 2)
+                self.assertEqual([tr.data[0] for tr in segy.traces], [0, 30])
+                # Outdated indices are ignored.
+                stat = os.stat(tf.name)
+                os.utime(tf.name, ns=(stat.st_atime_ns,
+                                      stat.st_mtime_ns + 10 ** 9))
+                segy = _read_segy(tf.name)
+                self.assertEqual(len(segy.traces), 5)
+            finally:
+                if os.path.exists(index_file):
+                    os.remove(index_file)
+
+    def test_appending_updates_index(self):
+        """
+        Appending traces to a file with a valid index extends the index so
+        it stays valid for the grown file.
+        """
+        data = np.arange(80, dtype=np.float32).reshape(8, 10)
+        with NamedTemporaryFile() as tf:
+            index_file = tf.name + INDEX_SUFFIX
+            try:
+                _create_segy_file(tf.name, data[:5])
+                get_trace_index(tf.name)
+                with SEGYWriter.append(tf.name) as writer:
+                    writer.write_trace(data[5])
+                    writer.write_block(data[6:])
+                index = read_trace_index(index_file)
+                self.assertTrue(index.is_valid_for(tf.name))
+                expected = build_trace_index(tf.name)
+                np.testing.assert_array_equal(index.offsets, expected.offsets)
+                np.testing.assert_array_equal(index.npts, expected.npts)
+                self.assertEqual(sorted(index.columns),
+                                 sorted(expected.columns))
+                for key, value in expected.columns.items():
+                    np.testing.assert_array_equal(index.columns[key], value)
+                self.assertEqual(index.checksum, expected.checksum)
+                segy = _read_segy(tf.name)
+                np.testing.assert_array_equal(
+                    [tr.data for tr in segy.traces], data)
+                # Outdated indices are left alone.
+                stat = os.stat(tf.name)
+                os.utime(tf.name, ns=(stat.st_atime_ns,
+                                      stat.st_mtime_ns + 10 ** 9))
+                with SEGYWriter.append(tf.name) as writer:
+                    writer.write_trace(data[0])
+                self.assertEqual(len(read_trace_index(index_file)), 8)
+                self.assertFalse(
+                    read_trace_index(index_file).is_valid_for(tf.name))
+            finally:
+                if os.path.exists(index_file):
+                    os.remove(index_file)
+
+    def test_checksum_detects_changed_headers(self):
+        """
+        Headers changed without changing size and modification time are
+        detected by the checksum.
+        """
+        data = np.ones((3, 10), dtype=np.float32)
+        with NamedTemporaryFile() as tf:
+            _create_segy_file(tf.name, data)
+            index = build_trace_index(tf.name)
+            stat = os.stat(tf.name)
+            with open(tf.name, 'r+b') as fh:
+                fh.seek(3600)
+                fh.write(b'\x00\x00\x00\x09')
+            os.utime(tf.name, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            self.assertFalse(index.is_valid_for(tf.name))
+
+    def test_reader_get_traces(self):
+        """
+        Traces are returned in the requested order and consecutive traces are
+        read with a single read call.
+        """
+        data = np.random.RandomState(815).rand(10, 25).astype(np.float32)
+        with NamedTemporaryFile() as tf:
+            _create_segy_file(tf.name, data, data_encoding=1)
+            with SEGYTraceReader(tf.name, write_index=False) as reader:
+                self.assertEqual(len(reader), 10)
+                self.assertEqual(reader.binary_file_header.
+                                 sample_interval_in_microseconds, 1000)
+                for indices in ([3, 4, 5, 6], [9, 0, 1, 5], slice(2, 8, 3),
+                                [-1], []):
+                    expected = np.arange(10)[indices]
+                    traces = reader.get_traces(indices)
+                    self.assertEqual(len(traces), len(expected))
+                    for trace, i in zip(traces, expected):
+                        np.testing.assert_allclose(trace.data, data[i],
+                                                   rtol=1e-6)
+                        self.assertEqual(
+                            trace.header.trace_sequence_number_within_line,
+                            i + 1)
+                # One read per run of consecutive traces.
+                with mock.patch.object(reader, 'file',
+                                       wraps=reader.file) as fh:
+                    reader.get_traces([3, 4, 5, 6, 8])
+                    self.assertEqual(fh.readinto.call_count, 2)
+                # Long runs are split so at most READ_BATCH_SIZE bytes are
+                # read at once.
+                record_size = 240 + 25 * 4
+                with mock.patch('obsln.io.segy.index.READ_BATCH_SIZE',
+                                3 * record_size):
+                    with mock.patch.object(reader, 'file',
+                                           wraps=reader.file) as fh:
+                        traces = reader.get_traces(slice(None))
+                        self.assertEqual(fh.readinto.call_count, 4)
+                        self.assertTrue(all(
+                            len(_i[0][0]) <= 3 * record_size
+                            for _i in fh.readinto.call_args_list))
+                np.testing.assert_allclose([_i.data for _i in traces], data,
+                                           rtol=1e-6)
+                self.assertEqual(
+                    [_i.header.trace_sequence_number_within_line
+                     for _i in traces], list(range(1, 11)))
+                # Data of header only traces is read on the fly.
+                trace = reader.get_traces([7], headonly=True)[0]
+                np.testing.assert_allclose(trace.unpack_data(), data[7],
+                                           rtol=1e-6)
+
+    def test_reader_closes_file_on_errors(self):
+        """
+        The file is closed again if the file headers can not be read.
+        """
+        data = np.ones((3, 10), dtype=np.float32)
+        with NamedTemporaryFile() as tf:
+            index_file = tf.name + INDEX_SUFFIX
+            try:
+                _create_segy_file(tf.name, data)
+                # The stored index is used so only the reader opens the file.
+                get_trace_index(tf.name)
+                opened = []
+
+                def _open(*args, **kwargs):
+                    opened.append(open(*args, **kwargs))
+                    return opened[-1]
+
+                with mock.patch('obsln.io.segy.index.open', _open,
+                                create=True):
+                    with mock.patch('obsln.io.segy.index.SEGYFile',
+                                    side_effect=ValueError('broken')):
+                        self.assertRaises(ValueError, SEGYTraceReader,
+                                          tf.name)
+                self.assertEqual(len(opened), 2)
+                self.assertTrue(all(_i.closed for _i in opened))
+            finally:
+                if os.path.exists(index_file):
+                    os.remove(index_file)
+
+    def test_reader_where(self):
+        """
+        Selecting traces by header values.
+        """
+        data = np.ones((6, 10), dtype=np.float32)
+        data *= np.arange(6)[:, None]
+        inlines = [10, 10, 11, 11, 12, 12]
+        key = 'for_3d_poststack_data_this_field_is_for_in_line_number'
+        with NamedTemporaryFile() as tf:
+            _create_segy_file(tf.name, data, headers={key: inlines,
+                                                      'lag_time_A': range(6)})
+            with SEGYTraceReader(tf.name, write_index=False) as reader:
+                traces = reader.where(key, 11)
+                self.assertEqual([tr.data[0] for tr in traces], [2, 3])
+                traces = reader.where(key, (11, None))
+                self.assertEqual([tr.data[0] for tr in traces], [2, 3, 4, 5])
+                traces = reader.where(key, (None, 10))
+                self.assertEqual([tr.data[0] for tr in traces], [0, 1])
+                self.assertEqual(reader.where(key, 13), [])
+                # Keys not part of the index are added on demand.
+                self.assertNotIn('lag_time_A', reader.index.columns)
+                np.testing.assert_array_equal(
+                    reader.where_indices('lag_time_A', (1, 3)), [1, 2, 3])
+
+    def test_reader_su(self):
+        """
+        SU files can be read with the reader as well.
+        """
+        file = os.path.join(self.path, '1.su_first_trace')
+        su = _read_su(file)
+        with SEGYTraceReader(file, format='SU', write_index=False) as reader:
+            self.assertIsNone(reader.binary_file_header)
+            np.testing.assert_array_equal(reader.get_traces([0])[0].data,
+                                          su.traces[0].data)
+
+
+def suite():
+    return unittest.makeSuite(SEGYTraceIndexTestCase, 'test')
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
@@ -6,8 +6,13 @@ from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 from future.builtins import *  # NOQA
 
+import gc
 import io
 import os
+import subprocess
+import sys
+import threading
+import tracemalloc
 import unittest
 import warnings
 
@@ -22,8 +27,22 @@ from obspy.io.segy.segy import (SEGYBinaryFileHeader, SEGYFile,
                                 SEGYTraceHeader, _read_segy, iread_segy,
                                 SEGYInvalidTextualHeaderWarning)
 from obspy.io.segy.tests.header import DTYPES, FILES
+from obsln.io.segy.header import TRACE_HEADER_KEYS
+from obsln.io.segy.pack import _ieee_to_ibm_numpy, ieee_to_ibm
+from obsln.io.segy.unpack import BYTEORDER, SharedFileReader
+from obsln.io.segy.util import (pack_trace_header_table,
+                                unpack_trace_header_table)
+from obsln.io.segy.segy import (SEGYCube, SEGYError, SEGYMemmapFile,
+                                SEGYWriter,
+                                SEGYWritingError, SEGYTraceReadingError,
+                                _read_su, iread_segy_blocks, iread_su_blocks,
+                                read_segy_data, read_segy_header_table,
+                                read_su_data, scan_segy, sort_segy,
+                                extract_segy, follow_segy, follow_su,
+                                iread_su_stream, SUStreamWriter,
+                                transcode_segy, update_segy_headers)
 
-from . import _patch_header
+from . import _create_segy_file, _patch_header
 
 
 class SEGYTestCase(unittest.TestCase):
@@ -268,6 +287,56 @@ class SEGYTestCase(unittest.TestCase):
             # Test both.
             np.testing.assert_array_equal(new_data, data)
 
+    def test_ibm_round_trip_is_exact(self):
+        """
+        Every normalized IBM floating point number within the range of
+        single precision floats has to survive unpacking and packing again
+        bit by bit.
+        """
+        words = np.random.RandomState(815).randint(
+            0, 2 ** 32, 200000, dtype=np.uint64).astype(np.uint32)
+        exponents = (words >> 24) & 0x7f
+        words = words[((words & 0x00f00000) != 0) & (exponents >= 44) &
+                      (exponents <= 84)]
+        for endian in ('<', '>'):
+            raw = words.astype(endian + 'u4').tobytes()
+            data = DATA_SAMPLE_FORMAT_UNPACK_FUNCTIONS[1](
+                io.BytesIO(raw), len(words), endian)
+            f = io.BytesIO()
+            DATA_SAMPLE_FORMAT_PACK_FUNCTIONS[1](f, data, endian)
+            self.assertEqual(f.getvalue(), raw)
+
+    def test_ieee_to_ibm_c_and_numpy_agree(self):
+        """
+        The C encoder and the NumPy fallback have to produce the same words.
+        """
+        rs = np.random.RandomState(592)
+        data = rs.randn(100000) * 10.0 ** rs.randint(-30, 30, 100000)
+        data = np.require(data, np.float32)
+        data[:6] = [0.0, -0.0, 1.0, -1.0, 1.0 / 16, 16.0 ** 5]
+        np.testing.assert_array_equal(ieee_to_ibm(data),
+                                      _ieee_to_ibm_numpy(data))
+        with mock.patch('obsln.io.segy.pack._get_clibsegy_ieee2ibm',
+                        return_value=None):
+            np.testing.assert_array_equal(ieee_to_ibm(data),
+                                          _ieee_to_ibm_numpy(data))
+
+    def test_ieee_to_ibm_out(self):
+        """
+        The IBM words can be written to a given buffer, including the input
+        array itself.
+        """
+        data = np.linspace(-100, 100, 41, dtype=np.float32).reshape(41, 1)
+        expected = ieee_to_ibm(data)
+        self.assertEqual(expected.shape, (41, 1))
+        out = np.zeros((41, 1), dtype=np.uint32)
+        self.assertTrue(ieee_to_ibm(data, out=out) is out)
+        np.testing.assert_array_equal(out, expected)
+        ieee_to_ibm(data, out=data.view(np.uint32))
+        np.testing.assert_array_equal(data.view(np.uint32), expected)
+        self.assertRaises(ValueError, ieee_to_ibm, data,
+                          np.zeros(41, dtype=np.uint32))
+
     def test_read_and_write_binary_file_header(self):
         """
         Reading and writing should not change the binary file header.
@@ -348,6 +417,60 @@ class SEGYTestCase(unittest.TestCase):
             # Assert the actual header.
             self.assertEqual(org_header, new_header)
 
+    def test_compiled_trace_header_packing(self):
+        """
+        Packing the trace header in one go has to give the same bytes as
+        packing every field on its own.
+        """
+        rs = np.random.RandomState(1234)
+        for endian in ('<', '>'):
+            for _ in range(10):
+                org_header = rs.randint(0, 256, 240).astype(np.uint8).tobytes()
+                header = SEGYTraceHeader(header=org_header, endian=endian,
+                                         unpack_headers=True)
+                new_header = io.BytesIO()
+                header.write(new_header)
+                self.assertEqual(new_header.getvalue(), org_header)
+                old_header = io.BytesIO()
+                header._write_field_by_field(old_header, endian)
+                self.assertEqual(old_header.getvalue(), org_header)
+                # Pack into a reusable buffer.
+                buf = bytearray(480)
+                header.pack_into(buf, 240)
+                self.assertEqual(bytes(buf[240:]), org_header)
+        # Empty headers have an all zero unassigned field.
+        header = SEGYTraceHeader()
+        new_header = io.BytesIO()
+        header.write(new_header)
+        self.assertEqual(new_header.getvalue(), b'\x00' * 240)
+        # Invalid values still raise the error of the single field.
+        header.lag_time_A = 2 ** 15
+        self.assertRaises(Exception, header.write, io.BytesIO())
+
+    def test_pack_trace_header_table(self):
+        """
+        Packing a columnar header table is the inverse of unpacking it.
+        """
+        rs = np.random.RandomState(592)
+        headers = rs.randint(0, 256, 240 * 20).astype(np.uint8).tobytes()
+        for endian in ('<', '>'):
+            table = unpack_trace_header_table(headers, endian)
+            packed = pack_trace_header_table(table, endian)
+            self.assertEqual(len(packed), 20)
+            # Only the unassigned field is not part of the table, copy the
+            # last 8 bytes of every header.
+            packed['unassigned'] = np.frombuffer(
+                headers, dtype='V240')[:, None].view('V8')[:, -1]
+            self.assertEqual(packed.tobytes(), headers)
+        packed = pack_trace_header_table({'ensemble_number': 5}, '>',
+                                         count=3)
+        header = SEGYTraceHeader(packed[1].tobytes(), endian='>')
+        self.assertEqual(header.ensemble_number, 5)
+        with self.assertRaises(ValueError):
+            pack_trace_header_table({'lag_time_A': [1, 2 ** 15]}, '>')
+        with self.assertRaises(ValueError):
+            pack_trace_header_table({'lag_time_A': 1}, '>')
+
     def test_read_and_write_segy(self, headonly=False):
         """
         Reading and writing again should not change a file.
@@ -788,6 +911,960 @@ class SEGYTestCase(unittest.TestCase):
             "(100000) with format `>h` due to: `'h' format requires -32768 <="
             " number <= 32767`")
 
+    def test_memory_mapped_reading(self):
+        """
+        Memory mapping the files has to yield the same data as unpacking them.
+        """
+        for file, attribs in self.files.items():
+            file = os.path.join(self.path, file)
+            segy = _read_segy(file, mmap=True)
+            self.assertTrue(isinstance(segy, SEGYMemmapFile))
+            self.assertEqual(segy.endian, attribs['endian'])
+            self.assertEqual(segy.data.shape, (1, attribs['sample_count']))
+            # Proven data values, read with Madagascar.
+            correct_data = np.load(file + '.npy').ravel()
+            np.testing.assert_array_equal(segy.data[0], correct_data)
+            segy.close()
+
+    def test_memory_mapped_data_views(self):
+        """
+        IEEE data is a view of the mapped file and IBM data is only converted
+        for the accessed slices.
+        """
+        data = np.arange(50, dtype=np.float32).reshape(5, 10)
+        for data_encoding in (1, 5):
+            with NamedTemporaryFile() as tf:
+                _create_segy_file(tf.name, data, data_encoding=data_encoding)
+                segy = SEGYMemmapFile(tf.name)
+                self.assertEqual(len(segy), 5)
+                self.assertEqual(segy.data.shape, (5, 10))
+                np.testing.assert_array_equal(segy.data[1:3], data[1:3])
+                np.testing.assert_array_equal(segy.data[:, 4], data[:, 4])
+                np.testing.assert_array_equal(np.asarray(segy.data), data)
+                self.assertEqual(segy.trace_header(3)
+                                 .trace_sequence_number_within_line, 4)
+                if data_encoding == 5:
+                    self.assertTrue(np.shares_memory(segy.data,
+                                                     segy.records))
+                segy.close()
+
+    def test_memory_mapping_variable_length_traces_raises(self):
+        """
+        Files with varying trace lengths can not be memory mapped.
+        """
+        data = [np.zeros(10, dtype=np.float32),
+                np.zeros(12, dtype=np.float32)]
+        with NamedTemporaryFile() as tf:
+            _create_segy_file(tf.name, data)
+            self.assertRaises(SEGYError, SEGYMemmapFile, tf.name)
+
+    def test_reading_header_table(self):
+        """
+        The columnar header table has to match the trace headers unpacked
+        one by one, both for fixed and for varying trace lengths.
+        """
+        headers = {'ensemble_number': [5, 3, 9, 1],
+                   'scalar_to_be_applied_to_all_coordinates': [-100] * 4,
+                   'source_coordinate_x': [100000, -2, 3, 2 ** 31 - 1]}
+        for lengths in ([10, 10, 10, 10], [10, 12, 8, 10]):
+            data = [np.ones(_i, dtype=np.float32) for _i in lengths]
+            for endian in ('<', '>'):
+                with NamedTemporaryFile() as tf:
+                    _create_segy_file(tf.name, data, endian=endian,
+                                      headers=headers)
+                    table = read_segy_header_table(tf.name)
+                    segy = _read_segy(tf.name, unpack_headers=True)
+                    with open(tf.name, 'rb') as f:
+                        subset = read_segy_header_table(
+                            io.BytesIO(f.read()), keys=['ensemble_number'])
+                for key in TRACE_HEADER_KEYS:
+                    if key == 'unassigned':
+                        continue
+                    np.testing.assert_array_equal(
+                        table[key],
+                        [getattr(_i.header, key) for _i in segy.traces])
+                self.assertTrue(table['ensemble_number'].dtype.isnative)
+                np.testing.assert_array_equal(
+                    table['number_of_samples_in_this_trace'], lengths)
+                self.assertEqual(list(subset.keys()), ['ensemble_number'])
+                np.testing.assert_array_equal(subset['ensemble_number'],
+                                              headers['ensemble_number'])
+
+    def test_reading_with_multiple_workers(self):
+        """
+        Decoding the traces in several processes has to yield the same
+        traces in the same order.
+        """
+        data = [np.random.RandomState(_i).rand(_i % 7 + 5).astype(np.float32)
+                for _i in range(23)]
+        for data_encoding in (1, 5):
+            with NamedTemporaryFile() as tf:
+                _create_segy_file(tf.name, data, data_encoding=data_encoding,
+                                  endian='<')
+                segy = _read_segy(tf.name)
+                for workers in (2, 3):
+                    parallel = _read_segy(tf.name, workers=workers)
+                    self.assertEqual(parallel.endian, '<')
+                    self.assertEqual(parallel.data_encoding, data_encoding)
+                    self.assertEqual(parallel.textual_file_header,
+                                     segy.textual_file_header)
+                    self.assertEqual(len(parallel.traces), 23)
+                    for tr1, tr2 in zip(segy.traces, parallel.traces):
+                        np.testing.assert_array_equal(tr1.data, tr2.data)
+                        self.assertEqual(tr1.header.unpacked_header,
+                                         tr2.header.unpacked_header)
+                with self.assertRaises(SEGYError):
+                    with open(tf.name, 'rb') as f:
+                        _read_segy(io.BytesIO(f.read()), workers=2)
+
+    def test_streaming_writer(self):
+        """
+        Writing trace by trace has to result in the same file as writing a
+        complete SEGYFile object.
+        """
+        for file, attribs in self.files.items():
+            file = os.path.join(self.path, file)
+            segy = _read_segy(file)
+            with io.BytesIO() as buf:
+                segy.write(buf)
+                expected = buf.getvalue()
+            with io.BytesIO() as buf:
+                writer = SEGYWriter(
+                    buf, binary_file_header=segy.binary_file_header,
+                    textual_file_header=segy.textual_file_header,
+                    data_encoding=segy.data_encoding, endian=segy.endian,
+                    textual_header_encoding=segy.textual_header_encoding)
+                writer.write_traces(tr for tr in segy.traces)
+                writer.close()
+                self.assertEqual(buf.getvalue(), expected)
+
+    def test_streaming_writer_patches_binary_file_header(self):
+        """
+        Fields of the binary file header depending on the traces are set
+        once the writer is closed.
+        """
+        data = [np.arange(10, dtype=np.float32) * _i for _i in range(4)]
+        for lengths in ((10, 10, 10, 10), (10, 8, 10, 10)):
+            with NamedTemporaryFile() as tf:
+                bfh = SEGYBinaryFileHeader()
+                bfh.sample_interval_in_microseconds = 2000
+                with SEGYWriter(tf.name, binary_file_header=bfh,
+                                textual_file_header=b'C01 streamed',
+                                data_encoding=1, endian='<') as writer:
+                    writer.write_traces(_d[:_l]
+                                        for _d, _l in zip(data, lengths))
+                    self.assertEqual(writer.trace_count, 4)
+                self.assertEqual(writer.file, None)
+                self.assertRaises(SEGYWritingError, writer.write_trace,
+                                  data[0])
+                segy = _read_segy(tf.name)
+            bfh = segy.binary_file_header
+            self.assertEqual(segy.endian, '<')
+            self.assertEqual(segy.textual_file_header[:12], b'C01 streamed')
+            self.assertEqual(bfh.data_sample_format_code, 1)
+            self.assertEqual(bfh.number_of_data_traces_per_ensemble, 4)
+            self.assertEqual(bfh.number_of_samples_per_data_trace, 10)
+            self.assertEqual(bfh.sample_interval_in_microseconds, 2000)
+            self.assertEqual(bfh.seg_y_format_revision_number, 256)
+            for i, trace in enumerate(segy.traces):
+                self.assertEqual(
+                    trace.header.trace_sequence_number_within_line, i + 1)
+                self.assertEqual(
+                    trace.header.sample_interval_in_ms_for_this_trace, 2000)
+                np.testing.assert_allclose(trace.data,
+                                           data[i][:lengths[i]])
+
+    def test_streaming_writer_closes_file_on_errors(self):
+        """
+        The file opened by the writer is closed if writing the file headers
+        fails and unsupported data encodings are refused right away.
+        """
+        files = []
+
+        def _open(*args, **kwargs):
+            files.append(open(*args, **kwargs))
+            return files[-1]
+
+        bfh = SEGYBinaryFileHeader()
+        bfh.sample_interval_in_microseconds = 10 ** 6
+        with NamedTemporaryFile() as tf:
+            with mock.patch('obsln.io.segy.segy.open', _open, create=True):
+                self.assertRaises(Exception, SEGYWriter, tf.name,
+                                  binary_file_header=bfh, data_encoding=5)
+                self.assertEqual(len(files), 1)
+                self.assertTrue(files[0].closed)
+                self.assertRaises(SEGYWritingError, SEGYWriter, tf.name,
+                                  data_encoding=7)
+                self.assertEqual(len(files), 1)
+
+    def test_streaming_writer_blocks(self):
+        """
+        Writing blocks of traces results in the same file as writing the
+        traces one by one.
+        """
+        data = np.arange(60, dtype=np.float32).reshape(6, 10)
+        headers = {'ensemble_number': [1, 1, 2, 2, 3, 3]}
+        for data_encoding, endian in ((1, '>'), (5, '<')):
+            with NamedTemporaryFile() as tf:
+                _create_segy_file(tf.name, data, data_encoding=data_encoding,
+                                  endian=endian, headers=headers)
+                with open(tf.name, 'rb') as f:
+                    expected = f.read()
+            bfh = SEGYBinaryFileHeader()
+            bfh.sample_interval_in_microseconds = 1000
+            with io.BytesIO() as buf:
+                with SEGYWriter(buf, binary_file_header=bfh,
+                                data_encoding=data_encoding,
+                                endian=endian) as writer:
+                    writer.write_block(data[:4], headers={
+                        'ensemble_number': [1, 1, 2, 2]})
+                    writer.write_block(data[4:], headers={
+                        'ensemble_number': 3})
+                    self.assertEqual(writer.trace_count, 6)
+                self.assertEqual(buf.getvalue(), expected)
+
+    def test_streaming_writer_appends_to_file(self):
+        """
+        Appending writes only the new traces to the end of the file and
+        updates the number of traces in the binary file header.
+        """
+        data = np.arange(80, dtype=np.float32).reshape(8, 10)
+        for data_encoding, endian in ((1, '>'), (5, '<')):
+            with NamedTemporaryFile() as tf:
+                _create_segy_file(tf.name, data, data_encoding=data_encoding,
+                                  endian=endian)
+                with open(tf.name, 'rb') as f:
+                    expected = f.read()
+                _create_segy_file(tf.name, data[:5],
+                                  data_encoding=data_encoding, endian=endian)
+                segy = SEGYMemmapFile(tf.name)
+                self.assertEqual(len(segy), 5)
+                with SEGYWriter.append(tf.name) as writer:
+                    self.assertEqual(writer.trace_count, 5)
+                    self.assertEqual(writer.data_encoding, data_encoding)
+                    self.assertEqual(writer.endian, endian)
+                    writer.write_trace(data[5])
+                    writer.write_block(data[6:])
+                    self.assertEqual(writer.trace_count, 8)
+                with open(tf.name, 'rb') as f:
+                    self.assertEqual(f.read(), expected)
+                # The memory map of the file picks up the new traces.
+                self.assertEqual(segy.refresh(), 3)
+                self.assertEqual(segy.refresh(), 0)
+                np.testing.assert_array_equal(np.asarray(segy.data), data)
+                segy.close()
+                # Encoding and byte order have to match the file.
+                self.assertRaises(SEGYWritingError, SEGYWriter.append,
+                                  tf.name, data_encoding=3)
+                self.assertRaises(SEGYWritingError, SEGYWriter.append,
+                                  tf.name,
+                                  endian='<' if endian == '>' else '>')
+                # Traces of a different length clear the fixed length flag.
+                with SEGYWriter.append(tf.name) as writer:
+                    writer.write_trace(data[0][:4])
+                segy = _read_segy(tf.name)
+                self.assertEqual(len(segy.traces), 9)
+                self.assertEqual(segy.binary_file_header.
+                                 number_of_data_traces_per_ensemble, 9)
+                self.assertEqual(
+                    segy.binary_file_header.fixed_length_trace_flag, 0)
+                self.assertEqual(
+                    segy.traces[-1].header.trace_sequence_number_within_line,
+                    9)
+                np.testing.assert_array_equal(segy.traces[-1].data,
+                                              data[0][:4])
+
+    def test_headonly_traces_share_one_file_handle(self):
+        """
+        The data of headonly traces is read through a single shared handle
+        which is only opened once.
+        """
+        data = np.random.RandomState(6901).rand(20, 15).astype(np.float32)
+        with NamedTemporaryFile() as tf:
+            _create_segy_file(tf.name, data, data_encoding=1)
+            segy = _read_segy(tf.name, headonly=True)
+            reader = segy.data_reader
+            self.assertTrue(all(_i.unpack_data.reader is reader
+                                for _i in segy.traces))
+            with mock.patch('obsln.io.segy.unpack.os.open',
+                            wraps=os.open) as p:
+                for i, trace in enumerate(segy.traces):
+                    np.testing.assert_allclose(trace.data, data[i],
+                                               rtol=1e-6)
+                self.assertEqual(p.call_count, 1)
+            # Concurrent reads from multiple threads.
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(4) as executor:
+                result = list(executor.map(lambda tr: tr.data,
+                                           segy.traces[::-1]))
+            np.testing.assert_allclose(result, data[::-1], rtol=1e-6)
+            reader.close()
+            # Reading SU files uses the same mechanism.
+            with io.BytesIO() as buf:
+                segy.write(buf, data_encoding=5, endian='<')
+                raw = buf.getvalue()[3600:]
+            with open(tf.name, 'wb') as f:
+                f.write(raw)
+            su = _read_su(tf.name, headonly=True)
+            self.assertTrue(su.traces[5].unpack_data.reader is
+                            su.data_reader)
+            np.testing.assert_allclose(su.traces[5].data, data[5], rtol=1e-6)
+            su.data_reader.close()
+
+    def test_headonly_modification_time_checks(self):
+        """
+        The modification time is checked once on first use and again only
+        if requested, changed files raise a warning.
+        """
+        data = np.ones((10, 15), dtype=np.float32)
+        with NamedTemporaryFile() as tf:
+            _create_segy_file(tf.name, data)
+            segy = _read_segy(tf.name, headonly=True)
+            reader = segy.data_reader
+            with mock.patch('obsln.io.segy.unpack.os.fstat',
+                            wraps=os.fstat) as p:
+                for trace in segy.traces:
+                    trace.data
+                self.assertEqual(p.call_count, 1)
+                with reader.batch():
+                    for trace in segy.traces:
+                        trace.data
+                self.assertEqual(p.call_count, 2)
+            stat = os.stat(tf.name)
+            os.utime(tf.name, ns=(stat.st_atime_ns,
+                                  stat.st_mtime_ns + 10 ** 9))
+            with warnings.catch_warnings(record=True) as w:
+                warnings.simplefilter('always')
+                segy.traces[0].data
+                self.assertEqual(len(w), 0)
+                reader.refresh()
+                segy.traces[1].data
+                segy.traces[2].data
+                with reader.batch():
+                    segy.traces[3].data
+            self.assertEqual(len(w), 2)
+            self.assertIn('changed since reading headers', str(w[0].message))
+            reader.close()
+
+    def test_shared_file_reader_of_missing_file(self):
+        """
+        A reader of a missing file raises right away and can be garbage
+        collected without further errors.
+        """
+        with mock.patch('sys.unraisablehook') as hook:
+            self.assertRaises(OSError, SharedFileReader,
+                              os.path.join(self.path, 'does_not_exist.sgy'))
+            gc.collect()
+        self.assertEqual(hook.call_count, 0)
+
+    def test_iterative_block_reading(self):
+        """
+        Reading blocks of traces yields the same data and headers as reading
+        the traces one by one.
+        """
+        lengths = [10] * 7 + [12] * 3 + [10] * 2
+        data = [np.random.RandomState(_i).rand(_l).astype(np.float32)
+                for _i, _l in enumerate(lengths)]
+        for data_encoding, endian in ((1, '>'), (5, '<')):
+            with NamedTemporaryFile() as tf:
+                _create_segy_file(tf.name, data, data_encoding=data_encoding,
+                                  endian=endian)
+                segy = _read_segy(tf.name)
+                for block_size, prefetch in ((1, 0), (3, 2), (100, 1)):
+                    blocks = list(iread_segy_blocks(
+                        tf.name, block_size=block_size, prefetch=prefetch))
+                    sizes = [len(_i[0]) for _i in blocks]
+                    self.assertTrue(max(sizes) <= block_size)
+                    self.assertEqual(sum(sizes), len(lengths))
+                    traces = [_j for _i in blocks for _j in _i[0]]
+                    numbers = np.concatenate([
+                        _i[1]['trace_sequence_number_within_line']
+                        for _i in blocks])
+                    np.testing.assert_array_equal(numbers,
+                                                  np.arange(1, 13))
+                    for trace, segy_trace in zip(traces, segy.traces):
+                        self.assertEqual(trace.dtype, np.float32)
+                        np.testing.assert_array_equal(trace,
+                                                      segy_trace.data)
+                # Blocks are cut where the trace length changes.
+                self.assertEqual(
+                    [len(_i[0]) for _i in iread_segy_blocks(tf.name)],
+                    [7, 3, 2])
+
+    def test_iterative_block_reading_grouped(self):
+        """
+        Grouping blocks by a trace header key.
+        """
+        ensembles = [1, 1, 1, 2, 2, 3, 3, 3, 3, 3, 4]
+        data = np.arange(11 * 5, dtype=np.float32).reshape(11, 5)
+        with NamedTemporaryFile() as tf:
+            _create_segy_file(tf.name, data,
+                              headers={'ensemble_number': ensembles})
+            for block_size in (1, 2, 4, 20):
+                blocks = list(iread_segy_blocks(
+                    tf.name, block_size=block_size, group_by='ensemble_number',
+                    keys=['lag_time_A']))
+                self.assertEqual([len(_i[0]) for _i in blocks],
+                                 [3, 2, 5, 1])
+                self.assertEqual(sorted(blocks[0][1].keys()),
+                                 ['ensemble_number', 'lag_time_A'])
+                for i, (block, headers) in enumerate(blocks):
+                    np.testing.assert_array_equal(
+                        headers['ensemble_number'], i + 1)
+                np.testing.assert_array_equal(
+                    np.concatenate([_i[0] for _i in blocks]), data)
+
+    def test_iterative_block_reading_stops_prefetching(self):
+        """
+        The prefetching thread ends if the iteration is stopped early and
+        errors are raised in the consuming thread.
+        """
+        import threading
+        data = np.ones((50, 5), dtype=np.float32)
+        with NamedTemporaryFile() as tf:
+            _create_segy_file(tf.name, data)
+            thread_count = threading.active_count()
+            blocks = iread_segy_blocks(tf.name, block_size=2, prefetch=2)
+            next(blocks)
+            self.assertEqual(threading.active_count(), thread_count + 1)
+            blocks.close()
+            self.assertEqual(threading.active_count(), thread_count)
+            # Cut the last trace in half.
+            with open(tf.name, 'r+b') as f:
+                f.truncate(os.path.getsize(tf.name) - 10)
+            with self.assertRaises(SEGYTraceReadingError):
+                list(iread_segy_blocks(tf.name, block_size=7))
+            self.assertEqual(threading.active_count(), thread_count)
+
+    def test_iterative_su_block_reading(self):
+        """
+        Reading SU files in blocks.
+        """
+        file = os.path.join(self.path, '1.su_first_trace')
+        su = _read_su(file)
+        blocks = list(iread_su_blocks(file))
+        self.assertEqual(len(blocks), 1)
+        np.testing.assert_array_equal(blocks[0][0][0], su.traces[0].data)
+
+    def test_memory_mapped_header_table(self):
+        """
+        The memory mapped file unpacks the same header table.
+        """
+        file = os.path.join(self.path, '00001034.sgy_first_trace')
+        segy = SEGYMemmapFile(file)
+        table = segy.header_table()
+        self.assertEqual(table, read_segy_header_table(file))
+        for key, value in table.items():
+            self.assertEqual(value[0], getattr(segy.trace_header(0), key))
+        segy.close()
+
+    def test_reading_data_into_array(self):
+        """
+        All traces are decoded into the rows of one array, either a given or
+        a newly allocated one.
+        """
+        dtypes = {1: np.float32, 2: np.int32, 3: np.int16, 5: np.float32}
+        for data_encoding, dtype in dtypes.items():
+            for endian in ('<', '>'):
+                data = [(np.arange(_i) * 3 - 20).astype(dtype)
+                        for _i in (12, 7, 12)]
+                with NamedTemporaryFile() as tf:
+                    _create_segy_file(tf.name, data,
+                                      data_encoding=data_encoding,
+                                      endian=endian)
+                    expected = [tr.data for tr in _read_segy(tf.name).traces]
+                    out = read_segy_data(tf.name)
+                    self.assertEqual(out.shape, (3, 12))
+                    self.assertEqual(out.dtype, dtype)
+                    self.assertTrue(out.flags.c_contiguous)
+                    for row, tr_data in zip(out, expected):
+                        np.testing.assert_array_equal(row[:len(tr_data)],
+                                                      tr_data)
+                    self.assertFalse(out[1, 7:].any())
+                    out = np.full((4, 15), 99, dtype=dtype)
+                    self.assertIs(read_segy_data(tf.name, out=out), out)
+                    for row, tr_data in zip(out, expected):
+                        np.testing.assert_array_equal(row[:len(tr_data)],
+                                                      tr_data)
+                        self.assertTrue(np.all(row[len(tr_data):] == 99))
+                    with self.assertRaises(SEGYError):
+                        read_segy_data(tf.name, out=np.empty((2, 12), dtype))
+                    with self.assertRaises(ValueError):
+                        read_segy_data(tf.name,
+                                       out=np.empty((3, 12), np.float64))
+        file = os.path.join(self.path, '1.su_first_trace')
+        np.testing.assert_array_equal(read_su_data(file)[0],
+                                      _read_su(file).traces[0].data)
+
+    def test_reading_traces_into_array(self):
+        """
+        The data of the traces are views of the rows of the given array.
+        """
+        for file, attribs in self.files.items():
+            file = os.path.join(self.path, file)
+            expected = _read_segy(file).traces[0].data
+            out = np.empty((1, len(expected) + 3), dtype=expected.dtype)
+            segy = _read_segy(file, out=out)
+            data = segy.traces[0].data
+            np.testing.assert_array_equal(data, expected)
+            self.assertTrue(np.shares_memory(data, out))
+            with self.assertRaises(SEGYError):
+                _read_segy(file, out=out[:, :10])
+        file = os.path.join(self.path, '1.su_first_trace')
+        out = np.empty((2, 8000), dtype=np.float32)
+        su = _read_su(file, out=out)
+        self.assertTrue(np.shares_memory(su.traces[0].data, out))
+
+    def test_unpacking_copies_samples_once(self):
+        """
+        Micro-benchmark of the memory traffic of the unpack functions.
+
+        Copying through from_buffer() and byteswap() held up to three copies
+        of every sample at once. Reading straight into the result and
+        swapping in place only ever holds the result itself.
+        """
+        npts = 200000
+
+        def _unpack_copying(file, count, endian='>'):
+            # The former implementation of the unpack functions.
+            data = np.array(memoryview(file.read(count * 4)))
+            data = data.view(np.float32).copy()
+            if BYTEORDER != endian:
+                data = data.byteswap()
+            return data
+
+        def _bytes_per_sample(unpack_function, raw, endian):
+            buf = io.BytesIO(raw)
+            tracemalloc.start()
+            try:
+                data = unpack_function(buf, npts, endian=endian)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            return data, peak / float(npts)
+
+        for endian in ('<', '>'):
+            values = np.linspace(-1000, 1000, npts, dtype=np.float32)
+            raw = values.astype(endian + 'f4').tobytes()
+            expected, before = _bytes_per_sample(_unpack_copying, raw, endian)
+            data, after = _bytes_per_sample(
+                DATA_SAMPLE_FORMAT_UNPACK_FUNCTIONS[5], raw, endian)
+            np.testing.assert_array_equal(data, expected)
+            self.assertTrue(data.flags.owndata)
+            self.assertGreaterEqual(before, 8.0)
+            self.assertLess(after, 4.1)
+            # The IBM conversion happens in place as well.
+            raw = ieee_to_ibm(values)
+            if BYTEORDER != endian:
+                raw.byteswap(True)
+            data, after = _bytes_per_sample(
+                DATA_SAMPLE_FORMAT_UNPACK_FUNCTIONS[1], raw.tobytes(), endian)
+            np.testing.assert_allclose(data, values, rtol=1e-6)
+            self.assertLess(after, 4.1)
+            # Short reads at the end of the file do not keep the whole
+            # allocation alive.
+            data = DATA_SAMPLE_FORMAT_UNPACK_FUNCTIONS[5](
+                io.BytesIO(raw.tobytes()[:40]), npts, endian=endian)
+            self.assertEqual(len(data), 10)
+            self.assertTrue(data.flags.owndata)
+
+    def test_scanning_and_skipping_corrupt_traces(self):
+        """
+        Traces with a corrupt header and garbage between traces are skipped
+        and reported as byte ranges instead of aborting the read.
+        """
+        data = np.arange(10 * 50, dtype=np.float32).reshape(10, 50)
+        record_size = 240 + 50 * 4
+        for endian in ('<', '>'):
+            buf = io.BytesIO()
+            _create_segy_file(buf, data, endian=endian)
+            raw = bytearray(buf.getvalue())
+            # Wrong number of samples in the fourth trace header.
+            start = 3600 + 3 * record_size
+            raw[start + 114:start + 116] = b'\x7f\x00'
+            # Some garbage before the eighth trace and a truncated trace at
+            # the end.
+            start = 3600 + 7 * record_size
+            raw[start:start] = b'\x01' * 37
+            raw += b'\x00' * 100
+            expected_ranges = [
+                (3600 + 3 * record_size, 3600 + 4 * record_size),
+                (3600 + 7 * record_size, 3600 + 7 * record_size + 37),
+                (len(raw) - 100, len(raw))]
+            with self.assertRaises(SEGYTraceReadingError):
+                _read_segy(io.BytesIO(bytes(raw)), endian=endian)
+            with NamedTemporaryFile() as tf:
+                with open(tf.name, 'wb') as fh:
+                    fh.write(raw)
+                for file in (tf.name, io.BytesIO(bytes(raw))):
+                    offsets, bad_ranges = scan_segy(file, endian=endian)
+                    self.assertEqual(len(offsets), 9)
+                    self.assertEqual(bad_ranges, expected_ranges)
+                segy_file = _read_segy(tf.name, skip_corrupt_traces=True)
+                self.assertEqual(segy_file.bad_byte_ranges, expected_ranges)
+                np.testing.assert_array_equal(
+                    [tr.data for tr in segy_file.traces],
+                    data[[0, 1, 2, 4, 5, 6, 7, 8, 9]])
+                with self.assertRaises(SEGYError):
+                    _read_segy(tf.name, skip_corrupt_traces=True, workers=2)
+
+    def test_sorting_by_header_keys(self):
+        """
+        Sorting copies the trace records unchanged into the order of the
+        given header keys, no matter how small the buffer is.
+        """
+        rs = np.random.RandomState(815)
+        data = rs.randn(20, 30).astype(np.float32)
+        cdp = rs.randint(0, 4, 20)
+        offset = rs.randint(0, 3, 20)
+        headers = {'ensemble_number': cdp,
+                   'distance_from_center_of_the_source_point_to_the_'
+                   'center_of_the_receiver_group': offset}
+        keys = ['ensemble_number',
+                'distance_from_center_of_the_source_point_to_the_center_'
+                'of_the_receiver_group']
+        # Sorting is stable so the original order breaks ties.
+        expected = sorted(range(20), key=lambda i: (cdp[i], offset[i]))
+        record_size = 240 + 30 * 4
+        for endian in ('<', '>'):
+            buf = io.BytesIO()
+            _create_segy_file(buf, data, endian=endian, headers=headers)
+            raw = buf.getvalue()
+            for buffer_size in (1, record_size * 3 + 17, 2 ** 20):
+                with NamedTemporaryFile() as tf:
+                    order = sort_segy(io.BytesIO(raw), tf.name, keys,
+                                      buffer_size=buffer_size)
+                    self.assertEqual(order.tolist(), expected)
+                    with open(tf.name, 'rb') as fh:
+                        sorted_raw = fh.read()
+                    self.assertEqual(sorted_raw[:3600], raw[:3600])
+                    self.assertEqual(len(sorted_raw), len(raw))
+                    for _i, index in enumerate(expected):
+                        start = 3600 + _i * record_size
+                        org_start = 3600 + index * record_size
+                        self.assertEqual(
+                            sorted_raw[start:start + record_size],
+                            raw[org_start:org_start + record_size])
+                    segy = _read_segy(tf.name)
+                    np.testing.assert_array_equal(
+                        [tr.data for tr in segy.traces], data[expected])
+
+    def test_cube_view(self):
+        """
+        Tests the inline/crossline geometry inference and the indexing of
+        the cube for both sort orders and a missing trace.
+        """
+        cube = np.arange(4 * 5 * 6, dtype=np.float32).reshape(4, 5, 6)
+        inlines, crosslines = np.meshgrid(np.arange(100, 104),
+                                          np.arange(20, 30, 2), indexing='ij')
+        for data_encoding in (1, 5):
+            for sorting in ('inline', 'crossline'):
+                if sorting == 'inline':
+                    order = np.arange(20)
+                else:
+                    order = np.arange(20).reshape(4, 5).T.ravel()
+                # The fourth trace of the file is missing.
+                expected = cube.copy()
+                expected.reshape(20, 6)[order[3]] = 0
+                order = np.delete(order, 3)
+                headers = {
+                    'original_field_record_number': inlines.ravel()[order],
+                    'ensemble_number': crosslines.ravel()[order]}
+                with NamedTemporaryFile() as tf:
+                    _create_segy_file(tf.name, cube.reshape(20, 6)[order],
+                                      data_encoding=data_encoding,
+                                      headers=headers)
+                    segy_cube = SEGYCube(tf.name)
+                    self.assertEqual(segy_cube.inline_key,
+                                     'original_field_record_number')
+                    self.assertEqual(segy_cube.sorting, sorting)
+                    self.assertEqual(segy_cube.shape, (4, 5, 6))
+                    np.testing.assert_array_equal(segy_cube[:], expected)
+                    np.testing.assert_array_equal(segy_cube.time_slice(2),
+                                                  expected[:, :, 2])
+                    np.testing.assert_array_equal(segy_cube.inline(101),
+                                                  expected[1])
+                    np.testing.assert_array_equal(segy_cube.crossline(24),
+                                                  expected[:, 2])
+                    np.testing.assert_array_equal(
+                        segy_cube[[0, 2], 1:3, ::2],
+                        expected[[0, 2], 1:3, ::2])
+                    self.assertEqual(segy_cube[1, 2, 3], expected[1, 2, 3])
+                    self.assertRaises(KeyError, segy_cube.inline, 99)
+                    segy_cube.close()
+        # Headers not identifying the traces are no geometry.
+        with NamedTemporaryFile() as tf:
+            _create_segy_file(tf.name, cube.reshape(20, 6))
+            self.assertRaises(SEGYError, SEGYCube, tf.name)
+
+    def test_extracting_raw_trace_records(self):
+        """
+        Extracted traces are bit-exact copies, only the trace count and
+        optionally the sequence numbers change.
+        """
+        rs = np.random.RandomState(4711)
+        data = rs.randn(12, 25).astype(np.float32)
+        headers = {'ensemble_number': np.arange(12) % 3}
+        record_size = 240 + 25 * 4
+        for endian in ('<', '>'):
+            buf = io.BytesIO()
+            _create_segy_file(buf, data, data_encoding=1, endian=endian,
+                              headers=headers)
+            raw = buf.getvalue()
+            org_data = np.array(
+                [tr.data for tr in _read_segy(io.BytesIO(raw)).traces])
+            for kwargs, expected in (
+                    ({'indices': [7, 2, 3]}, [7, 2, 3]),
+                    ({'indices': np.arange(12) > 8}, [9, 10, 11]),
+                    ({'predicate': lambda h: h['ensemble_number'] == 1,
+                      'keys': ['ensemble_number']}, [1, 4, 7, 10])):
+                for renumber in (False, True):
+                    out = io.BytesIO()
+                    indices = extract_segy(io.BytesIO(raw), out,
+                                           renumber=renumber,
+                                           buffer_size=record_size, **kwargs)
+                    self.assertEqual(indices.tolist(), expected)
+                    subset = out.getvalue()
+                    self.assertEqual(len(subset),
+                                     3600 + len(expected) * record_size)
+                    self.assertEqual(subset[:3212], raw[:3212])
+                    self.assertEqual(subset[3214:3600], raw[3214:3600])
+                    for _i, index in enumerate(expected):
+                        record = subset[3600 + _i * record_size:
+                                        3600 + (_i + 1) * record_size]
+                        org = raw[3600 + index * record_size:
+                                  3600 + (index + 1) * record_size]
+                        self.assertEqual(record[8:], org[8:])
+                        number = _i + 1 if renumber else index + 1
+                        self.assertEqual(
+                            record[:8],
+                            np.array([number] * 2, endian + 'i4').tobytes())
+                    segy = _read_segy(io.BytesIO(subset))
+                    self.assertEqual(segy.binary_file_header.
+                                     number_of_data_traces_per_ensemble,
+                                     len(expected))
+                    np.testing.assert_array_equal(
+                        [tr.data for tr in segy.traces], org_data[expected])
+        self.assertRaises(SEGYError, extract_segy, io.BytesIO(raw),
+                          io.BytesIO())
+
+    def test_transcoding(self):
+        """
+        Transcoding converts the samples and the byte order of trace headers
+        and data alike.
+        """
+        rs = np.random.RandomState(815)
+        data = (rs.randn(10, 30) * 1000).astype(np.float32)
+        headers = {'ensemble_number': np.arange(10) // 4,
+                   'source_coordinate_x': np.arange(10) * -70000}
+        buf = io.BytesIO()
+        _create_segy_file(buf, data, data_encoding=1, endian='>',
+                          headers=headers)
+        raw = buf.getvalue()
+        org = _read_segy(io.BytesIO(raw))
+        org_data = np.array([tr.data for tr in org.traces])
+        org_table = read_segy_header_table(io.BytesIO(raw))
+        for data_encoding, endian, expected in (
+                (5, '<', org_data),
+                (1, '<', org_data),
+                (2, '>', np.rint(org_data)),
+                (3, '<', np.rint(org_data))):
+            for workers in (1, 2):
+                out = io.BytesIO()
+                count = transcode_segy(io.BytesIO(raw), out,
+                                       data_encoding=data_encoding,
+                                       endian=endian, workers=workers,
+                                       block_size=3)
+                self.assertEqual(count, 10)
+                new = out.getvalue()
+                self.assertEqual(new[:3200], raw[:3200])
+                segy = _read_segy(io.BytesIO(new))
+                self.assertEqual(segy.endian, endian)
+                self.assertEqual(segy.data_encoding, data_encoding)
+                np.testing.assert_array_equal(
+                    [tr.data for tr in segy.traces], expected)
+                table = read_segy_header_table(io.BytesIO(new))
+                for key in TRACE_HEADER_KEYS:
+                    if key != 'unassigned':
+                        np.testing.assert_array_equal(table[key],
+                                                      org_table[key])
+        # Only changing the byte order keeps the IBM samples bit-exact.
+        out = io.BytesIO()
+        transcode_segy(io.BytesIO(raw), out, data_encoding=1, endian='<')
+        back = io.BytesIO()
+        transcode_segy(io.BytesIO(out.getvalue()), back, data_encoding=1,
+                       endian='>')
+        self.assertEqual(back.getvalue()[3600:], raw[3600:])
+        # Values out of range are clipped.
+        buf = io.BytesIO()
+        _create_segy_file(buf, np.array([[1e6, -1e6, 2.5]], np.float32),
+                          data_encoding=5)
+        out = io.BytesIO()
+        transcode_segy(io.BytesIO(buf.getvalue()), out, data_encoding=3)
+        np.testing.assert_array_equal(
+            _read_segy(io.BytesIO(out.getvalue())).traces[0].data,
+            [32767, -32768, 2])
+        self.assertRaises(NotImplementedError, transcode_segy,
+                          io.BytesIO(raw), io.BytesIO(), data_encoding=4)
+
+
+    def test_updating_headers_in_place(self):
+        """
+        Only the updated header fields change, all other bytes of the file
+        stay the same.
+        """
+        rs = np.random.RandomState(1234)
+        data = rs.randn(8, 20).astype(np.float32)
+        record_size = 240 + 20 * 4
+        for endian in ('<', '>'):
+            buf = io.BytesIO()
+            _create_segy_file(buf, data, data_encoding=1, endian=endian,
+                              headers={'ensemble_number': np.arange(8)})
+            raw = buf.getvalue()
+            x = np.array([-250000, 1, 2 ** 31 - 1])
+            table = {'source_coordinate_x': x,
+                     'scalar_to_be_applied_to_all_coordinates': -100}
+            with NamedTemporaryFile() as tf:
+                with open(tf.name, 'wb') as fh:
+                    fh.write(raw)
+                for file, indices in (
+                        (io.BytesIO(raw), [6, 1, 3]),
+                        (tf.name, np.isin(np.arange(8), [1, 3, 6]))):
+                    indices = update_segy_headers(file, dict(table),
+                                                  indices=indices)
+                    if isinstance(file, io.BytesIO):
+                        new = file.getvalue()
+                        expected_x = x[np.argsort([6, 1, 3])]
+                    else:
+                        with open(file, 'rb') as fh:
+                            new = fh.read()
+                        expected_x = x
+                    self.assertEqual(len(new), len(raw))
+                    h = read_segy_header_table(io.BytesIO(new))
+                    np.testing.assert_array_equal(
+                        h['source_coordinate_x'][[1, 3, 6]], expected_x)
+                    np.testing.assert_array_equal(
+                        h['source_coordinate_x'][[0, 2, 4, 5, 7]], 0)
+                    np.testing.assert_array_equal(
+                        h['scalar_to_be_applied_to_all_coordinates'],
+                        [0, -100, 0, -100, 0, 0, -100, 0])
+                    np.testing.assert_array_equal(h['ensemble_number'],
+                                                  np.arange(8))
+                    # Everything but the two fields is untouched.
+                    diff = np.flatnonzero(np.frombuffer(new, np.uint8) !=
+                                          np.frombuffer(raw, np.uint8))
+                    self.assertTrue(len(diff))
+                    self.assertTrue(np.all(np.isin(
+                        (diff - 3600) % record_size,
+                        np.arange(70, 76))))
+        # Values not fitting into the fields are refused.
+        self.assertRaises(SEGYWritingError, update_segy_headers,
+                          io.BytesIO(raw),
+                          {'scalar_to_be_applied_to_all_coordinates': 40000})
+        self.assertRaises(SEGYError, update_segy_headers, io.BytesIO(raw),
+                          {'not_a_header_key': 1})
+
+
+    def test_following_growing_files(self):
+        """
+        Following a file yields every trace once it is completely written
+        and stops after the timeout if the file does not grow anymore.
+        """
+        data = np.arange(120, dtype=np.float32).reshape(4, 30)
+        record_size = 240 + 30 * 4
+        for endian in ('<', '>'):
+            buf = io.BytesIO()
+            _create_segy_file(buf, data, endian=endian)
+            for follow, raw in ((follow_segy, buf.getvalue()),
+                                (follow_su, buf.getvalue()[3600:])):
+                end = len(raw) - 4 * record_size
+                with NamedTemporaryFile() as tf:
+                    with open(tf.name, 'wb') as fh:
+                        fh.write(raw[:10])
+                        fh.flush()
+
+                        def _write_later(size):
+                            # The writer catches up while the reader waits.
+                            timer = threading.Timer(0.02, lambda: (
+                                fh.write(raw[fh.tell():size]), fh.flush()))
+                            timer.start()
+                            return timer
+
+                        traces = follow(tf.name, interval=0.001, backoff=2,
+                                        max_interval=0.005, timeout=0.2)
+                        # Waits for the file headers and the first trace.
+                        timer = _write_later(end + int(1.5 * record_size))
+                        tr = next(traces)
+                        timer.join()
+                        np.testing.assert_array_equal(tr.data, data[0])
+                        # The partially written trailing trace is complete
+                        # once written up to its end.
+                        timer = _write_later(end + 3 * record_size + 20)
+                        for _i in (1, 2):
+                            np.testing.assert_array_equal(next(traces).data,
+                                                          data[_i])
+                        timer.join()
+                        timer = _write_later(len(raw))
+                        np.testing.assert_array_equal(next(traces).data,
+                                                      data[3])
+                        timer.join()
+                        # Nothing more arrives within the timeout.
+                        self.assertEqual(list(traces), [])
+
+
+    def test_su_streams_over_pipes(self):
+        """
+        SU traces are read from and written to pipes which can neither seek
+        nor tell their size.
+        """
+        data = np.arange(200, dtype=np.float32).reshape(5, 40)
+        for endian in ('<', '>'):
+            buf = io.BytesIO()
+            _create_segy_file(buf, data, endian=endian)
+            raw = buf.getvalue()[3600:]
+            for given_endian in (None, endian):
+                read_fd, write_fd = os.pipe()
+
+                def _feed():
+                    # Short writes make sure partial reads are handled.
+                    with os.fdopen(write_fd, 'wb', buffering=0) as fh:
+                        for _i in range(0, len(raw), 97):
+                            fh.write(raw[_i:_i + 97])
+
+                thread = threading.Thread(target=_feed)
+                thread.start()
+                out = io.BytesIO()
+                with os.fdopen(read_fd, 'rb', buffering=0) as fh:
+                    self.assertFalse(fh.seekable())
+                    with SUStreamWriter(out, endian=endian,
+                                        flush=True) as writer:
+                        for tr in iread_su_stream(fh, endian=given_endian):
+                            self.assertEqual(tr.stats.su.endian, endian)
+                            writer.write_trace(tr)
+                        self.assertEqual(writer.trace_count, 5)
+                thread.join()
+                self.assertEqual(out.getvalue(), raw)
+                self.assertRaises(SEGYWritingError, writer.write_trace, tr)
+        # Empty and truncated streams.
+        self.assertEqual(list(iread_su_stream(io.BytesIO(b''))), [])
+        traces = iread_su_stream(io.BytesIO(raw[:-4]))
+        for _i in range(4):
+            next(traces)
+        self.assertRaises(SEGYTraceReadingError, next, traces)
+        # A complete pipe of two Python processes.
+        code = "\n".join([
+            "import sys",
+            "from obsln.io.segy.segy import iread_su_stream, SUStreamWriter",
+            "with SUStreamWriter(sys.stdout.buffer, endian='>') as writer:",
+            "    for tr in iread_su_stream(sys.stdin.buffer):",
+            "        tr.data *= 2",
+            "        writer.write_trace(tr)"])
+        output = subprocess.run([sys.executable, "-c", code], input=raw,
+                                stdout=subprocess.PIPE, check=True).stdout
+        np.testing.assert_array_equal(
+            [tr.data for tr in _read_su(io.BytesIO(output)).traces],
+            data * 2)
+
 
 def rms(x, y):
     """
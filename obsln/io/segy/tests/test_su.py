@@ -15,6 +15,7 @@ import numpy as np
 import obspy
 from obspy.core.util import NamedTemporaryFile
 from obspy.io.segy.segy import SEGYTraceReadingError, _read_su, iread_su
+from obsln.io.segy.segy import read_su_header_table
 
 
 class SUTestCase(unittest.TestCase):
@@ -139,6 +140,17 @@ class SUTestCase(unittest.TestCase):
 
         self.assertEqual(st.traces, ist)
 
+    def test_reading_header_table(self):
+        """
+        The columnar header table has to match the unpacked trace header.
+        """
+        filename = os.path.join(self.path, '1.su_first_trace')
+        table = read_su_header_table(filename)
+        header = _read_su(filename, unpack_headers=True).traces[0].header
+        for key, value in table.items():
+            self.assertEqual(len(value), 1)
+            self.assertEqual(value[0], getattr(header, key))
+
 
 def suite():
     return unittest.makeSuite(SUTestCase, 'test')
@@ -21,16 +21,16 @@ NumPy array with the unpacked values.
 # from future.builtins import *  # NOQA
 # from future.utils import native_str
 
-from obsln.core.futureutils import native_str
-
-import ctypes as C  # NOQA
+from contextlib import contextmanager
+import io
 import os
 import sys
+import threading
 import warnings
 
 import numpy as np
 
-from obsln.core.compatibility import from_buffer
+from obsln.core.compatibility import readinto
 from .util import clibsegy
 
 
@@ -42,25 +42,59 @@ else:
     BYTEORDER = '>'
 
 
-clibsegy.ibm2ieee.argtypes = [
-    np.ctypeslib.ndpointer(dtype=np.float32, ndim=1,
-                           flags=native_str('C_CONTIGUOUS')),
-    C.c_int]
-clibsegy.ibm2ieee.restype = C.c_void_p
+def _read_into(file, out, count, dtype):
+    """
+    Reads count samples from the file straight into the memory of out.
+
+    :param out: Writeable and contiguous array of the given dtype with count
+        elements, e.g. one row of a two dimensional array.
+    """
+    if out.dtype != dtype or out.size != count or \
+            not out.flags.c_contiguous or not out.flags.writeable:
+        msg = 'out has to be a writeable contiguous %s array with %i ' + \
+            'elements.'
+        raise ValueError(msg % (np.dtype(dtype).name, count))
+    if readinto(file, out) != out.nbytes:
+        msg = 'Too little data left in the file to fill out.'
+        raise ValueError(msg)
+    return out
 
 
-def unpack_4byte_ibm(file, count, endian='>'):
+def _unpack_samples(file, count, dtype, endian, out=None):
     """
-    Unpacks 4 byte IBM floating points.
+    Reads count samples into out or a newly allocated array and swaps their
+    byte order in place if necessary.
+
+    The samples are copied exactly once, from the file into the returned
+    array, unless the end of the file is reached. Just like reading fewer
+    bytes than requested, fewer samples are returned then unless out is
+    given.
     """
-    # Read as 4 byte integer so bit shifting works.
-    data = from_buffer(file.read(count * 4), dtype=np.float32)
+    if out is None:
+        data = np.empty(count, dtype=dtype)
+        size = readinto(file, data) // data.itemsize
+        if size < count:
+            # Copy so the unused part of the allocation is released.
+            data = data[:size].copy()
+    else:
+        data = _read_into(file, out, count, dtype)
     # Swap the byte order if necessary.
     if BYTEORDER != endian:
-        data = data.byteswap()
-    length = len(data)
+        data.byteswap(True)
+    return data
+
+
+def unpack_4byte_ibm(file, count, endian='>', out=None):
+    """
+    Unpacks 4 byte IBM floating points.
+
+    If out is given, the data is read and converted in place in it, see
+    :func:`_read_into`.
+    """
+    # Read as 4 byte floats so the C code can convert them in place.
+    data = _unpack_samples(file, count, np.float32, endian, out=out)
     # Call the C code which transforms the data inplace.
-    clibsegy.ibm2ieee(data, length)
+    clibsegy.ibm2ieee(data.reshape(-1), data.size)
     return data
 
 
@@ -95,50 +129,195 @@ def unpack_4byte_ibm(file, count, endian='>'):
 #    return mantissa
 
 
-def unpack_4byte_integer(file, count, endian='>'):
+def ibm_to_ieee(data):
+    """
+    Converts 4 byte IBM floating points that are already in memory.
+
+    :param data: Array of 4 byte words holding the IBM floating points. Any
+        shape and byte order is allowed as long as the dtype describes the
+        byte order of the words correctly.
+    :returns: Native float32 array of the same shape.
+    """
+    # Make a native and contiguous copy the C code can work on in place.
+    words = np.array(data, dtype=np.uint32, order='C', copy=True)
+    values = words.view(np.float32)
+    flat = values.reshape(-1)
+    clibsegy.ibm2ieee(flat, len(flat))
+    return values
+
+
+class LazyIBMArray(object):
+    """
+    Array like wrapper around raw 4 byte IBM floating point words.
+
+    Nothing is decoded until the array is sliced, only the selected samples
+    are converted to native float32 values then.
+    """
+    def __init__(self, raw):
+        self.raw = raw
+
+    @property
+    def shape(self):
+        return self.raw.shape
+
+    @property
+    def ndim(self):
+        return self.raw.ndim
+
+    @property
+    def dtype(self):
+        return np.dtype(np.float32)
+
+    def __len__(self):
+        return len(self.raw)
+
+    def __getitem__(self, index):
+        return ibm_to_ieee(np.asarray(self.raw[index]))
+
+    def __array__(self, dtype=None, copy=None):
+        data = ibm_to_ieee(self.raw)
+        if dtype is not None:
+            data = data.astype(dtype, copy=False)
+        return data
+
+
+def unpack_4byte_integer(file, count, endian='>', out=None):
     """
     Unpacks 4 byte integers.
+
+    If out is given, the data is read in place into it, see
+    :func:`_read_into`.
     """
-    # Read as 4 byte integer so bit shifting works.
-    data = from_buffer(file.read(count * 4), dtype=np.int32)
-    # Swap the byte order if necessary.
-    if BYTEORDER != endian:
-        data = data.byteswap()
-    return data
+    return _unpack_samples(file, count, np.int32, endian, out=out)
 
 
-def unpack_2byte_integer(file, count, endian='>'):
+def unpack_2byte_integer(file, count, endian='>', out=None):
     """
     Unpacks 2 byte integers.
+
+    If out is given, the data is read in place into it, see
+    :func:`_read_into`.
     """
-    # Read as 4 byte integer so bit shifting works.
-    data = from_buffer(file.read(count * 2), dtype=np.int16)
-    # Swap the byte order if necessary.
-    if BYTEORDER != endian:
-        data = data.byteswap()
-    return data
+    return _unpack_samples(file, count, np.int16, endian, out=out)
 
 
-def unpack_4byte_fixed_point(file, count, endian='>'):
+def unpack_4byte_fixed_point(file, count, endian='>', out=None):
     raise NotImplementedError
 
 
-def unpack_4byte_ieee(file, count, endian='>'):
+def unpack_4byte_ieee(file, count, endian='>', out=None):
     """
     Unpacks 4 byte IEEE floating points.
+
+    If out is given, the data is read in place into it, see
+    :func:`_read_into`.
     """
-    # Read as 4 byte integer so bit shifting works.
-    data = from_buffer(file.read(count * 4), dtype=np.float32)
-    # Swap the byte order if necessary.
-    if BYTEORDER != endian:
-        data = data.byteswap()
-    return data
+    return _unpack_samples(file, count, np.float32, endian, out=out)
 
 
-def unpack_1byte_integer(file, count, endian='>'):
+def unpack_1byte_integer(file, count, endian='>', out=None):
     raise NotImplementedError
 
 
+class SharedFileReader(object):
+    """
+    Read only file handle shared by all on-the-fly data unpackers of one
+    file.
+
+    The file is opened once on first use and read with positional reads so
+    any number of threads can use the same handle. The modification time is
+    checked once on first use and again only after :meth:`refresh` or at
+    the start of a :meth:`batch`, not on every read.
+    """
+    def __init__(self, filename):
+        # Set before anything can fail so __del__ always works.
+        self._fd = None
+        self._lock = threading.Lock()
+        self.filename = filename
+        self.mtime = os.path.getmtime(filename)
+        self._checked = False
+
+    def __del__(self):
+        self.close()
+
+    def __getstate__(self):
+        # Copies open the file again on first use.
+        state = self.__dict__.copy()
+        state['_fd'] = None
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _get_fd(self):
+        with self._lock:
+            if self._fd is None:
+                self._fd = os.open(self.filename,
+                                   os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+            return self._fd
+
+    def close(self):
+        """
+        Closes the file. It will be opened again if needed.
+        """
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def check_mtime(self):
+        """
+        Warns if the file has changed since the headers have been read.
+        """
+        mtime = os.fstat(self._get_fd()).st_mtime
+        self._checked = True
+        if mtime != self.mtime:
+            msg = "File '%s' changed since reading headers" % self.filename
+            msg += "; data may be read incorrectly "
+            msg += "(modification time = %s)." % mtime
+            warnings.warn(msg)
+
+    def refresh(self):
+        """
+        Makes the next read check the modification time again.
+        """
+        self._checked = False
+
+    @contextmanager
+    def batch(self):
+        """
+        Context manager checking the modification time once right away,
+        e.g. before reading the data of many traces of a file that might
+        have changed.
+        """
+        self.check_mtime()
+        yield self
+
+    def pread(self, offset, size):
+        """
+        Reads size bytes starting at offset without changing any file
+        pointer.
+        """
+        if not self._checked:
+            self.check_mtime()
+        fd = self._get_fd()
+        if not hasattr(os, 'pread'):
+            with self._lock:
+                os.lseek(fd, offset, os.SEEK_SET)
+                return os.read(fd, size)
+        chunks = []
+        while size > 0:
+            chunk = os.pread(fd, size, offset)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            offset += len(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+
 class OnTheFlyDataUnpacker:
     """
     Tie-up a data sample unpack function with its parameters.
@@ -147,16 +326,30 @@ class OnTheFlyDataUnpacker:
     preventing the need to store data in memory.
     """
     def __init__(self, unpack_function, filename, filemode, seek, count,
-                 endian='>'):
+                 endian='>', reader=None, sample_size=None):
+        """
+        If a :class:`SharedFileReader` and the size of a sample in bytes are
+        given, the data will be read through it instead of opening the file
+        on every call.
+        """
         self.unpack_function = unpack_function
         self.filename = filename
         self.filemode = filemode
         self.seek = seek
         self.count = count
         self.endian = endian
-        self.mtime = os.path.getmtime(self.filename)
+        self.reader = reader
+        self.sample_size = sample_size
+        if reader is None:
+            self.mtime = os.path.getmtime(self.filename)
+        else:
+            self.mtime = reader.mtime
 
     def __call__(self):
+        if self.reader is not None:
+            raw = self.reader.pread(self.seek, self.count * self.sample_size)
+            return self.unpack_function(io.BytesIO(raw), self.count,
+                                        endian=self.endian)
         mtime = os.path.getmtime(self.filename)
         if mtime != self.mtime:
             msg = "File '%s' changed since reading headers" % self.filename
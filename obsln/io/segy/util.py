@@ -9,13 +9,37 @@
 # 3. Neither the name of the copyright holder nor the names of its contributors may be used to endorse or promote products derived from this software without specific prior written permission.
 # 
 
+import ctypes as C  # NOQA
 from struct import pack, unpack
 
-from obsln.core.util.libnames import _load_cdll
+import numpy as np
 
+from obsln.core.futureutils import native_str
+from obsln.core.util.libnames import _LazyCDLL
 
-# Import shared libsegy
-clibsegy = _load_cdll("segy")
+
+def _declare_clibsegy_functions(lib):
+    """
+    Declares the argument and return types of the functions in libsegy.
+    """
+    lib.ibm2ieee.argtypes = [
+        np.ctypeslib.ndpointer(dtype=np.float32, ndim=1,
+                               flags=native_str('C_CONTIGUOUS')),
+        C.c_int]
+    lib.ibm2ieee.restype = C.c_void_p
+    # Older builds of libsegy only come with the decoder.
+    if hasattr(lib, 'ieee2ibm'):
+        lib.ieee2ibm.argtypes = [
+            np.ctypeslib.ndpointer(dtype=np.float32, ndim=1,
+                                   flags=native_str('C_CONTIGUOUS')),
+            np.ctypeslib.ndpointer(dtype=np.uint32, ndim=1,
+                                   flags=native_str('C_CONTIGUOUS')),
+            C.c_size_t]
+        lib.ieee2ibm.restype = C.c_void_p
+
+
+# Shared libsegy, only loaded when it is used for the first time
+clibsegy = _LazyCDLL("segy", _declare_clibsegy_functions)
 
 
 def unpack_header_value(endian, packed_value, length, special_format):
@@ -59,3 +83,83 @@ def _pack_attribute_nicer_exception(obj, name, format):
         except AttributeError:
             pass
         raise ValueError(msg % (name, str(x), format, e.args[0]))
+
+
+def unpack_trace_header_table(headers, endian, keys=None):
+    """
+    Unpacks many trace headers at once into one array per header key.
+
+    :param headers: The packed 240 byte trace headers. Either a bytes like
+        object with all headers one after another or any array of them, e.g.
+        the header field of a memory mapped file.
+    :type endian: str
+    :param endian: The endianness of the headers.
+    :type keys: list of str
+    :param keys: The header keys to unpack. Defaults to all keys apart from
+        the unassigned field.
+    :rtype: dict
+    :returns: Dictionary mapping every header key to a native NumPy array
+        with one value per trace.
+    """
+    # Import here to avoid circular imports.
+    from .header import trace_header_dtype
+
+    dtype = trace_header_dtype(endian)
+    if isinstance(headers, np.ndarray):
+        headers = np.ascontiguousarray(headers) \
+            if headers.dtype.itemsize != 240 else headers
+        table = headers.view(dtype).reshape(-1)
+    else:
+        table = np.frombuffer(headers, dtype=dtype)
+    if keys is None:
+        keys = [_i for _i in dtype.names if _i != 'unassigned']
+    columns = {}
+    for key in keys:
+        column = table[key]
+        columns[key] = np.array(column,
+                                dtype=column.dtype.newbyteorder('='))
+    return columns
+
+
+def pack_trace_header_table(table, endian, count=None):
+    """
+    Packs many trace headers at once from one array per header key.
+
+    The counterpart of :func:`unpack_trace_header_table`.
+
+    :type table: dict
+    :param table: Dictionary mapping header keys to either a sequence with
+        one value per trace or a single value used for all traces. Missing
+        keys will be zero.
+    :type endian: str
+    :param endian: The endianness of the headers.
+    :type count: int
+    :param count: The number of headers. Only needed if no value in table is
+        a sequence.
+    :rtype: :class:`numpy.ndarray`
+    :returns: Array of the structured trace header dtype, its memory are the
+        packed headers one after another.
+    """
+    # Import here to avoid circular imports.
+    from .header import trace_header_dtype
+
+    if count is None:
+        lengths = set(len(_v) for _v in table.values() if np.ndim(_v))
+        if len(lengths) != 1:
+            msg = 'Unable to determine the number of trace headers.'
+            raise ValueError(msg)
+        count = lengths.pop()
+    dtype = trace_header_dtype(endian)
+    headers = np.zeros(count, dtype=dtype)
+    for key, values in table.items():
+        field = dtype.fields[key][0]
+        if field.kind in 'iu':
+            values = np.asarray(values)
+            info = np.iinfo(field)
+            if values.size and (values.min() < info.min or
+                                values.max() > info.max):
+                msg = ("Failed to pack header value `%s` with format `%s` "
+                       "as values have to be in the range from %i to %i.")
+                raise ValueError(msg % (key, field.str, info.min, info.max))
+        headers[key] = values
+    return headers
@@ -661,7 +661,8 @@ def setupPackage():
         
         Extension(
             name=_get_lib_name("segy", add_extension_suffix=False),
-            sources=[os.path.join( os.path.join("obsln", "io", "segy", "src"), "ibm2ieee.c")],
+            sources=[os.path.join( os.path.join("obsln", "io", "segy", "src"), "ibm2ieee.c"),
+                     os.path.join( os.path.join("obsln", "io", "segy", "src"), "ieee2ibm.c")],
         )
     ]
 